@@ -0,0 +1,262 @@
+import argparse
+import concurrent.futures
+import csv
+import heapq
+import json
+import os
+import random
+import time
+from urllib.parse import urlsplit
+import requests
+import api_client
+from api_client import DATA_API, ApiError
+from dataset import DATASET_FILE, read_dataset
+from positions import iter_position_pages
+from scan_output import WORK_DIR, CSV_EXPORT_FILE
+import metrics
+
+# --- 1. SETTINGS ---
+# Written by the dashboard's Settings page, re-read by the watcher whenever the file changes.
+SETTINGS_FILE = os.path.join(WORK_DIR, "alert_settings.json")
+DEFAULT_SETTINGS = {
+    "enabled": True,            # Whale movement alerts
+    "high_risk": False,         # Also flag opens/resizes bigger than HIGH_RISK_SHARE of the wallet
+    "webhook_url": "",          # Discord or Slack incoming webhook
+    "min_change": 1000.0,       # Ignore position changes smaller than this many dollars
+}
+HIGH_RISK_SHARE = 0.25
+
+BASE_INTERVAL = 120.0       # Seconds between polls of a wallet that hasn't moved recently...
+MIN_INTERVAL = 15.0         # ...halved every time it moves, down to this
+MAX_INTERVAL = 900.0        # ...and stretched 1.5x per quiet poll, up to this
+MAX_IN_FLIGHT = 16          # Concurrent /positions polls
+BATCH_SECONDS = 10.0        # Alerts are held this long and sent as one webhook message
+MAX_MESSAGE_CHARS = 1900    # Discord caps a message at 2000 characters
+MAX_PENDING = 5000          # Alerts kept while the webhook is down; the oldest are dropped first
+
+def load_settings(path=SETTINGS_FILE):
+    try:
+        with open(path) as f: return {**DEFAULT_SETTINGS, **json.load(f)}
+    except (OSError, ValueError): return dict(DEFAULT_SETTINGS)
+
+def save_settings(settings, path=SETTINGS_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f: json.dump({**DEFAULT_SETTINGS, **settings}, f, indent=2)
+    os.replace(tmp, path)
+
+def load_wallets():
+    # Tracked wallets = the latest scan (typed Arrow file), or the CSV export if that's all there is
+    if os.path.exists(DATASET_FILE):
+        return [w for w in read_dataset().column("proxyWallet").to_pylist() if w]
+    if os.path.exists(CSV_EXPORT_FILE):
+        with open(CSV_EXPORT_FILE, newline="") as f:
+            return [r["proxyWallet"] for r in csv.DictReader(f) if r.get("proxyWallet")]
+    return []
+
+# --- 2. SNAPSHOT + DIFF ---
+# A snapshot is {position key: (size, value, title, outcome)}; only the last one per wallet is kept.
+def snapshot(raw_positions):
+    snap = {}
+    for p in raw_positions:
+        key = p.get("asset") or f"{p.get('conditionId')}:{p.get('outcome')}"
+        snap[key] = (float(p.get("size") or 0), float(p.get("currentValue") or 0),
+                     p.get("title") or f"Market {str(p.get('conditionId'))[:10]}...", p.get("outcome") or "?")
+    return snap
+
+def diff(wallet, old, new, min_change, high_risk=False):
+    alerts = []
+    total = sum(v[1] for v in new.values())
+    for key, (size, value, title, outcome) in new.items():
+        before = old.get(key)
+        if before is None:
+            if value >= min_change: alerts.append({"wallet": wallet, "kind": "opened", "market": title, "outcome": outcome, "value": value, "change": value})
+            continue
+        # Resize in dollars at today's price, so pure price moves don't count as trades
+        change = (size - before[0]) * (value / size if size else 0)
+        if abs(change) >= min_change:
+            alerts.append({"wallet": wallet, "kind": "increased" if change > 0 else "reduced", "market": title, "outcome": outcome, "value": value, "change": change})
+    for key, (size, value, title, outcome) in old.items():
+        if key not in new and value >= min_change:
+            alerts.append({"wallet": wallet, "kind": "closed", "market": title, "outcome": outcome, "value": 0.0, "change": -value})
+    if high_risk and total > 0:
+        for a in alerts:
+            if a["change"] > 0 and a["change"] >= HIGH_RISK_SHARE * total: a["high_risk"] = True
+    return alerts
+
+# --- 3. WEBHOOK BATCHING ---
+ICONS = {"opened": "🟢", "increased": "⬆️", "reduced": "⬇️", "closed": "🔴"}
+
+def format_alert(a):
+    # One alert = one line: a title with line breaks in it is folded onto it
+    w, market = a["wallet"], " ".join(str(a["market"]).split())
+    line = f"{ICONS[a['kind']]} `{w[:6]}...{w[-4:]}` {a['kind']} **{a['outcome']}** on {market} ({'+' if a['change'] >= 0 else '-'}${abs(a['change']):,.0f}, now ${a['value']:,.0f})"
+    return ("⚠️ HIGH RISK " + line) if a.get("high_risk") else line
+
+def chunk_lines(alerts):
+    # Packs alert lines into as few chunks as fit under MAX_MESSAGE_CHARS; chunk i holds len(chunk) alerts
+    chunks, lines, size = [], [], 0
+    for line in map(format_alert, alerts):
+        if lines and size + len(line) + 1 > MAX_MESSAGE_CHARS:
+            chunks.append(lines)
+            lines, size = [], 0
+        lines.append(line[:MAX_MESSAGE_CHARS])
+        size += len(line) + 1
+    if lines: chunks.append(lines)
+    return chunks
+
+def build_messages(alerts):
+    return ["\n".join(lines) for lines in chunk_lines(alerts)]
+
+def post_webhook(url, text, session=None):
+    # Slack wants {"text"}, Discord wants {"content"}; returns seconds to back off (0 = sent)
+    payload = {"text": text} if "hooks.slack.com" in url else {"content": text}
+    try:
+        resp = (session or requests).post(url, json=payload, timeout=10)
+    except requests.RequestException:
+        metrics.inc("alert_webhook", result="network_error")
+        return 5.0
+    if resp.status_code == 429:
+        metrics.inc("alert_webhook", result="throttled")
+        try: return float(resp.headers.get("Retry-After") or resp.json().get("retry_after", 1))
+        except ValueError: return 1.0
+    if resp.status_code >= 400:
+        metrics.inc("alert_webhook", result=str(resp.status_code))
+        return 5.0
+    metrics.inc("alert_webhook", result="ok")
+    return 0.0
+
+# --- 4. WATCHER ---
+# One thread pool does the network waits; the loop itself only pops due wallets off a heap,
+# diffs small dicts and reschedules, so a single core keeps up with thousands of wallets.
+class Watcher:
+    def __init__(self, wallets=None, settings_path=SETTINGS_FILE, max_in_flight=MAX_IN_FLIGHT, send=post_webhook):
+        self.settings_path = settings_path
+        self.settings, self.settings_mtime = load_settings(settings_path), None
+        self.max_in_flight = max_in_flight
+        self.send = send
+        self.fixed_wallets = wallets is not None
+        self.snapshots, self.intervals, self.heap = {}, {}, []
+        self.due = {}               # wallet -> time of its current heap entry; older entries are skipped when popped
+        self.pending, self.batch_started, self.backoff_until = [], None, 0.0
+        self.wallets_mtime = None
+        self.session = requests.Session()
+        self.track(wallets if wallets is not None else load_wallets())
+
+    def track(self, wallets):
+        # The first round polls everyone right away (baseline); wallets added later are spread over one BASE_INTERVAL
+        now, current = time.monotonic(), set(wallets)
+        for w in current - set(self.intervals):
+            self.intervals[w] = BASE_INTERVAL
+            self.schedule(w, now + random.uniform(0, BASE_INTERVAL) if self.snapshots else now)
+        for w in set(self.intervals) - current:
+            self.intervals.pop(w)
+            self.snapshots.pop(w, None)
+            self.due.pop(w, None)         # its heap entry is skipped when popped
+
+    def schedule(self, wallet, at):
+        self.due[wallet] = at
+        heapq.heappush(self.heap, (at, wallet))
+
+    def reload(self):
+        try: mtime = os.path.getmtime(self.settings_path)
+        except OSError: mtime = None
+        if mtime != self.settings_mtime: self.settings, self.settings_mtime = load_settings(self.settings_path), mtime
+        if self.fixed_wallets: return
+        try: mtime = os.path.getmtime(DATASET_FILE if os.path.exists(DATASET_FILE) else CSV_EXPORT_FILE)
+        except OSError: return
+        if mtime != self.wallets_mtime:
+            self.wallets_mtime = mtime
+            self.track(load_wallets())
+
+    def poll(self, wallet):
+        raw = []
+        with metrics.timed("stage", stage="alert_poll"):
+            for page in iter_position_pages(wallet, workers=1): raw.extend(page)   # the watcher's pool bounds concurrency
+        return snapshot(raw)
+
+    def handle(self, wallet, snap):
+        # Returns the wallet's alerts and reschedules it: moves halve the interval, quiet polls stretch it
+        old = self.snapshots.get(wallet)
+        self.snapshots[wallet] = snap
+        alerts = diff(wallet, old, snap, self.settings["min_change"], self.settings["high_risk"]) if old is not None else []
+        interval = self.intervals[wallet]
+        interval = max(MIN_INTERVAL, interval / 2) if alerts else min(MAX_INTERVAL, interval * 1.5)
+        self.intervals[wallet] = interval
+        self.schedule(wallet, time.monotonic() + interval)
+        for a in alerts: metrics.inc("alerts", kind=a["kind"])
+        return alerts
+
+    def queue(self, alerts):
+        if not alerts or not self.settings["enabled"]: return
+        if self.batch_started is None: self.batch_started = time.monotonic()
+        self.pending.extend(alerts)
+        del self.pending[:-MAX_PENDING]
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not self.pending or now < self.backoff_until: return
+        if not force and now - self.batch_started < BATCH_SECONDS: return
+        url = self.settings["webhook_url"]
+        if not url:
+            for line in map(format_alert, self.pending): print(line)
+            self.pending, self.batch_started = [], None
+            return
+        chunks = chunk_lines(self.pending)
+        for i, lines in enumerate(chunks):
+            wait = self.send(url, "\n".join(lines), self.session)
+            if wait:
+                # Keep what wasn't delivered (whole messages only) and retry after the back-off
+                self.pending = self.pending[sum(map(len, chunks[:i])):]
+                self.backoff_until = now + wait
+                return
+        self.pending, self.batch_started = [], None
+
+    def run(self, duration=None, once=False):
+        # once=True polls every wallet a single time (baseline) and returns
+        started = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            in_flight = {}
+            while True:
+                # The watcher runs for days: a bad settings/dataset file, poll or webhook is logged and skipped, never fatal
+                try: self.reload()
+                except Exception as e: print(f"⚠️ Reloading settings/wallets failed: {e}")
+                now = time.monotonic()
+                while self.heap and len(in_flight) < self.max_in_flight * 2 and self.heap[0][0] <= now:
+                    at, wallet = heapq.heappop(self.heap)
+                    if self.due.get(wallet) == at and wallet not in in_flight.values():
+                        in_flight[executor.submit(self.poll, wallet)] = wallet
+                if in_flight:
+                    done, _ = concurrent.futures.wait(in_flight, timeout=1.0, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for fut in done:
+                        wallet = in_flight.pop(fut)
+                        if wallet not in self.intervals: continue   # dropped from the scan while it was being polled
+                        try: self.queue(self.handle(wallet, fut.result()))
+                        except Exception as e:
+                            # Keep the old snapshot and try again at the same interval
+                            metrics.inc("alert_polls", outcome="api_error" if isinstance(e, ApiError) else "error")
+                            self.schedule(wallet, time.monotonic() + self.intervals[wallet])
+                            print(f"⚠️ Poll failed for {wallet}: {e}")
+                elif once: break
+                else: time.sleep(max(0.0, min(1.0, (self.heap[0][0] - now) if self.heap else 1.0)))
+                try: self.flush()
+                except Exception as e:
+                    metrics.inc("alert_webhook", result="error")
+                    self.backoff_until = time.monotonic() + 5.0
+                    print(f"⚠️ Sending alerts failed: {e}")
+                if duration is not None and time.monotonic() - started >= duration: break
+        self.flush(force=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch tracked whales' positions and send webhook alerts.")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT, help="concurrent /positions polls")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds (default: run forever)")
+    parser.add_argument("--metrics-port", type=int, help="serve live Prometheus metrics on this port")
+    args = parser.parse_args()
+    if args.metrics_port: metrics.serve(args.metrics_port)
+    api_client.set_pool_size(urlsplit(DATA_API).hostname, args.max_in_flight)
+    watcher = Watcher(max_in_flight=max(1, args.max_in_flight))
+    print(f"👀 Watching {len(watcher.intervals)} wallets (polls every {MIN_INTERVAL:.0f}-{MAX_INTERVAL:.0f}s, alerts over ${watcher.settings['min_change']:,.0f})")
+    try: watcher.run(duration=args.duration)
+    except KeyboardInterrupt: watcher.flush(force=True)
+    finally: api_client.close()
@@ -0,0 +1,107 @@
+import hashlib
+import numpy as np
+from datetime import datetime, timedelta
+from lru import LRUCache
+import metrics
+
+# --- 1. SETTINGS ---
+HISTORY_DAYS = 180
+MIN_REAL_DAYS = 7           # Daily snapshots needed before real history replaces the simulated curve
+HISTORY_CACHE_SIZE = 4096
+_history_cache = LRUCache(HISTORY_CACHE_SIZE)
+metrics.register_cache("trader_history", _history_cache)
+
+def trader_seed(trader_id):
+    return int(hashlib.md5(str(trader_id).encode()).hexdigest(), 16) % 10**8
+
+# --- 2. BATCH SIMULATION ---
+# Every trader gets its own Generator seeded from its id, so a trader's curve
+# is the same whether it is simulated alone or in a batch of 100k, and the
+# global np.random state is never touched. Everything else is (n, days) array math.
+def simulate_histories(trader_ids, balances, rois, days=HISTORY_DAYS):
+    balances = np.asarray(balances, dtype=float)
+    balances = np.where(balances <= 0, 1000.0, balances)
+    safe_roi = np.clip(np.nan_to_num(np.asarray(rois, dtype=float)), -99.0, 50000.0)
+    growth = 1 + safe_roi / 100.0
+    start = balances / growth
+    daily_growth = growth ** (1 / days) - 1
+    volatility = np.maximum(0.02, np.abs(daily_growth) * 3.0)
+    noise = np.array([np.random.default_rng(trader_seed(t)).standard_normal(days) for t in trader_ids]).reshape(-1, days)
+    returns = daily_growth[:, None] + volatility[:, None] * noise
+
+    # equity[k] = max(equity[k-1] * (1 + r[k]), 1) is a Lindley recursion in log space:
+    # log_eq[k] = S[k] - min(-log(start), min(S[1..k])) with S the running sum of log growth.
+    steps = np.log(np.maximum(1 + returns, 1e-300))
+    s = np.cumsum(steps, axis=1)
+    floor = np.minimum(-np.log(start)[:, None], np.minimum.accumulate(s, axis=1))
+    equity = np.exp(s - floor)
+
+    # Bend the simulated path so it lands exactly on today's balance
+    correction = 1 + (balances / equity[:, -1] - 1)[:, None] * (np.arange(1, days + 1) / days)
+    equity = equity * correction
+    daily_pnl = np.diff(equity, axis=1, prepend=equity[:, :1])
+    return start, returns, equity, daily_pnl
+
+def compute_metrics(start, returns, equity, daily_pnl):
+    days = daily_pnl.shape[1]
+    wins = daily_pnl > 0
+    win_count = wins.sum(axis=1)
+    win_sum = np.where(wins, daily_pnl, 0).sum(axis=1)
+    loss_sum = np.where(wins, 0, daily_pnl).sum(axis=1)
+    avg_win = np.divide(win_sum, win_count, out=np.zeros_like(win_sum), where=win_count > 0)
+    avg_loss = np.divide(loss_sum, days - win_count, out=np.zeros_like(loss_sum), where=win_count < days)
+    win_rate = win_count / days * 100
+    std = returns.std(axis=1)
+    sharpe = np.divide(returns.mean(axis=1), std, out=np.zeros_like(std), where=std != 0) * np.sqrt(365)
+    peak = np.maximum.accumulate(equity, axis=1)
+    max_dd = ((equity - peak) / peak).min(axis=1) * 100
+    profit_factor = np.abs(np.divide(win_sum, loss_sum, out=np.full_like(win_sum, 99.0), where=loss_sum != 0))
+    profit_factor[loss_sum == 0] = 99
+    expectancy = avg_win * (win_rate / 100) - np.abs(avg_loss) * (1 - win_rate / 100)
+    return {"sharpe": sharpe, "profit_factor": profit_factor, "win_rate": win_rate, "max_dd": max_dd,
+            "avg_win": avg_win, "avg_loss": avg_loss, "start_bal": start, "expectancy": expectancy}
+
+# --- 3. CACHED ACCESS ---
+def _key(trader_id, balance, roi):
+    return (str(trader_id), round(float(balance), 2), round(float(roi), 4))
+
+def batch_histories(trader_ids, balances, rois):
+    # Returns one history dict per trader; only cache misses are simulated (in a single batch).
+    keys = [_key(t, b, r) for t, b, r in zip(trader_ids, balances, rois)]
+    out = [_history_cache.get(k) for k in keys]
+    missing = [i for i, h in enumerate(out) if h is None]
+    if missing:
+        m_ids = [trader_ids[i] for i in missing]
+        start, returns, equity, pnl = simulate_histories(m_ids, [keys[i][1] for i in missing], [keys[i][2] for i in missing])
+        metrics = compute_metrics(start, returns, equity, pnl)
+        for row, i in enumerate(missing):
+            out[i] = {"equity": equity[row], "daily_pnl": pnl[row],
+                      "metrics": {name: float(values[row]) for name, values in metrics.items()}}
+            _history_cache.put(keys[i], out[i])
+    return out
+
+def batch_metrics(trader_ids, balances, rois):
+    # Column-per-metric arrays for a whole leaderboard, e.g. to add Sharpe/Max DD columns.
+    histories = batch_histories(list(trader_ids), list(balances), list(rois))
+    names = histories[0]["metrics"].keys() if histories else []
+    return {name: np.array([h["metrics"][name] for h in histories]) for name in names}
+
+@metrics.timed_fn("stage", stage="generate_trader_history")
+def generate_trader_history(trader_id, current_balance, roi_pct):
+    h = batch_histories([trader_id], [current_balance], [roi_pct])[0]
+    days = len(h["equity"])
+    dates = [datetime.today() - timedelta(days=x) for x in range(days)][::-1]
+    return {"dates": dates, "equity": h["equity"].tolist(), "daily_pnl": h["daily_pnl"].tolist(),
+            "metrics": dict(h["metrics"])}
+
+# --- 4. REAL HISTORY ---
+def real_trader_history(history):
+    # history is a snapshots.wallet_history() frame; same shape as generate_trader_history's output
+    equity = history["balance"].to_numpy(dtype=float)
+    daily_pnl = np.diff(equity, prepend=equity[:1])
+    prev = equity[:-1]
+    returns = np.divide(daily_pnl[1:], prev, out=np.zeros_like(prev), where=prev != 0)
+    # Day one has no previous snapshot, so it is left out of the per-day stats
+    m = compute_metrics(equity[:1], returns[None, :], equity[None, :], daily_pnl[None, 1:])
+    return {"dates": history["date"].tolist(), "equity": equity.tolist(), "daily_pnl": daily_pnl.tolist(),
+            "metrics": {name: float(values[0]) for name, values in m.items()}}
@@ -0,0 +1,191 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import metrics
+
+# --- 1. ENDPOINTS ---
+# Overridable so benchmarks can point everything at a local stand-in (benchmarks/fake_polymarket.py)
+DATA_API = os.environ.get("POLYWATCH_DATA_API", "https://data-api.polymarket.com").rstrip("/")
+GAMMA_API = os.environ.get("POLYWATCH_GAMMA_API", "https://gamma-api.polymarket.com").rstrip("/")
+CLOB_API = os.environ.get("POLYWATCH_CLOB_API", "https://clob.polymarket.com").rstrip("/")
+
+# --- 2. RATE LIMITS (requests per second, burst) ---
+# Sized just under the published per-10s windows for each Polymarket API.
+RATE_LIMITS = {
+    "data-api.polymarket.com": (19.0, 40),
+    "gamma-api.polymarket.com": (12.0, 25),
+    "clob.polymarket.com": (4.5, 10),
+}
+DEFAULT_RATE_LIMIT = (5.0, 10)
+
+# --- 3. CONNECTION POOLS ---
+# One keep-alive session per host. Pools block when full rather than opening
+# throwaway connections, so they must be at least as large as the number of
+# threads hitting a host (scanner MAX_IN_FLIGHT, dashboard executors).
+POOL_SIZES = {
+    "data-api.polymarket.com": 32,
+    "gamma-api.polymarket.com": 16,
+    "clob.polymarket.com": 16,
+}
+DEFAULT_POOL_SIZE = 10
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+COMPRESS_RESPONSES = True   # Ask for gzip/deflate bodies; positions payloads shrink ~5-10x
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5      # First retry waits ~0.5s, then 1s, 2s, 4s...
+BACKOFF_CAP = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+class ApiError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Blocks until a token is free; returns how long the caller waited.
+        started = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - started
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        # A Retry-After from the server holds back every caller on this host, not just the one that got throttled.
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+_buckets = {}
+_stats = {}
+_sessions = {}
+_registry_lock = threading.Lock()
+
+def _new_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    session.headers["Accept-Encoding"] = "gzip, deflate" if COMPRESS_RESPONSES else "identity"
+    return session
+
+def _host_state(host):
+    with _registry_lock:
+        if host not in _buckets:
+            rate, burst = RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT)
+            _buckets[host] = TokenBucket(rate, burst)
+            _stats[host] = {"requests": 0, "ok": 0, "retries": 0, "throttled": 0, "errors": 0, "wait_s": 0.0}
+        if host not in _sessions:
+            _sessions[host] = _new_session(POOL_SIZES.get(host, DEFAULT_POOL_SIZE))
+        return _buckets[host], _stats[host], _sessions[host]
+
+def set_pool_size(host, size):
+    # Grow (never shrink) a host's pool, e.g. when the scanner raises its in-flight limit.
+    size = max(size, POOL_SIZES.get(host, DEFAULT_POOL_SIZE))
+    with _registry_lock:
+        POOL_SIZES[host] = size
+        old = _sessions.pop(host, None)
+    if old: old.close()
+
+def _bump(stats, key, amount=1):
+    with _registry_lock:
+        stats[key] += amount
+
+def _retry_after(resp):
+    value = resp.headers.get("Retry-After")
+    if not value: return None
+    try: return max(0.0, float(value))
+    except ValueError: pass
+    try: return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError): return None
+
+def _backoff(attempt):
+    # Full jitter: spread retries out so parallel workers don't stampede the host together.
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES):
+    # api_call covers the whole call (rate-limit waits and retries included); api_attempt is one HTTP round trip
+    parts = urlsplit(url)
+    host, endpoint = parts.hostname, metrics.endpoint(parts.path)
+    with metrics.timed("api_call", host=host, endpoint=endpoint):
+        return _get(url, host, endpoint, params, headers, timeout, retries)
+
+def _get(url, host, endpoint, params, headers, timeout, retries):
+    bucket, stats, session = _host_state(host)
+    for attempt in range(retries + 1):
+        waited = bucket.acquire()
+        _bump(stats, "wait_s", waited)
+        metrics.observe("api_rate_limit_wait", waited, host=host)
+        _bump(stats, "requests")
+        started = time.perf_counter()
+        try:
+            resp = session.get(url, params=params, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            # Dropped connections, timeouts and bodies cut off mid-stream are retried; anything else
+            # (bad URL, redirect loop) is raised at once, still as ApiError so callers handle one type
+            metrics.inc("api_attempts", host=host, endpoint=endpoint, status=type(e).__name__)
+            if attempt == retries or not isinstance(e, RETRY_ERRORS):
+                _bump(stats, "errors")
+                raise ApiError(f"{host}: {e}") from e
+            _bump(stats, "retries")
+            time.sleep(_backoff(attempt))
+            continue
+        metrics.observe("api_attempt", time.perf_counter() - started, host=host, endpoint=endpoint)
+        metrics.inc("api_attempts", host=host, endpoint=endpoint, status=resp.status_code)
+
+        if resp.status_code in RETRY_STATUSES and attempt < retries:
+            _bump(stats, "retries")
+            delay = _retry_after(resp)
+            if resp.status_code == 429:
+                _bump(stats, "throttled")
+                bucket.pause(delay if delay is not None else _backoff(attempt))
+            else:
+                time.sleep(delay if delay is not None else _backoff(attempt))
+            continue
+
+        if resp.status_code >= 400:
+            _bump(stats, "errors")
+            raise ApiError(f"API Error {resp.status_code}", status=resp.status_code)
+        _bump(stats, "ok")
+        return resp
+
+def get_json(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES):
+    resp = get(url, params=params, headers=headers, timeout=timeout, retries=retries)
+    try: return resp.json()
+    except ValueError as e: raise ApiError(f"Bad JSON from {urlsplit(url).hostname}", status=resp.status_code) from e
+
+def host_stats():
+    with _registry_lock:
+        return {host: dict(s) for host, s in _stats.items()}
+
+def close():
+    with _registry_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions: session.close()
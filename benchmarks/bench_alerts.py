@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from fake_polymarket import spawn_server, env_for, request_count, wallet_id
+
+# --- ALERT WATCHER BENCHMARK + WEBHOOK CHECK ---
+# Runs alerts.Watcher against the fake API (every 4th wallet trades every --churn-s seconds)
+# and a local webhook receiver that answers every --throttle-every'th POST with a 429.
+# Reports polls/s and CPU used by this process, then checks that every alert the
+# watcher raised reached the receiver exactly once, in order, despite the 429s.
+class Receiver(BaseHTTPRequestHandler):
+    posts, lines, throttled, throttle_every = 0, [], 0, 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with Receiver.lock:
+            Receiver.posts += 1
+            throttle = Receiver.throttle_every and Receiver.posts % Receiver.throttle_every == 0
+            if throttle: Receiver.throttled += 1
+            else: Receiver.lines.extend(body["content"].split("\n"))
+        self.send_response(429 if throttle else 204)
+        if throttle: self.send_header("Retry-After", "0.2")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the whale alert watcher against a local fake API and webhook.")
+    parser.add_argument("--wallets", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--churn-s", type=float, default=5.0, help="seconds between position changes of active wallets")
+    parser.add_argument("--interval", type=float, default=10.0, help="base poll interval (the watcher's default is 120s)")
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--throttle-every", type=int, default=5, help="answer every Nth webhook POST with a 429 (0 = never)")
+    args = parser.parse_args()
+
+    server, base_url = spawn_server(wallets=args.wallets, churn_s=args.churn_s)
+    os.environ.update(env_for(base_url))
+    import api_client
+    import alerts
+    api_client.RATE_LIMITS[urlsplit(base_url).hostname] = (1e9, 1e9)
+    api_client.set_pool_size(urlsplit(base_url).hostname, args.max_in_flight)
+    alerts.BASE_INTERVAL, alerts.MIN_INTERVAL, alerts.MAX_INTERVAL = args.interval, args.interval / 8, args.interval * 4
+    alerts.BATCH_SECONDS = 1.0
+
+    Receiver.throttle_every = args.throttle_every
+    hook = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=hook.serve_forever, daemon=True).start()
+    settings_path = os.path.join(tempfile.mkdtemp(prefix="polywatch-alerts-"), "alert_settings.json")
+    alerts.save_settings({"webhook_url": f"http://127.0.0.1:{hook.server_address[1]}/hook", "min_change": 500.0}, settings_path)
+
+    watcher = alerts.Watcher(wallets=[wallet_id(i) for i in range(args.wallets)], settings_path=settings_path,
+                             max_in_flight=args.max_in_flight)
+    raised = []
+    queue = watcher.queue
+    watcher.queue = lambda batch: (raised.extend(batch), queue(batch))
+    try:
+        requests_before, cpu, started = request_count(base_url), time.process_time(), time.perf_counter()
+        watcher.run(duration=args.duration)
+        wall, cpu = time.perf_counter() - started, time.process_time() - cpu
+        polls = request_count(base_url) - requests_before
+        while watcher.pending:
+            time.sleep(0.2)
+            watcher.flush(force=True)
+    finally:
+        hook.shutdown()
+        server.terminate()
+        api_client.close()
+
+    active = sum(1 for i in range(args.wallets) if i % 4 == 0)
+    fast = sum(1 for w, s in watcher.intervals.items() if s < args.interval)
+    print(f"👀 {args.wallets:,} wallets for {wall:.1f}s: {polls:,} polls ({polls / wall:,.0f}/s) | "
+          f"CPU {cpu:.1f}s ({cpu / wall:.0%} of one core)")
+    print(f"⏱️ {fast} wallets polled faster than the base interval ({active} actually trade)")
+    print(f"📨 {len(raised):,} alerts raised | {Receiver.posts} webhook POSTs ({Receiver.throttled} answered 429)")
+    # An empty run would compare [] == [] and pass: the check only counts if alerts (and some 429s) happened
+    if not raised: print("❌ no alerts raised: run longer (--duration) or trade faster (--churn-s)")
+    elif args.throttle_every and not Receiver.throttled: print("❌ no webhook POST was throttled: the 429 path wasn't exercised")
+    delivered = bool(raised) and (Receiver.throttled > 0 or not args.throttle_every) and \
+        Receiver.lines == [alerts.format_alert(a) for a in raised]
+    print(f"{'✅' if delivered else '❌'} every alert delivered exactly once, in order ({len(Receiver.lines):,} received)")
+    if not delivered: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
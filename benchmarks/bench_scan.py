@@ -0,0 +1,120 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from fake_polymarket import DEFAULTS, spawn_server, request_count, env_for, wallet_id
+
+# --- OFFLINE SCAN / POSITIONS BENCHMARK ---
+# Starts benchmarks/fake_polymarket.py in a child process and runs the real scanner and
+# positions code against it, pointed there through the POLYWATCH_*_API variables.
+# Each case runs in a fresh process (clean caches, honest peak RSS) inside a throwaway
+# working directory, so the repo's data files and cache/ are never touched.
+FAKE_OPTIONS = ("positions", "markets", "latency_ms", "error_rate", "throttle_rate", "retry_after")
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000) if samples else 0.0
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+def _run_case(kind, size, base_url, max_in_flight, rate, conn):
+    os.environ.update(env_for(base_url))
+    sys.path.insert(0, REPO_DIR)
+    import api_client
+    import scanner
+    import positions
+    api_client.RATE_LIMITS[urlsplit(base_url).hostname] = (rate, max(1, int(rate * 2))) if rate else (1e9, 1e9)
+
+    # Client-side latency of every call, retries and rate-limit waits included
+    latencies = []
+    real_get = api_client.get
+    def timed_get(*a, **kw):
+        started = time.perf_counter()
+        try: return real_get(*a, **kw)
+        finally: latencies.append(time.perf_counter() - started)
+    api_client.get = timed_get
+
+    work_dir = tempfile.mkdtemp(prefix="polywatch-bench-")
+    os.chdir(work_dir)
+    try:
+        if kind == "scan":
+            run = lambda: scanner.run_scan(max_in_flight=max_in_flight, limit=size)
+        else:
+            wallets = [wallet_id(i) for i in range(size)]
+            run = lambda: [positions.get_active_positions(w) for w in wallets]
+            if kind == "positions_warm": run()  # the measured pass is served from the result cache
+
+        baseline = peak_rss_mb()
+        latencies.clear()
+        requests_before = request_count(base_url)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        wall = time.perf_counter() - started
+        requests = request_count(base_url) - requests_before
+        conn.send({"wall_s": round(wall, 3), "requests": requests, "rps": round(requests / wall, 1),
+                   "p50_ms": round(percentile_ms(latencies, 50), 2), "p99_ms": round(percentile_ms(latencies, 99), 2),
+                   "peak_rss_mb": round(peak_rss_mb(), 1), "rss_growth_mb": round(peak_rss_mb() - baseline, 1)})
+    finally:
+        api_client.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_case(kind, size, base_url, args):
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe()
+    process = ctx.Process(target=_run_case, args=(kind, size, base_url, args.max_in_flight, args.rate, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run_scan and get_active_positions against a local fake API.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="leaderboard sizes to scan")
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0,
+                        help="client-side requests/s for the fake host (0 = unlimited, measures the code, not the limiter)")
+    parser.add_argument("--position-wallets", type=int, default=200, help="wallets opened through get_active_positions")
+    parser.add_argument("--json", help="also write the results to this file")
+    for name in FAKE_OPTIONS:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(DEFAULTS[name]), default=DEFAULTS[name])
+    args = parser.parse_args()
+
+    fake_options = {k: getattr(args, k) for k in FAKE_OPTIONS}
+    server, base_url = spawn_server(wallets=max(args.sizes), **fake_options)
+    results = {"options": {**fake_options, "max_in_flight": args.max_in_flight, "rate": args.rate}, "scan": {}, "positions": {}}
+    try:
+        print(f"🧪 Fake Polymarket on {base_url} | latency {args.latency_ms}ms | "
+              f"errors {args.error_rate:.0%} | 429s {args.throttle_rate:.0%} | {args.positions} positions/wallet")
+        for size in args.sizes:
+            r = results["scan"][size] = run_case("scan", size, base_url, args)
+            print(f"📊 run_scan {size:>7,} wallets: {r['wall_s']:8.2f}s | {r['requests']:>7,} requests | {r['rps']:>7,.0f} req/s | "
+                  f"p50 {r['p50_ms']:.1f}ms | p99 {r['p99_ms']:.1f}ms | peak RSS {r['peak_rss_mb']:.0f} MB (+{r['rss_growth_mb']:.0f})")
+
+        for label in ("cold", "warm"):
+            r = results["positions"][label] = run_case(f"positions_{label}", args.position_wallets, base_url, args)
+            r["per_wallet_ms"] = round(r["wall_s"] / args.position_wallets * 1000, 3)
+            print(f"📂 get_active_positions x{args.position_wallets} ({label}): {r['wall_s']:.2f}s | {r['per_wallet_ms']:.1f}ms/wallet | "
+                  f"{r['requests']:,} requests | p50 {r['p50_ms']:.1f}ms | p99 {r['p99_ms']:.1f}ms")
+    finally:
+        server.terminate()
+
+    if args.json:
+        with open(args.json, "w") as f: json.dump(results, f, indent=2)
+        print(f"📝 Wrote {args.json}")
+
+if __name__ == "__main__":
+    main()
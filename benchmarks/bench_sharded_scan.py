@@ -0,0 +1,95 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from fake_polymarket import spawn_server, env_for, request_count
+
+# --- SHARDED SCAN BENCHMARK ---
+# Runs the single-process scanner once, then the coordinator/worker scan on 1, then
+# each --boxes count of "boxes", all against the fake API (+--latency-ms per request)
+# in throwaway working directories. Every process gets the same --rate budget, the way
+# each real box gets its own per-IP rate limit: the extra boxes are worker processes
+# with their own token buckets (scanner.py --worker on another machine). The scan is
+# bound by that budget, so one box can't beat the single process; more boxes can.
+# Every sharded run must publish exactly the same dataset and positions file as the
+# single-process one.
+def run(fn, work_dir, boxes=1):
+    import sharded_scan
+    os.chdir(work_dir)
+    # Box 1 is the coordinator's own local worker; the others join its queue like remote boxes
+    remote = [sharded_scan.spawn_worker(sharded_scan.QUEUE_FILE, wait=True, log_path=os.path.join("cache", f"scan_worker_box{k}.log"))
+              for k in range(2, boxes + 1)]
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): fn()
+        return time.perf_counter() - started
+    finally:
+        for process in remote:
+            process.terminate()
+            process.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the coordinator/worker scan against a single-process scan.")
+    parser.add_argument("--wallets", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=5000, help="leaderboard profiles per board")
+    parser.add_argument("--periods", nargs="+", default=["MONTH", "WEEK"])
+    parser.add_argument("--boxes", type=int, nargs="+", default=[2, 4], help="worker boxes to simulate, each with its own --rate budget")
+    parser.add_argument("--rate", type=float, default=50.0, help="requests/s each box (process) may send, like a per-IP limit")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    server, base_url = spawn_server(wallets=args.wallets, latency_ms=args.latency_ms)
+    os.environ.update(env_for(base_url))
+    import api_client
+    import scanner
+    import sharded_scan
+    import market_cache
+    from dataset import read_dataset
+    from position_store import PositionStore
+    api_client.RATE_LIMITS[urlsplit(base_url).hostname] = (args.rate, int(args.rate))   # copied into every spawned worker
+    boards = scanner.board_matrix(["OVERALL"], args.periods, ["PNL"])
+
+    dirs = []
+    def outputs(work_dir):
+        positions = PositionStore(os.path.join(work_dir, "elite_positions.arrow")).table.drop(["fetched_at"])
+        return read_dataset(os.path.join(work_dir, "elite_data.arrow")), positions
+    try:
+        dirs.append(tempfile.mkdtemp(prefix="polywatch-shard-"))
+        before = request_count(base_url)
+        single = run(lambda: scanner.run_scan(limit=args.limit, boards=boards, metrics_file=""), dirs[0])
+        expected = outputs(dirs[0])
+        print(f"🧪 {len(boards)} boards x {args.limit:,} profiles | +{args.latency_ms:.0f}ms per request | {args.rate:.0f} req/s per box")
+        print(f"1️⃣ single process: {single:6.1f}s | {request_count(base_url) - before:,} requests | {expected[0].num_rows:,} whales")
+
+        ok, best = True, None
+        for boxes in [1] + [b for b in args.boxes if b > 1]:
+            dirs.append(tempfile.mkdtemp(prefix="polywatch-shard-"))
+            market_cache._store = None   # title lookups hit the API again, like a fresh box
+            before = request_count(base_url)
+            wall = run(lambda: sharded_scan.run_sharded_scan(workers=1, limit=args.limit, boards=boards, metrics_file=""), dirs[-1], boxes)
+            table, positions = outputs(dirs[-1])
+            same = table.equals(expected[0]) and positions.equals(expected[1])
+            ok &= same
+            if boxes > 1: best = wall if best is None else min(best, wall)
+            print(f"🧩 {boxes:>2} box(es):      {wall:6.1f}s ({single / wall:.2f}x) | {request_count(base_url) - before:,} requests | "
+                  f"{table.num_rows:,} whales | {'✅ same output' if same else '❌ output differs'}")
+    finally:
+        os.chdir(REPO_DIR)
+        for d in dirs: shutil.rmtree(d, ignore_errors=True)
+        server.terminate()
+        api_client.close()
+    if best is not None and best >= single:
+        print("❌ more boxes were not faster than the single process")
+        ok = False
+    if not ok: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import concurrent.futures
+import os
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from fake_polymarket import spawn_server, env_for, request_count, wallet_id
+
+# --- SINGLE-FLIGHT LOAD TEST ---
+# N concurrent "sessions" each open --opens whales, picked Zipf-style from --wallets,
+# like a leaderboard link going viral. Every request goes to the fake API with
+# --latency-ms added, so overlapping cold fetches are common. Upstream requests should
+# stay around (requests per wallet x unique wallets), however many sessions there are.
+# The --no-coalesce baseline swaps in a group that never shares a fetch, which is how
+# things behaved before. A second round runs after RESULT_TTL has passed: every
+# session should get the stale table at once, with one background refresh per wallet.
+class NoCoalescing:
+    def __init__(self, group):
+        self.group = group
+
+    def claim(self, keys):
+        return list(dict.fromkeys(keys)), {}
+
+    def finish(self, key, value=None, error=None):
+        pass
+
+    def wait(self, call):
+        return self.group.wait(call)
+
+    def refresh(self, key, fn):
+        fn()
+        return True
+
+def run_round(sessions, picks, positions):
+    def session(wallets):
+        started = time.perf_counter()
+        for w in wallets: positions.get_active_positions(w)
+        return time.perf_counter() - started
+    with concurrent.futures.ThreadPoolExecutor(max_workers=sessions) as executor:
+        return list(executor.map(session, picks))
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test request coalescing for concurrent dashboard sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--wallets", type=int, default=50, help="distinct whales sessions pick from")
+    parser.add_argument("--opens", type=int, default=5, help="whales opened per session")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--no-coalesce", action="store_true", help="baseline: every session fetches for itself")
+    args = parser.parse_args()
+
+    server, base_url = spawn_server(wallets=args.wallets, latency_ms=args.latency_ms)
+    os.environ.update(env_for(base_url))
+    import api_client
+    import market_cache
+    import positions
+    host = urlsplit(base_url).hostname
+    api_client.RATE_LIMITS[host] = (1e9, 1e9)
+    api_client.set_pool_size(host, 64)
+    if args.no_coalesce:
+        positions._flights = NoCoalescing(positions._flights)
+        market_cache._flights = NoCoalescing(market_cache._flights)
+
+    rng = np.random.default_rng(0)
+    weights = 1.0 / np.arange(1, args.wallets + 1)
+    weights /= weights.sum()
+    mode = "no coalescing" if args.no_coalesce else "single-flight"
+    print(f"🧪 {mode} | {args.wallets} whales | {args.opens} opens/session | +{args.latency_ms:.0f}ms per request")
+    try:
+        for n in args.sessions:
+            work_dir = tempfile.mkdtemp(prefix="polywatch-sf-")
+            os.chdir(work_dir)
+            positions._results.clear()
+            market_cache._store = None   # fresh market store (memory + SQLite) per case
+            picks = [[wallet_id(int(i)) for i in rng.choice(args.wallets, args.opens, p=weights)] for _ in range(n)]
+            unique = len({w for p in picks for w in p})
+
+            before = request_count(base_url)
+            cold = run_round(n, picks, positions)
+            cold_requests = request_count(base_url) - before
+
+            # Age every table past RESULT_TTL: the next round must be served from stale data
+            for w in list(positions._results.data):
+                rows, error, fetched_at = positions._results.data[w]
+                positions._results.data[w] = (rows, error, fetched_at - positions.RESULT_TTL - 1)
+            before = request_count(base_url)
+            stale = run_round(n, picks, positions)
+            time.sleep(args.latency_ms / 1000 * 4 + 0.5)   # let the background refreshes land
+            stale_requests = request_count(base_url) - before
+
+            print(f"👥 {n:>4} sessions, {unique:>3} unique whales | cold: {cold_requests:>5} upstream requests "
+                  f"({cold_requests / unique:.1f}/whale), p99 session {np.percentile(cold, 99) * 1000:,.0f}ms | "
+                  f"stale: {stale_requests:>4} requests, p99 session {np.percentile(stale, 99) * 1000:,.1f}ms")
+            os.chdir(REPO_DIR)
+            shutil.rmtree(work_dir, ignore_errors=True)
+    finally:
+        server.terminate()
+        api_client.close()
+
+if __name__ == "__main__":
+    main()
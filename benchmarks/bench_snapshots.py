@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import snapshots
+
+# --- SNAPSHOT STORE: SIZE + WALLET RANGE QUERIES ---
+# Writes `days` daily snapshots of `wallets` random whales into a temp history/ dir,
+# then reports bytes per row and the cost of a full-range and a 30-day wallet query.
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the daily snapshot store.")
+    parser.add_argument("--wallets", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    wallets = [f"0x{w:040x}" for w in rng.integers(0, 2**62, args.wallets)]
+    balance = rng.lognormal(10, 1, args.wallets)
+    history_dir = tempfile.mkdtemp(prefix="polywatch-history-")
+    try:
+        started = time.perf_counter()
+        days = [np.datetime64("2025-01-01") + k for k in range(args.days)]
+        for day in days:
+            balance = balance * (1 + rng.normal(0, 0.02, args.wallets))
+            rows = [{"proxyWallet": w, "rank": i + 1, "active_balance": b, "pnl": b * 0.1, "vol": b * 12, "trade_count": 500}
+                    for i, (w, b) in enumerate(zip(wallets, balance))]
+            snapshots.append_snapshot(rows, day=str(day), history_dir=history_dir)
+        write_s = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(history_dir) for f in files)
+        print(f"🗂️ {args.days} days x {args.wallets:,} wallets: {size / 2**20:.1f} MB on disk "
+              f"({size / (args.days * args.wallets):.1f} bytes/row) | written in {write_s:.1f}s")
+
+        sample = rng.choice(wallets, args.queries)
+        for label, start in (("full range", None), ("last 30 days", str(days[-30]))):
+            started = time.perf_counter()
+            for w in sample: rows = len(snapshots.wallet_history(w, start=start, history_dir=history_dir))
+            print(f"🔎 wallet_history ({label}): {(time.perf_counter() - started) / args.queries * 1000:.1f} ms/query ({rows} rows)")
+    finally:
+        shutil.rmtree(history_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import argparse
+import json
+import multiprocessing
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+# --- LOCAL STAND-IN FOR THE POLYMARKET APIS ---
+# Serves the data-api, gamma-api and clob endpoints the scanner and dashboard call,
+# from one port. Every wallet's data is derived from its index, so runs are repeatable.
+# Wallets are "0x" + 40 hex digits of their index; markets are "0x" + 64 hex digits.
+
+DEFAULTS = {
+    "wallets": 1000,          # Leaderboard size
+    "positions": 20,          # Open positions per wallet (payload size)
+    "activities": 1200,       # TRADE/REDEEM events in each wallet's /activity history
+    "markets": 5000,          # Distinct markets positions are drawn from
+    "latency_ms": 0.0,        # Mean added latency per request (uniform +-50%)
+    "error_rate": 0.0,        # Fraction of requests answered with a 500
+    "throttle_rate": 0.0,     # Fraction of requests answered with a 429
+    "retry_after": 0.05,      # Retry-After seconds sent with 429s
+    "churn_s": 0.0,           # If > 0, every 4th wallet trades: its positions change every churn_s seconds
+}
+
+def wallet_id(i): return f"0x{i:040x}"
+def market_id(j): return f"0x{j:064x}"
+
+def _index(hex_id):
+    try: return int(hex_id, 16)
+    except (TypeError, ValueError): return None
+
+class FakePolymarket:
+    def __init__(self, **options):
+        self.options = {**DEFAULTS, **options}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    # --- DATA ---
+    def _rng(self, *key):
+        return np.random.default_rng(list(key))
+
+    def leaderboard(self, limit, offset, board=("OVERALL", "MONTH", "PNL")):
+        # Other boards list the same wallet universe rotated by a board-specific shift, so boards overlap partly
+        rows, total = [], self.options["wallets"]
+        shift = 0 if board == ("OVERALL", "MONTH", "PNL") else zlib.crc32("/".join(board).encode()) % max(total // 2, 1)
+        for rank in range(offset, min(offset + limit, total)):
+            i = (rank + shift) % total
+            rng = self._rng(i)
+            vol = float(rng.lognormal(13, 1.5))
+            rows.append({"rank": str(rank + 1), "proxyWallet": wallet_id(i), "userName": f"whale_{i}",
+                         "xUsername": "", "verifiedBadge": bool(i % 7 == 0), "vol": vol,
+                         "pnl": vol * float(rng.uniform(-0.05, 0.2)), "profileImage": ""})
+        return rows
+
+    def traded(self, wallet):
+        i = _index(wallet) or 0
+        return {"user": wallet, "traded": int(self._rng(i, 1).integers(0, 2000))}
+
+    def positions(self, wallet, limit, offset):
+        i = _index(wallet) or 0
+        count = self.options["positions"]
+        rng = self._rng(i, 2)
+        markets = rng.integers(0, self.options["markets"], count)
+        values = rng.lognormal(7, 1.5, count)
+        avg, cur = rng.uniform(0.05, 0.95, count), rng.uniform(0.01, 0.99, count)
+        keep = np.ones(count, bool)
+        if self.options["churn_s"] and i % 4 == 0:
+            # Each epoch resizes some positions and closes others (closed ones come back later)
+            epoch = int(time.time() // self.options["churn_s"])
+            moves = self._rng(i, 4, epoch)
+            values = values * np.where(moves.random(count) < 0.3, moves.uniform(0.3, 3.0, count), 1.0)
+            keep = moves.random(count) >= 0.1
+        out = []
+        for k in range(offset, min(offset + limit, count)):
+            if not keep[k]: continue
+            size = values[k] / cur[k]
+            out.append({"proxyWallet": wallet, "conditionId": market_id(int(markets[k])),
+                        "outcome": "Yes" if k % 2 == 0 else "No", "size": size,
+                        "avgPrice": float(avg[k]), "curPrice": float(cur[k]), "currentValue": float(values[k]),
+                        "initialValue": float(size * avg[k]), "cashPnl": float(values[k] - size * avg[k]),
+                        "percentPnl": float(cur[k] / avg[k] - 1)})
+        return out
+
+    def activity_history(self, wallet):
+        # Buys, partial sells and redemptions over a small pool of markets, oldest first.
+        # Gaps of 0s happen on purpose: several fills in one second, like real multi-fill orders.
+        i = _index(wallet) or 0
+        rng = self._rng(i, 3)
+        n = self.options["activities"]
+        pool = rng.integers(0, self.options["markets"], max(n // 12, 1))
+        times = 1700000000 + np.cumsum(rng.integers(0, 7200, n))
+        held, events = {}, []
+        for k in range(n):
+            j = int(pool[rng.integers(0, len(pool))])
+            outcome = int(rng.integers(0, 2))
+            asset, c_id = str(j * 2 + outcome), market_id(j)
+            base = {"proxyWallet": wallet, "timestamp": int(times[k]), "conditionId": c_id,
+                    "transactionHash": f"0x{i:024x}{k:040x}", "title": f"Will event #{j} happen?",
+                    "slug": f"event-{j}", "outcomeIndex": outcome, "outcome": "Yes" if outcome == 0 else "No"}
+            roll = rng.random()
+            if asset in held and roll < 0.15:
+                size = sum(held.pop(a) for a in (str(j * 2), str(j * 2 + 1)) if a in held)
+                won = rng.random() < 0.55
+                events.append({**base, "type": "REDEEM", "asset": "", "side": "", "size": size,
+                               "usdcSize": size if won else 0.0, "price": 0})
+                continue
+            price = float(rng.uniform(0.05, 0.95))
+            if asset in held and roll < 0.45:
+                size = held[asset] * float(rng.uniform(0.2, 1.0))
+                held[asset] -= size
+                if held[asset] < 1e-6: held.pop(asset)
+                side = "SELL"
+            else:
+                size = float(rng.lognormal(6, 1))
+                held[asset] = held.get(asset, 0.0) + size
+                side = "BUY"
+            events.append({**base, "type": "TRADE", "asset": asset, "side": side, "size": size,
+                           "usdcSize": size * price, "price": price})
+        return events
+
+    def activity(self, wallet, q, limit, offset):
+        types = set(q.get("type", "TRADE,REDEEM").split(","))
+        start, end = int(q.get("start", 0)), int(q.get("end", 2**62))
+        rows = [e for e in self.activity_history(wallet) if e["type"] in types and start <= e["timestamp"] <= end]
+        if q.get("sortDirection", "DESC").upper() != "ASC": rows.reverse()
+        return rows[offset:offset + min(limit, 500)]
+
+    def market(self, j):
+        return {"conditionId": market_id(j), "question": f"Will event #{j} happen?", "slug": f"event-{j}",
+                "outcomes": json.dumps(["Yes", "No"])}
+
+    # Every 10th market is only known to the clob; every 50th is unknown everywhere
+    def gamma_markets(self, condition_ids):
+        ids = [_index(c) for c in condition_ids]
+        return [self.market(j) for j in ids if j is not None and j % 10 != 0]
+
+    def clob_market(self, condition_id):
+        j = _index(condition_id)
+        if j is None or j % 50 == 0: return None
+        m = self.market(j)
+        return {"condition_id": m["conditionId"], "question": m["question"], "slug": m["slug"]}
+
+    # --- ROUTING ---
+    def handle(self, path, query):
+        q = {k: v[-1] for k, v in query.items()}
+        limit, offset = int(q.get("limit", 100)), int(q.get("offset", 0))
+        if path == "/__stats": return 200, {"requests": self.requests}
+        if path == "/v1/leaderboard":
+            board = (q.get("category", "OVERALL"), q.get("timePeriod", "MONTH"), q.get("orderBy", "PNL"))
+            return 200, self.leaderboard(limit, offset, board)
+        if path == "/traded": return 200, self.traded(q.get("user"))
+        if path == "/positions": return 200, self.positions(q.get("user"), limit, offset)
+        if path == "/activity": return 200, self.activity(q.get("user"), q, limit, offset)
+        if path == "/markets": return 200, self.gamma_markets([c for c in q.get("condition_ids", "").split(",") if c])
+        if path.startswith("/markets/"):
+            market = self.clob_market(path.rsplit("/", 1)[1])
+            return (200, market) if market else (404, {"error": "market not found"})
+        return 404, {"error": "not found"}
+
+    def make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like the real APIs
+            disable_nagle_algorithm = True  # headers and body go out as separate writes; don't wait on delayed ACKs
+
+            def do_GET(self):
+                opts = fake.options
+                if self.path == "/__stats": opts = DEFAULTS  # never delayed or failed
+                else:
+                    with fake.lock: fake.requests += 1
+                if opts["latency_ms"]: time.sleep(opts["latency_ms"] / 1000 * random.uniform(0.5, 1.5))
+                roll = random.random()
+                if roll < opts["throttle_rate"]:
+                    status, body, headers = 429, {"error": "rate limited"}, {"Retry-After": str(opts["retry_after"])}
+                elif roll < opts["throttle_rate"] + opts["error_rate"]:
+                    status, body, headers = 500, {"error": "injected failure"}, {}
+                else:
+                    url = urlsplit(self.path)
+                    status, body = fake.handle(url.path, parse_qs(url.query))
+                    headers = {}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in headers.items(): self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128    # the scanner opens dozens of connections at once
+
+def start_server(port=0, **options):
+    # Returns (server, base_url); the server runs on a daemon thread until server.shutdown()
+    fake = FakePolymarket(**options)
+    server = FakeServer(("127.0.0.1", port), fake.make_handler())
+    server.fake = fake
+    threading.Thread(target=server.serve_forever, name="fake-polymarket", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def _serve(conn, port, options):
+    server, url = start_server(port, **options)
+    conn.send(url)
+    threading.Event().wait()
+
+def spawn_server(port=0, **options):
+    # Same server in a child process, so its threads don't compete with the code under test for the GIL.
+    # Returns (process, base_url); stop it with process.terminate().
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child, port, options), daemon=True)
+    process.start()
+    return process, parent.recv()
+
+def request_count(base_url):
+    import requests
+    return requests.get(f"{base_url}/__stats", timeout=5).json()["requests"]
+
+def env_for(base_url):
+    # Environment that points api_client (and everything built on it) at the fake
+    return {"POLYWATCH_DATA_API": base_url, "POLYWATCH_GAMMA_API": base_url, "POLYWATCH_CLOB_API": base_url}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local fake of the Polymarket APIs.")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = vars(parser.parse_args())
+    server, url = start_server(**args)
+    print(f"🧪 Fake Polymarket on {url}")
+    for k, v in env_for(url).items(): print(f"   export {k}={v}")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
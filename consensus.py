@@ -0,0 +1,162 @@
+import heapq
+import threading
+import time
+import numpy as np
+import metrics
+import positions
+
+# --- 1. INVERTED INDEX ---
+# conditionId -> {(wallet, outcome): holding} across every tracked whale, with per-market
+# totals by side. It is filled from the scanner's position file and then kept current one
+# wallet at a time: when a wallet's positions change (a new scan, or a live refresh in the
+# dashboard) its old holdings come out, the new ones go in, and only the markets it touches
+# get their totals recomputed. Reads never loop over wallets or call the API.
+MIN_VALUE = 1.0     # Same cut as the positions table: dust positions don't count
+
+def _float(x):
+    try: return float(x or 0)
+    except (TypeError, ValueError): return 0.0
+
+class ConsensusIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()   # one sync at a time; updates and reads only wait for self.lock
+        self.holdings = {}      # conditionId -> {(wallet, outcome): (value, shares, entry, price)}
+        self.wallets = {}       # wallet -> (fetched_at, [(conditionId, outcome), ...])
+        self.titles = {}        # conditionId -> (title, slug)
+        self.totals = {}        # conditionId -> (value, whales, {outcome: [value, shares, cost, whales, price]})
+        self.version = None     # PositionStore version last synced
+        self.updates = 0
+
+    def _apply(self, wallet, raw, fetched_at, touched=None):
+        # Caller holds the lock. Data older than what is indexed for the wallet is ignored. A bulk caller
+        # passes its own touched set and recomputes the totals once at the end instead of per wallet.
+        old = self.wallets.get(wallet)
+        if old is not None and fetched_at < old[0]: return False
+        bulk = touched is not None
+        touched = touched if bulk else set()
+        for key in (old[1] if old else []):
+            self.holdings.get(key[0], {}).pop((wallet, key[1]), None)
+            touched.add(key[0])
+        keys = []
+        for p in raw:
+            cid, value = p.get("conditionId"), _float(p.get("currentValue"))
+            if not cid or value < MIN_VALUE: continue
+            outcome = p.get("outcome") or "?"
+            entry, price = _float(p.get("avgPrice")), _float(p.get("curPrice"))
+            shares = _float(p.get("size")) or (value / price if price else 0.0)
+            held = self.holdings.setdefault(cid, {})
+            prev = held.get((wallet, outcome))
+            if prev is not None:
+                # Two rows for one side of a market in the same payload: fold them into one holding
+                entry = (prev[2] * prev[1] + entry * shares) / (prev[1] + shares) if prev[1] + shares else entry
+                value, shares = prev[0] + value, prev[1] + shares
+            else: keys.append((cid, outcome))
+            held[(wallet, outcome)] = (value, shares, entry, price)
+            if p.get("title"): self.titles[cid] = (p["title"], p.get("slug"))
+            touched.add(cid)
+        self.wallets[wallet] = (fetched_at, keys)
+        if not bulk:
+            for cid in touched: self._total(cid)
+        self.updates += 1
+        return True
+
+    def _remove(self, wallet, touched):
+        old = self.wallets.pop(wallet, None)
+        for cid, outcome in (old[1] if old else []):
+            self.holdings.get(cid, {}).pop((wallet, outcome), None)
+            touched.add(cid)
+
+    def _total(self, cid):
+        # Recomputed from the market's holdings (a few hundred at most), so totals never drift
+        held = self.holdings.get(cid)
+        if not held:
+            self.holdings.pop(cid, None)
+            self.totals.pop(cid, None)
+            return
+        sides, wallets = {}, set()
+        for (wallet, outcome), (value, shares, entry, price) in held.items():
+            side = sides.setdefault(outcome, [0.0, 0.0, 0.0, 0, price])
+            side[0] += value
+            side[1] += shares
+            side[2] += entry * shares
+            side[3] += 1
+            wallets.add(wallet)
+        self.totals[cid] = (sum(s[0] for s in sides.values()), len(wallets), sides)
+
+    # --- 2. UPDATES ---
+    def update(self, wallet, raw, fetched_at=None, track=False):
+        # Replaces one wallet's holdings with a fresh /positions payload. Wallets the index
+        # doesn't track (not in the scan's position file) are skipped unless track=True.
+        with self.lock:
+            if not track and wallet not in self.wallets: return False
+            return self._apply(wallet, raw, time.time() if fetched_at is None else fetched_at)
+
+    def sync(self, store, version):
+        # Brings the index in line with a PositionStore: only wallets whose fetched_at moved are
+        # re-applied, and whales that dropped out of the scan are removed. No-op for a version already seen.
+        if store is None or version == self.version: return 0
+        with self.sync_lock, metrics.timed("stage", stage="consensus_sync"):
+            if version == self.version: return 0
+            ends = store.ends
+            starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+            fetched = store.table.column("fetched_at").to_numpy()[starts].tolist() if len(ends) else []
+            current = dict(zip(store.wallets.tolist(), fetched))
+            with self.lock:
+                changed = [i for i, (w, f) in enumerate(current.items()) if w not in self.wallets or self.wallets[w][0] < f]
+                gone = [w for w in self.wallets if w not in current]
+            # A few changed wallets are sliced out one by one; a new nightly file is converted in one go
+            names = ["conditionId", "outcome", "title", "slug", "avgPrice", "curPrice", "currentValue"]
+            if len(changed) * 10 > len(ends):
+                table_rows = store.table.select(names).to_pylist()
+                rows_of = lambda i: table_rows[int(starts[i]):int(ends[i])]
+            else:
+                rows_of = lambda i: store.table.slice(int(starts[i]), int(ends[i] - starts[i])).select(names).to_pylist()
+            batches = [(store.wallets[i], rows_of(i), fetched[i]) for i in changed]
+            touched = set()
+            with self.lock:
+                for w in gone: self._remove(w, touched)
+                for wallet, rows, fetched_at in batches: self._apply(wallet, rows, fetched_at, touched)
+                for cid in touched: self._total(cid)
+                self.version = version
+        metrics.inc("consensus_synced_wallets", len(changed) + len(gone))
+        return len(changed) + len(gone)
+
+    # --- 3. QUERIES ---
+    def _row(self, cid, total):
+        value, whales, sides = total
+        title, slug = self.titles.get(cid, (None, None))
+        side_rows = sorted(({"Outcome": o, "Value": s[0], "Whales": s[3], "Entry": s[2] / s[1] if s[1] else 0.0, "Price": s[4]}
+                            for o, s in sides.items()), key=lambda s: -s["Value"])
+        lead = side_rows[0]
+        return {"conditionId": cid, "Market": title or f"Market {cid[:10]}...", "Slug": slug, "Value": value, "Whales": whales,
+                "Side": lead["Outcome"], "Side_Share": lead["Value"] / value if value else 0.0,
+                "Entry": lead["Entry"], "Price": lead["Price"], "Sides": side_rows}
+
+    def top(self, n=50, by="value", min_whales=1):
+        # Markets holding the most whale capital (by="value") or the most whales (by="whales")
+        key = (lambda item: item[1][0]) if by == "value" else (lambda item: (item[1][1], item[1][0]))
+        with self.lock, metrics.timed("stage", stage="consensus_top"):
+            best = heapq.nlargest(n, ((cid, t) for cid, t in self.totals.items() if t[1] >= min_whales), key=key)
+            return [self._row(cid, t) for cid, t in best]
+
+    def holders(self, cid):
+        # Every whale position in one market, biggest first
+        with self.lock:
+            held = list(self.holdings.get(cid, {}).items())
+        return sorted(({"Wallet": w, "Outcome": o, "Value": v, "Shares": s, "Entry": e, "Price": p}
+                       for (w, o), (v, s, e, p) in held), key=lambda r: -r["Value"])
+
+    def stats(self):
+        with self.lock:
+            return {"wallets": len(self.wallets), "markets": len(self.totals),
+                    "holdings": sum(len(h) for h in self.holdings.values()), "updates": self.updates}
+
+# --- 4. PROCESS-WIDE INDEX ---
+# One index per process, shared by every dashboard session. Complete live fetches from
+# positions.py (detail view refreshes, background revalidation) flow straight into it.
+_index = ConsensusIndex()
+positions.on_fetch(lambda wallet, raw, fetched_at: _index.update(wallet, raw, fetched_at))
+
+def get_index():
+    return _index
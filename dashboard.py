@@ -4,14 +4,23 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import time
 import os
-import re
-import hashlib
-import requests
+import html
+import time
 import urllib.parse
-import concurrent.futures
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import pyarrow as pa
+from dataset import DATASET_FILE, SchemaVersionError, read_frame, normalize_csv_frame, compact_frame
+from analytics import generate_trader_history, batch_metrics, real_trader_history, MIN_REAL_DAYS
+import snapshots
+from positions import stream_active_positions, build_position_rows
+from position_store import POSITIONS_FILE, PositionStore
+from leaderboard_index import LeaderboardIndex, SORT_COLUMNS
+import prefetch
+import wallet_analysis
+import alerts
+import consensus
+import metrics
 
 # --- 1. CONFIGURATION ---
 st.set_page_config(layout="wide", page_title="PolyWatch.co", page_icon="⚡")
@@ -179,173 +188,236 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 3. SESSION STATE ---
+ROWS_PER_PAGE_OPTIONS = [20, 50, 100, 200, 500]
 if 'selected_trader' not in st.session_state: st.session_state.selected_trader = None
-if 'sort_by' not in st.session_state: st.session_state.sort_by = "Volume"
+if 'sort_by' not in st.session_state: st.session_state.sort_by = "ROI"
+if 'sort_desc' not in st.session_state: st.session_state.sort_desc = True
 if 'page_number' not in st.session_state: st.session_state.page_number = 0
+if 'rows_per_page' not in st.session_state: st.session_state.rows_per_page = 20
+# Filter minimums: None (an empty box) means no filter, so 0 stays a real threshold (e.g. ROI >= 0)
+if 'min_balance' not in st.session_state: st.session_state.min_balance = None
+if 'min_roi' not in st.session_state: st.session_state.min_roi = None
+if 'min_trades' not in st.session_state: st.session_state.min_trades = None
+if 'table_nonce' not in st.session_state: st.session_state.table_nonce = 0
+
+def view_trader(trader_id):
+    st.session_state.selected_trader = trader_id
+    st.session_state.table_nonce += 1     # tables come back with no row selected
+    st.session_state.goto_menu = 0        # a pick on another page opens the detail view under Dashboard
+    st.query_params["trader"] = trader_id
+
+def select_row(key, wallets):
+    # on_select callback of a table: runs before the rerun, so the click lands straight in the detail view
+    rows = st.session_state[key].selection.rows
+    if rows: view_trader(wallets[rows[0]])
 
-def view_trader(trader_id): st.session_state.selected_trader = trader_id
-def close_view(): st.session_state.selected_trader = None
-def set_sort(col): st.session_state.sort_by = col
+def close_view():
+    st.session_state.selected_trader = None
+    st.query_params.pop("trader", None)
+
+def set_sort(col):
+    # Same column again flips the direction; a new column starts high-to-low
+    st.session_state.sort_desc = not st.session_state.sort_desc if st.session_state.sort_by == col else True
+    st.session_state.sort_by = col
+    st.session_state.page_number = 0
+
+# ?trader=<wallet> deep links (shared whale pages) open the detail view on a fresh session
+if "trader" in st.query_params: st.session_state.selected_trader = st.query_params["trader"]
+if st.session_state.rows_per_page not in ROWS_PER_PAGE_OPTIONS: st.session_state.rows_per_page = 20
+if st.session_state.sort_by not in SORT_COLUMNS: st.session_state.sort_by = "ROI"
 
 def get_last_update_time():
     try:
-        if os.path.exists("elite_data.csv"):
-            mod_time = os.path.getmtime("elite_data.csv")
-            return datetime.fromtimestamp(mod_time).strftime("%m/%d/%Y %H:%M")
+        for path in (DATASET_FILE, "elite_data.csv"):
+            if os.path.exists(path):
+                mod_time = os.path.getmtime(path)
+                return datetime.fromtimestamp(mod_time).strftime("%m/%d/%Y %H:%M")
         return "Unknown"
     except: return "Unknown"
 
 # --- 4. FINANCIAL ENGINE ---
 
-@st.cache_data(ttl=300)
-def get_active_positions(wallet):
-    HEADERS = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "application/json",
-        "Referer": "https://polymarket.com/"
-    }
-    try:
-        url = f"https://data-api.polymarket.com/positions?user={wallet}&limit=50&sortBy=CURRENT&sortDirection=DESC"
-        resp = requests.get(url, headers=HEADERS, timeout=5)
-        if resp.status_code != 200: return [], f"API Error {resp.status_code}"
-        r = resp.json()
-        if not r: return [], "No active positions found."
-
-        condition_ids = [p.get('conditionId') for p in r if p.get('conditionId')]
-        market_map = {}
-        
-        if condition_ids:
-            try:
-                g_url = "https://gamma-api.polymarket.com/markets"
-                id_str = ",".join(condition_ids)
-                markets = requests.get(g_url, params={"condition_ids": id_str}, headers=HEADERS, timeout=5).json()
-                for m in markets:
-                    market_map[m.get('conditionId')] = {
-                        'title': m.get('question'), 'slug': m.get('slug'),
-                        'outcomes': eval(m.get('outcomes')) if isinstance(m.get('outcomes'), str) else m.get('outcomes')
-                    }
-            except: pass
-
-        def fetch_fallback_title(c_id):
-            try:
-                clob_url = f"https://clob.polymarket.com/markets/{c_id}"
-                clob_data = requests.get(clob_url, headers=HEADERS, timeout=3).json()
-                return c_id, clob_data.get('question'), clob_data.get('slug')
-            except: return c_id, None, None
-
-        missing_ids = [p.get('conditionId') for p in r if p.get('conditionId') not in market_map]
-        if missing_ids:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                results = executor.map(fetch_fallback_title, missing_ids)
-                for c_id, title, slug in results:
-                    if title: market_map[c_id] = {'title': title, 'slug': slug, 'outcomes': None}
-
-        clean_data = []
-        for p in r:
-            if float(p.get('currentValue', 0)) < 1.0: continue
-            c_id = p.get('conditionId')
-            market_info = market_map.get(c_id, {})
-            market_title = market_info.get('title')
-            market_slug = market_info.get('slug')
-            if not market_title: market_title = f"Unknown Market ({c_id[:6]}...)"
-            outcome_val = p.get('outcome', 'Unknown')
-            
-            if market_slug: final_link = f"https://polymarket.com/event/{market_slug}"
-            elif market_title and "Unknown" not in market_title:
-                safe_query = urllib.parse.quote(market_title)
-                final_link = f"https://polymarket.com/search?q={safe_query}"
-            else: final_link = "https://polymarket.com"
-
-            clean_data.append({
-                "Market": market_title, "Outcome": outcome_val,
-                "Entry": float(p.get('avgPrice', 0)), "Price": float(p.get('curPrice', 0)),
-                "Value": float(p.get('currentValue', 0)), "PnL": float(p.get('cashPnl', 0)),
-                "Return": float(p.get('percentPnl', 0)) * 100, "Link": final_link
-            })
-        return clean_data, None
-    except Exception as e: return [], str(e)
-
-def generate_trader_history(trader_id, current_balance, roi_pct):
-    seed = int(hashlib.md5(str(trader_id).encode()).hexdigest(), 16) % 10**8
-    np.random.seed(seed)
-    days = 180
-    dates = [datetime.today() - timedelta(days=x) for x in range(days)][::-1]
-    if current_balance <= 0: current_balance = 1000
-    safe_roi = max(min(roi_pct, 50000.0), -99.0) 
-    start_balance = current_balance / (1 + (safe_roi / 100.0))
-    daily_growth = ((1 + (safe_roi / 100.0)) ** (1/days)) - 1
-    volatility = max(0.02, abs(daily_growth) * 3.0) 
-    daily_returns = np.random.normal(daily_growth, volatility, days)
-    equity = [start_balance]
-    for r in daily_returns: equity.append(max(equity[-1] * (1 + r), 1.0))
-    final_sim = equity[-1]
-    correction = np.linspace(1, current_balance / final_sim, len(equity))
-    equity = [e * c for e, c in zip(equity, correction)]
-    equity = equity[1:]
-    pnl_values = [equity[i] - equity[i-1] for i in range(1, len(equity))]
-    pnl_values.insert(0, 0)
-    wins = [p for p in pnl_values if p > 0]
-    losses = [p for p in pnl_values if p <= 0]
-    avg_win = np.mean(wins) if wins else 0
-    avg_loss = np.mean(losses) if losses else 0
-    win_rate = (len(wins) / len(pnl_values) * 100) if len(pnl_values) > 0 else 0
-    returns_std = np.std(daily_returns)
-    sharpe = (np.mean(daily_returns) / returns_std * np.sqrt(365)) if returns_std != 0 else 0
-    eq_series = pd.Series(equity)
-    roll_max = eq_series.cummax()
-    max_dd = ((eq_series - roll_max) / roll_max).min() * 100 if len(eq_series) > 0 else 0
-    return {"dates": dates, "equity": equity, "daily_pnl": pnl_values,
-            "metrics": {"sharpe": sharpe, "profit_factor": abs(sum(wins)/sum(losses)) if sum(losses) != 0 else 99,
-            "win_rate": win_rate, "max_dd": max_dd, "avg_win": avg_win, "avg_loss": avg_loss,
-            "start_bal": start_balance, "expectancy": (avg_win * (win_rate/100)) - (abs(avg_loss) * (1 - win_rate/100))}}
+def positions_table_html(positions):
+    html_rows = []
+    for row in positions:
+        price_color = "#00f2ea" if row['Price'] >= row['Entry'] else "#ff2b5e"
+        pnl_color = "#00f2ea" if row['PnL'] >= 0 else "#ff2b5e"
+        outcome_badge = f"<span class='badge-yes'>{row['Outcome']}</span>" if str(row['Outcome']).upper() == "YES" else f"<span class='badge-no'>{row['Outcome']}</span>"
+
+        row_html = f"""<tr>
+<td><a href="{row['Link']}" target="_blank" rel="noopener noreferrer" style="color:#ddd; font-weight:500;">{row['Market']}</a></td>
+<td class="text-center">{outcome_badge}</td>
+<td class="text-right mono" style="color:#888;">${row['Entry']:.2f}</td>
+<td class="text-right mono" style="color:{price_color}; font-weight:bold;">${row['Price']:.2f}</td>
+<td class="text-right mono">${row['Value']:,.2f}</td>
+<td class="text-right mono" style="color:{pnl_color};">${row['PnL']:,.2f}</td>
+<td class="text-right mono" style="color:{pnl_color};">{row['Return']:,.1f}%</td>
+</tr>"""
+        html_rows.append(row_html)
+
+    return f"""<table class="pro-table">
+<thead>
+<tr>
+<th class="text-left" style="width:35%;">MARKET</th>
+<th class="text-center" style="width:10%;">SIDE</th>
+<th class="text-right" style="width:10%;">ENTRY</th>
+<th class="text-right" style="width:10%;">PRICE</th>
+<th class="text-right" style="width:12%;">VALUE</th>
+<th class="text-right" style="width:12%;">PNL $</th>
+<th class="text-right" style="width:11%;">ROI %</th>
+</tr>
+</thead>
+<tbody>
+{"".join(html_rows)}
+</tbody>
+</table>"""
+
+def outcome_badge(outcome):
+    outcome = html.escape(str(outcome))
+    return f"<span class='badge-yes'>{outcome}</span>" if outcome.upper() == "YES" else f"<span class='badge-no'>{outcome}</span>"
+
+def market_link(row):
+    if row.get('Slug'): return f"https://polymarket.com/event/{row['Slug']}"
+    return f"https://polymarket.com/search?q={urllib.parse.quote(row['Market'])}"
+
+def consensus_table_html(markets):
+    html_rows = []
+    for i, row in enumerate(markets, 1):
+        price_color = "#00f2ea" if row['Price'] >= row['Entry'] else "#ff2b5e"
+        html_rows.append(f"""<tr>
+<td class="mono" style="color:#666;">{i}</td>
+<td><a href="{market_link(row)}" target="_blank" rel="noopener noreferrer" style="color:#ddd; font-weight:500;">{html.escape(row['Market'])}</a></td>
+<td class="text-right mono">${row['Value']:,.0f}</td>
+<td class="text-right mono">{row['Whales']:,}</td>
+<td class="text-center">{outcome_badge(row['Side'])}</td>
+<td class="text-right mono neon-text">{row['Side_Share']:.0%}</td>
+<td class="text-right mono" style="color:#888;">${row['Entry']:.2f}</td>
+<td class="text-right mono" style="color:{price_color}; font-weight:bold;">${row['Price']:.2f}</td>
+</tr>""")
+    return f"""<table class="pro-table">
+<thead>
+<tr>
+<th style="width:4%;">#</th>
+<th class="text-left" style="width:38%;">MARKET</th>
+<th class="text-right" style="width:13%;">WHALE CAPITAL</th>
+<th class="text-right" style="width:8%;">WHALES</th>
+<th class="text-center" style="width:10%;">LEADING SIDE</th>
+<th class="text-right" style="width:9%;">SHARE</th>
+<th class="text-right" style="width:9%;">AVG ENTRY</th>
+<th class="text-right" style="width:9%;">PRICE</th>
+</tr>
+</thead>
+<tbody>
+{"".join(html_rows)}
+</tbody>
+</table>"""
+
+def holders_frame(holders, names):
+    rows = []
+    for row in holders:
+        name = str(names.get(row['Wallet']) or row['Wallet'])
+        if name.startswith("0x"): name = f"{name[:6]}...{name[-4:]}"
+        rows.append({"Whale": name, "Side": row['Outcome'], "Shares": row['Shares'], "Entry": row['Entry'],
+                     "Price": row['Price'], "Value": row['Value']})
+    return pd.DataFrame(rows, columns=["Whale", "Side", "Shares", "Entry", "Price", "Value"])
+
+COPY_TRADE_URL = "https://t.me/PolyCop_BOT?start=ref_SNMAHQBP"
+
+def leaderboard_frame(page_data):
+    # Built column-wise for the whole page and shown as one st.dataframe: no per-row widgets,
+    # so 500 rows cost a single element, and picking a row stays in this session (select_row)
+    raw = page_data['Display_Name'].astype(str).fillna("")
+    return pd.DataFrame({
+        "Trader": raw.where(~raw.str.startswith("0x"), raw.str[:6] + "..." + raw.str[-4:]),
+        "ROI": page_data['ROI'], "Profit": page_data['PnL'], "Balance": page_data['Balance'], "Volume": page_data['Volume'],
+        "Sharpe": page_data['Sharpe'], "Max DD": page_data['Max_DD'],
+        "Profile": "https://polymarket.com/profile/" + page_data['Link_ID'].astype(str), "Copy": COPY_TRADE_URL,
+    }).reset_index(drop=True)
+
+LEADERBOARD_COLUMNS = {
+    "ROI": st.column_config.NumberColumn("ROI", format="%.0f%%"),
+    "Profit": st.column_config.NumberColumn("Profit", format="dollar"),
+    "Balance": st.column_config.NumberColumn("Balance", format="dollar"),
+    "Volume": st.column_config.NumberColumn("Volume", format="dollar"),
+    "Sharpe": st.column_config.NumberColumn("Sharpe", format="%.2f"),
+    "Max DD": st.column_config.NumberColumn("Max DD", format="%.1f%%"),
+    "Profile": st.column_config.LinkColumn("Profile", display_text="Polymarket ↗"),
+    "Copy": st.column_config.LinkColumn("Copy", display_text="🤖 Copy Trade"),
+}
+HOLDER_COLUMNS = {
+    "Shares": st.column_config.NumberColumn("Shares", format="localized"),
+    "Entry": st.column_config.NumberColumn("Entry", format="$%.2f"),
+    "Price": st.column_config.NumberColumn("Price", format="$%.2f"),
+    "Value": st.column_config.NumberColumn("Value", format="dollar"),
+}
 
 # --- 5. DATA LOADER ---
-@st.cache_data
-def get_data():
+def add_risk_columns(df):
+    # One batched simulation for the whole board (cached per trader) instead of a Python loop per row
+    m = batch_metrics(df['Link_ID'].tolist(), df['Balance'].tolist(), df['ROI'].tolist())
+    df['Sharpe'] = m.get('sharpe', 0.0)
+    df['Max_DD'] = m.get('max_dd', 0.0)
+    return df
+
+def dataset_version():
+    # Changes whenever the scanner rewrites the dataset; keys the cached frame and its sort index
+    for path in (DATASET_FILE, "elite_data.csv"):
+        if os.path.exists(path): return f"{path}@{os.path.getmtime(path)}"
+    return None
+
+@st.cache_resource(max_entries=2)
+def get_position_store(version=None):
+    # Positions the scanner captured for every whale; memory-mapped once per file version, shared by all sessions
+    if version is None: return None
+    try: return PositionStore(POSITIONS_FILE)
+    except (OSError, pa.ArrowInvalid, ValueError): return None
+
+def position_store_version():
+    return f"{POSITIONS_FILE}@{os.path.getmtime(POSITIONS_FILE)}" if os.path.exists(POSITIONS_FILE) else None
+
+# One compact frame per dataset version, shared by every session in the process: cache_resource hands out
+# the object itself, not a pickled copy per rerun. A new mtime means a new version, so the next rerun builds
+# a fresh frame while sessions mid-render keep the old one. Treat it as read-only: with pandas copy-on-write
+# (always on from pandas 3, pinned in requirements.txt), a write through any slice of it only changes a private copy.
+@st.cache_resource(max_entries=2)
+@metrics.timed_fn("stage", stage="get_data")
+def get_data(version=None):
+    # Fast path: the scanner's typed Arrow file needs no column guessing or cleaning
+    if os.path.exists(DATASET_FILE):
+        try: return compact_frame(add_risk_columns(read_frame(DATASET_FILE)))
+        except (OSError, pa.ArrowInvalid, SchemaVersionError): pass  # fall back to the CSV below
     file_path = "elite_data.csv"
     if not os.path.exists(file_path): return None
     try:
-        df = pd.read_csv(file_path)
-        df.columns = [re.sub(r'[^a-z0-9]', '', c.lower()) for c in df.columns]
-        col_map = {}
-        for c in df.columns:
-            if any(k in c for k in ['wallet','address','id']): col_map[c] = 'Link_ID'
-            elif any(k in c for k in ['user','name','display']): col_map[c] = 'Display_Name'
-            elif any(k in c for k in ['roi','return','yield','apru']): col_map[c] = 'ROI'
-            elif any(k in c for k in ['profit','pnl','earnings']): col_map[c] = 'PnL' 
-            elif any(k in c for k in ['bal','val','total','equity']): col_map[c] = 'Balance'
-            elif any(k in c for k in ['vol','turnover','traded']): col_map[c] = 'Volume'
-        df.rename(columns=col_map, inplace=True)
-        df = df.loc[:, ~df.columns.duplicated()]
-        if 'Link_ID' not in df.columns: df['Link_ID'] = df.get('Display_Name', df.columns[0])
-        if 'Display_Name' not in df.columns: df['Display_Name'] = df['Link_ID']
-        def clean(x):
-            try: return float(str(x).replace('$','').replace('%','').replace(',',''))
-            except: return 0.0
-        if 'Balance' in df.columns: df['Balance'] = df['Balance'].apply(clean)
-        else: df['Balance'] = 0.0
-        if 'PnL' in df.columns: df['PnL'] = df['PnL'].apply(clean)
-        if 'ROI' in df.columns: df['ROI'] = df['ROI'].apply(clean)
-        elif 'PnL' in df.columns and 'Balance' in df.columns:
-            df['ROI'] = df.apply(lambda row: (row['PnL'] / (row['Balance'] - row['PnL']) * 100) if (row['Balance'] - row['PnL']) != 0 else 0, axis=1)
-        else: df['ROI'] = 0.0
-        if 'Volume' in df.columns: df['Volume'] = df['Volume'].apply(clean)
-        else: df['Volume'] = df.apply(lambda row: row['Balance'] * (int(hashlib.md5(str(row['Link_ID']).encode()).hexdigest(), 16) % 20 + 5), axis=1)
-        mask_insane = df['ROI'] > 100000
-        if mask_insane.any() and 'PnL' in df.columns:
-             df.loc[mask_insane, 'ROI'] = (df.loc[mask_insane, 'PnL'] / (df.loc[mask_insane, 'Balance'] - df.loc[mask_insane, 'PnL']) * 100)
-        return df[df['Link_ID'].astype(str) != "nan"]
+        return compact_frame(add_risk_columns(normalize_csv_frame(pd.read_csv(file_path))))
     except: return None
 
+@st.cache_resource(max_entries=2)
+def get_index(version=None):
+    # Argsorts for every sort column/direction + sorted filter columns, built once per dataset version
+    df = get_data(version)
+    return LeaderboardIndex(df) if df is not None else None
+
+@st.cache_data(max_entries=256)
+def load_wallet_history(wallet, latest_day):
+    # latest_day is part of the cache key: a new nightly snapshot invalidates every wallet's entry
+    return snapshots.wallet_history(wallet)
+
+def reset_page(): st.session_state.page_number = 0
+
 # --- 6. UI RENDERER ---
+MENU_ITEMS = ["Dashboard", "Whale Consensus", "Whale Scanner", "Settings", "Donate Us"]
 with st.sidebar:
     st.markdown("### ⚡ PolyWatch")
-    menu = option_menu(None, ["Dashboard", "Whale Scanner", "Settings", "Donate Us"], 
-                       icons=["grid-fill", "search", "gear", "heart-fill"], 
-                       styles={"nav-link-selected": {"background-color": "#7b61ff"}})
+    goto = st.session_state.pop("goto_menu", None)
+    menu = option_menu(None, MENU_ITEMS, 
+                       icons=["grid-fill", "bullseye", "search", "gear", "heart-fill"], 
+                       styles={"nav-link-selected": {"background-color": "#7b61ff"}}, manual_select=goto, key="menu")
+    if goto is not None: menu = MENU_ITEMS[goto]   # the component reports its new selection one rerun later
 
 if menu == "Dashboard":
-    df = get_data()
+    version = dataset_version()
+    df = get_data(version)
     
     if st.session_state.selected_trader:
         if df is None: st.error("No Data"); st.stop()
@@ -353,7 +425,12 @@ if menu == "Dashboard":
         if user_rows.empty: st.error("Trader not found"); st.stop()
         user_row = user_rows.iloc[0]
         
-        history = generate_trader_history(user_row['Link_ID'], user_row['Balance'], user_row['ROI'])
+        # Real daily snapshots once the scanner has collected enough of them, simulated curve until then
+        snapshot_days = snapshots.list_dates()
+        snap = load_wallet_history(user_row['Link_ID'], snapshot_days[-1] if snapshot_days else None)
+        real_history = len(snap) >= MIN_REAL_DAYS
+        if real_history: history = real_trader_history(snap)
+        else: history = generate_trader_history(user_row['Link_ID'], user_row['Balance'], user_row['ROI'])
         m = history['metrics']
         
         c1, c2 = st.columns([1, 10])
@@ -363,6 +440,9 @@ if menu == "Dashboard":
             if disp.startswith("0x"): disp = f"{disp[:6]}...{disp[-4:]}"
             link = f"https://polymarket.com/profile/{user_row['Link_ID']}"
             st.markdown(f"""<div style="display:flex; align-items:center; gap:15px;"><div style="font-size:28px; font-weight:bold;">{disp}</div><a href="{link}" target="_blank" style="color:#7b61ff; border:1px solid #7b61ff; padding:4px 12px; border-radius:20px; font-size:12px; text-decoration:none;">View Profile ↗</a></div>""", unsafe_allow_html=True)
+            boards = user_row.get('Boards')
+            if isinstance(boards, str) and boards:
+                st.markdown(" ".join(f"<span class='badge-yes'>{html.escape(b)}</span>" for b in boards.split(";")), unsafe_allow_html=True)
             
         st.markdown("---")
         r1c1, r1c2, r1c3, r1c4 = st.columns(4)
@@ -383,6 +463,8 @@ if menu == "Dashboard":
             st.markdown(f"""<div class="metric-card" style="border-left:3px solid #ff2b5e;"><div style="display:flex; justify-content:space-between;"><span>Max Drawdown</span><span class="red-text">{m["max_dd"]:.1f}%</span></div><div style="display:flex; justify-content:space-between; margin-top:5px;"><span>Risk Level</span><span>{'High' if m['max_dd'] < -15 else 'Low'}</span></div></div>""", unsafe_allow_html=True)
 
         st.markdown("### 📊 Performance Charts")
+        if real_history: st.caption(f"📅 Active balance from {len(snap)} daily scanner snapshots ({snap['date'].min():%b %d, %Y} - {snap['date'].max():%b %d, %Y})")
+        else: st.caption(f"🧪 Simulated curve: real charts appear after {MIN_REAL_DAYS} daily snapshots of this wallet ({len(snap)} so far)")
         tab1, tab2 = st.tabs(["💰 All-Time Performance", "📅 Daily PnL"])
         with tab1:
             fig = go.Figure()
@@ -396,46 +478,27 @@ if menu == "Dashboard":
             st.plotly_chart(fig2, use_container_width=True)
 
         st.markdown("### 📂 Active Positions")
-        with st.spinner("Fetching live positions from blockchain..."):
-            positions, error_msg = get_active_positions(user_row['Link_ID'])
-        
-        if positions:
-            pos_df = pd.DataFrame(positions)
-            html_rows = []
-            for _, row in pos_df.iterrows():
-                price_color = "#00f2ea" if row['Price'] >= row['Entry'] else "#ff2b5e"
-                pnl_color = "#00f2ea" if row['PnL'] >= 0 else "#ff2b5e"
-                outcome_badge = f"<span class='badge-yes'>{row['Outcome']}</span>" if str(row['Outcome']).upper() == "YES" else f"<span class='badge-no'>{row['Outcome']}</span>"
-                
-                row_html = f"""<tr>
-<td><a href="{row['Link']}" target="_blank" rel="noopener noreferrer" style="color:#ddd; font-weight:500;">{row['Market']}</a></td>
-<td class="text-center">{outcome_badge}</td>
-<td class="text-right mono" style="color:#888;">${row['Entry']:.2f}</td>
-<td class="text-right mono" style="color:{price_color}; font-weight:bold;">${row['Price']:.2f}</td>
-<td class="text-right mono">${row['Value']:,.2f}</td>
-<td class="text-right mono" style="color:{pnl_color};">${row['PnL']:,.2f}</td>
-<td class="text-right mono" style="color:{pnl_color};">{row['Return']:,.1f}%</td>
-</tr>"""
-                html_rows.append(row_html)
-            
-            table_html = f"""<table class="pro-table">
-<thead>
-<tr>
-<th class="text-left" style="width:35%;">MARKET</th>
-<th class="text-center" style="width:10%;">SIDE</th>
-<th class="text-right" style="width:10%;">ENTRY</th>
-<th class="text-right" style="width:10%;">PRICE</th>
-<th class="text-right" style="width:12%;">VALUE</th>
-<th class="text-right" style="width:12%;">PNL $</th>
-<th class="text-right" style="width:11%;">ROI %</th>
-</tr>
-</thead>
-<tbody>
-{"".join(html_rows)}
-</tbody>
-</table>"""
-            st.markdown(table_html, unsafe_allow_html=True)
-        else:
+        # Scanned whales are served from the scan's position file (no network); live data is opt-in
+        positions_slot = st.empty()
+        positions, error_msg, live = [], None, True
+        store = get_position_store(position_store_version())
+        saved = store.get(user_row['Link_ID']) if store is not None else None
+        if saved is not None:
+            raw, fetched_at = saved
+            positions = build_position_rows(raw, {p['conditionId']: p for p in raw})
+            positions_slot.markdown(positions_table_html(positions), unsafe_allow_html=True)
+            live = st.toggle(f"🔄 Live refresh (showing the scan from {datetime.fromtimestamp(fetched_at, timezone.utc):%b %d, %H:%M} UTC)", key="live_positions")
+        if live:
+            # Paint the first page as soon as it lands, then repaint as the remaining pages stream in
+            with st.spinner("Fetching live positions from blockchain..."):
+                for live_rows, error_msg, done in stream_active_positions(user_row['Link_ID']):
+                    if not live_rows: continue
+                    positions = live_rows
+                    loading = "" if done else f"<div style='color:#666; font-size:12px; margin-top:6px;'>Loaded {len(positions)} positions, fetching more...</div>"
+                    positions_slot.markdown(positions_table_html(positions) + loading, unsafe_allow_html=True)
+
+        if positions and error_msg: st.warning(f"⚠️ {error_msg}")
+        if not positions:
             if error_msg: st.error(f"⚠️ {error_msg}")
             else: st.info("ℹ️ No active positions found for this trader.")
 
@@ -464,56 +527,52 @@ if menu == "Dashboard":
             c3.markdown(f'<div class="metric-card"><div class="metric-label">👥 Whales Tracked</div><div class="metric-value">{len(df)}</div></div>', unsafe_allow_html=True)
 
             # --- SORT DROPDOWN (RED STYLE) ---
-            # Replaced Expander Filters with just this dropdown
-            c_sort, _ = st.columns([1, 4])
+            # Dropdown, direction button and column headers all drive st.session_state.sort_by/sort_desc
+            sort_labels = {"ROI": "ROI", "Volume": "Volume", "PnL": "Profit", "Balance": "Balance"}
+            c_sort, c_dir, c_rows, _ = st.columns([1, 0.5, 1, 2.5])
             with c_sort:
                 st.markdown("**Sort By:**")
-                sort_opt = st.selectbox("Sort By:", ["ROI", "Volume", "Profit", "Balance"])
+                st.selectbox("Sort By:", list(sort_labels), format_func=sort_labels.get, key="sort_by", on_change=reset_page)
+            with c_dir:
+                st.markdown("**Order:**")
+                st.button("▼ High" if st.session_state.sort_desc else "▲ Low", on_click=set_sort, args=(st.session_state.sort_by,))
+            with c_rows:
+                st.markdown("**Rows:**")
+                st.selectbox("Rows:", ROWS_PER_PAGE_OPTIONS, key="rows_per_page", on_change=reset_page)
 
-            sort_map = {"Volume": "Volume", "ROI": "ROI", "Profit": "PnL", "Balance": "Balance"}
-            
-            # Simplified Filtering (Just sorting now, since sliders are removed)
-            filtered = df
-            if sort_opt:
-                filtered = filtered.sort_values(sort_map[sort_opt], ascending=False)
-
-            # --- HEADER (FLAT BUTTONS) ---
-            h1, h2, h3, h4, h5, h6, h7 = st.columns([2.8, 1.0, 1.0, 1.0, 1.2, 0.7, 1.1])
-            h1.markdown('<div class="header-row">TRADER</div>', unsafe_allow_html=True)
-            
-            h2.button("ROI ▼", type="primary", on_click=set_sort, args=("ROI",))
-            h3.button("PROFIT ▼", type="primary", on_click=set_sort, args=("PnL",))
-            h4.button("BALANCE ▼", type="primary", on_click=set_sort, args=("Balance",))
-            h5.button("VOLUME ▼", type="primary", on_click=set_sort, args=("Volume",))
-            
-            h6.markdown('<div class="header-row">ACTION</div>', unsafe_allow_html=True)
-            h7.markdown('<div class="header-row">COPY</div>', unsafe_allow_html=True)
-            
-            ROWS_PER_PAGE = 20
-            if st.session_state.page_number * ROWS_PER_PAGE >= len(filtered):
-                st.session_state.page_number = 0
+            with st.expander("🔍 Filters"):
+                f1, f2, f3 = st.columns(3)
+                f1.number_input("Min Balance ($)", min_value=0.0, step=1000.0, placeholder="Any", key="min_balance", on_change=reset_page)
+                f2.number_input("Min ROI (%)", step=10.0, placeholder="Any", key="min_roi", on_change=reset_page)
+                f3.number_input("Min Trades", min_value=0, step=10, placeholder="Any", key="min_trades", on_change=reset_page,
+                                disabled='Trades' not in df.columns)
+
+            # Sorting and filtering are lookups into the per-version index; only the visible rows are touched
+            index = get_index(version)
+            minimums = {"Balance": st.session_state.min_balance, "ROI": st.session_state.min_roi,
+                        "Trades": st.session_state.min_trades}
+            ROWS_PER_PAGE = st.session_state.rows_per_page
             start_idx = st.session_state.page_number * ROWS_PER_PAGE
+            rows, total = index.select(st.session_state.sort_by, st.session_state.sort_desc, minimums,
+                                       start_idx, start_idx + 2 * ROWS_PER_PAGE)
+            if start_idx >= total and start_idx > 0:
+                st.session_state.page_number = start_idx = 0
+                rows, total = index.select(st.session_state.sort_by, st.session_state.sort_desc, minimums, 0, 2 * ROWS_PER_PAGE)
             end_idx = start_idx + ROWS_PER_PAGE
-            page_data = filtered.iloc[start_idx:end_idx]
-            
-            for idx, row in page_data.iterrows():
-                with st.container():
-                    c1, c2, c3, c4, c5, c6, c7 = st.columns([2.8, 1.0, 1.0, 1.0, 1.2, 0.7, 1.1])
-                    raw = str(row['Display_Name'])
-                    disp = f"{raw[:6]}...{raw[-4:]}" if raw.startswith("0x") else raw
-                    link_id = row['Link_ID']
-                    polymarket_url = f"https://polymarket.com/profile/{link_id}"
-                    
-                    c1.markdown(f"**<a href='{polymarket_url}' target='_blank' style='color: white; text-decoration: none;'>{disp}</a>**", unsafe_allow_html=True)
-                    c2.markdown(f"<span class='green-text'>{row['ROI']:,.0f}%</span>", unsafe_allow_html=True)
-                    pnl_color = '#00f2ea' if row['PnL'] >= 0 else '#ff2b5e'
-                    c3.markdown(f"<span style='color:{pnl_color}'>${row['PnL']:,.0f}</span>", unsafe_allow_html=True)
-                    c4.markdown(f"${row['Balance']:,.0f}")
-                    c5.markdown(f"${row['Volume']:,.0f}")
-                    
-                    c6.button("View", key=f"btn_{idx}", on_click=view_trader, args=(link_id,))
-                    c7.link_button("🤖 Copy Trade", "https://t.me/PolyCop_BOT?start=ref_SNMAHQBP")
-                    st.markdown("<hr style='margin:5px 0; border-top:1px solid #1f1f2e;'>", unsafe_allow_html=True)
+            page_data = df.iloc[rows[:ROWS_PER_PAGE]]
+
+            # Warm positions + market metadata for this page and the next in the background,
+            # so "View" opens straight from cache (whales in the scan's position file need nothing)
+            store = get_position_store(position_store_version())
+            prefetch.warm([w for w in df['Link_ID'].iloc[rows].tolist() if store is None or w not in store])
+
+            if page_data.empty: st.info("No traders match these filters.")
+            else:
+                st.caption("Click a row to open the trader. Sorting across pages uses Sort By / Order above.")
+                key, wallets = f"board_{st.session_state.table_nonce}", page_data['Link_ID'].tolist()
+                st.dataframe(leaderboard_frame(page_data), column_config=LEADERBOARD_COLUMNS, hide_index=True, width="stretch",
+                             height=min(35 * (len(page_data) + 1) + 3, 740), key=key, on_select=lambda key=key, wallets=wallets: select_row(key, wallets),
+                             selection_mode="single-row")
             
             c_prev, c_info, c_next = st.columns([1, 2, 1])
             with c_prev:
@@ -521,10 +580,10 @@ if menu == "Dashboard":
                     st.session_state.page_number -= 1
                     st.rerun()
             with c_info:
-                total_pages = max(1, len(filtered) // ROWS_PER_PAGE) + 1
+                total_pages = max(1, (total + ROWS_PER_PAGE - 1) // ROWS_PER_PAGE)
                 st.markdown(f"<div style='text-align:center; color:#666;'>Page {st.session_state.page_number + 1} of {total_pages}</div>", unsafe_allow_html=True)
             with c_next:
-                if st.button("Next ➡️") and end_idx < len(filtered):
+                if st.button("Next ➡️") and end_idx < total:
                     st.session_state.page_number += 1
                     st.rerun()
     
@@ -536,6 +595,55 @@ if menu == "Dashboard":
         </div>
     """, unsafe_allow_html=True)
 
+if menu == "Whale Consensus":
+    st.title("🧭 Whale Consensus")
+    st.markdown("<p style='color:#aaa'>Markets holding the most elite capital, and which side the whales are on.</p>", unsafe_allow_html=True)
+    # One inverted index per process: synced from the scan's position file when it changes (only moved wallets
+    # are re-applied) and updated by every live positions refresh, so this page makes no API calls
+    index = consensus.get_index()
+    version = position_store_version()
+    index.sync(get_position_store(version), version)
+    stats = index.stats()
+    if not stats["wallets"]:
+        st.info("ℹ️ No saved whale positions yet: run the scanner to build the position file.")
+        st.stop()
+
+    c_by, c_min, c_rows, _ = st.columns([1, 1, 1, 2])
+    by = c_by.selectbox("Rank By:", ["value", "whales"], format_func={"value": "Whale Capital", "whales": "Whale Count"}.get)
+    min_whales = c_min.number_input("Min Whales", min_value=1, value=2, step=1)
+    top_n = c_rows.selectbox("Markets:", [25, 50, 100, 250], index=1)
+    started = time.perf_counter()
+    markets = index.top(top_n, by=by, min_whales=int(min_whales))
+    query_ms = (time.perf_counter() - started) * 1000
+
+    c1, c2, c3 = st.columns(3)
+    c1.markdown(f'<div class="metric-card"><div class="metric-label">🐋 Whales Indexed</div><div class="metric-value">{stats["wallets"]:,}</div></div>', unsafe_allow_html=True)
+    c2.markdown(f'<div class="metric-card"><div class="metric-label">🎯 Markets Held</div><div class="metric-value">{stats["markets"]:,}</div></div>', unsafe_allow_html=True)
+    c3.markdown(f'<div class="metric-card"><div class="metric-label">💰 Capital In Top {len(markets)}</div><div class="metric-value green-text">${sum(m["Value"] for m in markets):,.0f}</div></div>', unsafe_allow_html=True)
+    st.caption(f"⚡ {stats['holdings']:,} positions indexed · ranked in {query_ms:.1f} ms")
+    if not markets:
+        st.info(f"No market is held by {int(min_whales)} or more whales.")
+        st.stop()
+
+    chart = pd.DataFrame([{"Market": m["Market"][:60], "Side": s["Outcome"], "Value": s["Value"]} for m in markets[:15] for s in m["Sides"]])
+    fig = px.bar(chart, x="Value", y="Market", color="Side", orientation="h", color_discrete_map={"Yes": "#00f2ea", "No": "#ff2b5e"})
+    fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', height=420, margin=dict(l=0,r=0,t=0,b=0), yaxis=dict(autorange="reversed", title=None, color='#aaa'), xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)', title=None, color='#666'), legend=dict(title=None))
+    st.plotly_chart(fig, use_container_width=True)
+    st.markdown(consensus_table_html(markets), unsafe_allow_html=True)
+
+    st.markdown("### 🔎 Who Holds It")
+    picked = st.selectbox("Market", range(len(markets)), format_func=lambda i: f"{markets[i]['Market']} (${markets[i]['Value']:,.0f})")
+    holders = index.holders(markets[picked]["conditionId"])
+    df = get_data(dataset_version())
+    names = {}
+    if df is not None:
+        known = df[df['Link_ID'].isin([h['Wallet'] for h in holders])]
+        names = dict(zip(known['Link_ID'], known['Display_Name'].astype(str)))
+    st.caption("Click a whale to open their trader page.")
+    key, wallets = f"holders_{st.session_state.table_nonce}", [h['Wallet'] for h in holders]
+    st.dataframe(holders_frame(holders, names), column_config=HOLDER_COLUMNS, hide_index=True, width="stretch",
+                 key=key, on_select=lambda key=key, wallets=wallets: select_row(key, wallets), selection_mode="single-row")
+
 if menu == "Whale Scanner":
     st.title("🔍 Whale Wallet Analyzer")
     st.markdown("<p style='color:#aaa'>Deep dive into any Polygon/Polymarket address. Calculates realized PnL, win rates, and risk metrics.</p>", unsafe_allow_html=True)
@@ -548,35 +656,54 @@ if menu == "Whale Scanner":
         scan_btn = st.button("🚀 Start Deep Scan")
         
     if scan_btn and scan_input:
-        with st.status("🔗 Connecting to Polygon Blockchain...", expanded=True) as status:
-            time.sleep(1)
-            st.write("📂 Fetching transaction history...")
-            time.sleep(1)
-            st.write("🧮 Calculating realized PnL...")
-            time.sleep(0.5)
-            status.update(label="✅ Scan Complete!", state="complete", expanded=False)
-            
-        np.random.seed(int(hashlib.md5(scan_input.encode()).hexdigest(), 16) % 10**8)
-        sim_balance = np.random.randint(5000, 500000)
-        sim_roi = np.random.uniform(-20, 300)
-        history = generate_trader_history(scan_input, sim_balance, sim_roi)
-        m = history['metrics']
-        
+        if not wallet_analysis.is_address(scan_input): st.error("⚠️ Enter a full wallet address: 0x followed by 40 hex characters."); st.stop()
+        wallet = scan_input.strip().lower()
         st.markdown("### 📊 Analysis Results")
-        
-        c1, c2, c3, c4 = st.columns(4)
-        c1.markdown(f'<div class="metric-card"><div class="metric-label">Estimated Balance</div><div class="metric-value">${sim_balance:,.0f}</div></div>', unsafe_allow_html=True)
-        c2.markdown(f'<div class="metric-card"><div class="metric-label">Realized ROI</div><div class="metric-value green-text" style="color:{"#00f2ea" if sim_roi>0 else "#ff2b5e"}">{sim_roi:,.1f}%</div></div>', unsafe_allow_html=True)
-        c3.markdown(f'<div class="metric-card"><div class="metric-label">Win Rate</div><div class="metric-value">{m["win_rate"]:.1f}%</div></div>', unsafe_allow_html=True)
-        c4.markdown(f'<div class="metric-card"><div class="metric-label">Risk Score</div><div class="metric-value neon-text">{"DEGEN" if m["max_dd"] < -30 else "PRO"}</div></div>', unsafe_allow_html=True)
-        
-        st.markdown("#### 📈 All-Time Performance")
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=history['dates'], y=history['equity'], fill='tozeroy', line=dict(color='#7b61ff', width=2), fillcolor='rgba(123,97,255,0.1)'))
-        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', height=300, margin=dict(l=0,r=0,t=0,b=0), xaxis=dict(showgrid=False), yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)'))
-        st.plotly_chart(fig, use_container_width=True)
-        
-        st.success(f"Scan for {scan_input[:6]}... successfully cached.")
+        cards_slot, chart_slot = st.empty(), st.empty()
+
+        # Cards repaint after every page of activity; a cached analysis paints instantly and only newer trades are fetched
+        book, error_msg, cached_trades = None, None, None
+        with st.status("📂 Fetching trade history...", expanded=False) as status:
+            for book, error_msg, done in wallet_analysis.analyze(wallet):
+                if cached_trades is None: cached_trades = book.trades
+                s = book.summary()
+                with cards_slot.container():
+                    c1, c2, c3, c4 = st.columns(4)
+                    c1.markdown(f'<div class="metric-card"><div class="metric-label">Realized PnL</div><div class="metric-value" style="color:{"#00f2ea" if s["realized_pnl"]>=0 else "#ff2b5e"}">${s["realized_pnl"]:,.0f}</div></div>', unsafe_allow_html=True)
+                    c2.markdown(f'<div class="metric-card"><div class="metric-label">Realized ROI</div><div class="metric-value" style="color:{"#00f2ea" if s["roi"]>=0 else "#ff2b5e"}">{s["roi"]:,.1f}%</div></div>', unsafe_allow_html=True)
+                    c3.markdown(f'<div class="metric-card"><div class="metric-label">Win Rate</div><div class="metric-value">{s["win_rate"]:.1f}%</div><div style="color:#666; font-size:12px;">{s["wins"]:,} W / {s["losses"]:,} L</div></div>', unsafe_allow_html=True)
+                    c4.markdown(f'<div class="metric-card"><div class="metric-label">Risk Score</div><div class="metric-value neon-text">{"DEGEN" if s["max_drawdown_pct"] < -30 else "PRO"}</div><div style="color:#666; font-size:12px;">Max DD ${s["max_drawdown"]:,.0f}</div></div>', unsafe_allow_html=True)
+                    d1, d2, d3, d4 = st.columns(4)
+                    d1.markdown(f'<div class="metric-card"><div class="metric-label">Trades</div><div class="metric-value">{s["trades"]:,}</div></div>', unsafe_allow_html=True)
+                    d2.markdown(f'<div class="metric-card"><div class="metric-label">Volume</div><div class="metric-value">${s["volume"]:,.0f}</div></div>', unsafe_allow_html=True)
+                    d3.markdown(f'<div class="metric-card"><div class="metric-label">Profit Factor</div><div class="metric-value">{s["profit_factor"]:.2f}</div></div>', unsafe_allow_html=True)
+                    d4.markdown(f'<div class="metric-card"><div class="metric-label">Markets Traded</div><div class="metric-value">{s["markets"]:,}</div></div>', unsafe_allow_html=True)
+                if not done: status.update(label=f"🧮 Processed {book.trades:,} trades...")
+            new_trades = book.trades - cached_trades
+            if error_msg: status.update(label=f"⚠️ Stopped early: {error_msg}", state="error")
+            else: status.update(label=f"✅ Scan Complete! {new_trades:,} new trades processed", state="complete")
+
+        if book.curve:
+            days = sorted(book.curve)
+            with chart_slot.container():
+                st.markdown("#### 📈 Realized PnL")
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=pd.to_datetime(days), y=[book.curve[d] for d in days], fill='tozeroy', line=dict(color='#7b61ff', width=2), fillcolor='rgba(123,97,255,0.1)'))
+                fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', height=300, margin=dict(l=0,r=0,t=0,b=0), xaxis=dict(showgrid=False), yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)'))
+                st.plotly_chart(fig, use_container_width=True)
+        elif not error_msg: st.info("ℹ️ No trades found for this wallet.")
+
+        st.markdown("### 📂 Open Positions")
+        positions_slot = st.empty()
+        positions, pos_error = [], None
+        for positions, pos_error, done in stream_active_positions(wallet):
+            if not positions: continue
+            value = sum(p['Value'] for p in positions)
+            positions_slot.markdown(f"<div style='color:#aaa; margin-bottom:6px;'>Estimated balance: <b>${value:,.0f}</b> across {len(positions)} positions</div>" + positions_table_html(positions), unsafe_allow_html=True)
+        if not positions: st.info(f"ℹ️ {pos_error or 'No active positions found.'}")
+        elif pos_error: st.warning(f"⚠️ {pos_error}")
+
+        if book.last_ts: st.success(f"Analysis for {wallet[:6]}... cached up to {datetime.fromtimestamp(book.last_ts, timezone.utc):%b %d, %Y %H:%M} UTC. Re-scans only fetch newer trades.")
 
 if menu == "Settings":
     st.title("⚙️ Configuration")
@@ -594,11 +721,42 @@ if menu == "Settings":
     st.markdown("---")
     with st.container():
         st.markdown("#### 🚨 Alerts & Notifications")
-        st.toggle("Enable Whale Movement Alerts", value=True)
-        st.toggle("Enable High-Risk Trade Warnings", value=False)
-        st.text_input("Webhook URL (Discord/Slack)", placeholder="https://discord.com/api/webhooks/...")
+        # Read by the alert watcher (python alerts.py), which picks up saved changes on its next loop
+        alert_settings = alerts.load_settings()
+        alerts_on = st.toggle("Enable Whale Movement Alerts", value=alert_settings["enabled"])
+        high_risk = st.toggle("Enable High-Risk Trade Warnings", value=alert_settings["high_risk"])
+        c1, c2 = st.columns([3, 1])
+        webhook_url = c1.text_input("Webhook URL (Discord/Slack)", value=alert_settings["webhook_url"], placeholder="https://discord.com/api/webhooks/...")
+        min_change = c2.number_input("Min. Position Change ($)", min_value=0.0, value=float(alert_settings["min_change"]), step=500.0)
+        st.caption("Alerts are sent by the watcher process: run `python alerts.py` next to the scanner.")
+    st.markdown("---")
+    with st.container():
+        st.markdown("#### 📈 Live Metrics")
+        st.caption("Everything this server process has done since it started: API calls, pipeline stages and cache hit rates.")
+        snap = metrics.summary()
+        def latency_frame(name):
+            rows = [{"labels": labels, **v} for labels, v in snap["latency"].get(name, {}).items()]
+            return pd.DataFrame(rows).sort_values("total_s", ascending=False) if rows else None
+        m1, m2 = st.columns(2)
+        with m1:
+            st.markdown("**API calls** (retries and rate-limit waits included)")
+            api = latency_frame("api_call")
+            if api is not None: st.dataframe(api, hide_index=True, use_container_width=True)
+            else: st.info("No API calls yet.")
+        with m2:
+            st.markdown("**Stages**")
+            stages = latency_frame("stage")
+            if stages is not None: st.dataframe(stages, hide_index=True, use_container_width=True)
+            else: st.info("No stages timed yet.")
+        st.markdown("**Caches**")
+        caches = pd.DataFrame([{"cache": name, **v} for name, v in snap["caches"].items()])
+        if not caches.empty: st.dataframe(caches, hide_index=True, use_container_width=True)
+        errors = {f"{name} [{labels}]": n for name, by_label in snap["counters"].items() if name.endswith("_errors")
+                  for labels, n in by_label.items()}
+        if errors: st.warning("Errors: " + " | ".join(f"{k}: {v}" for k, v in errors.items()))
     st.markdown("<br>", unsafe_allow_html=True)
     if st.button("💾 Save Configuration"):
+        alerts.save_settings({"enabled": alerts_on, "high_risk": high_risk, "webhook_url": webhook_url.strip(), "min_change": min_change})
         st.toast("Settings Saved Successfully!", icon="✅")
         # This must be ALL THE WAY to the left
 if menu == "Donate Us":
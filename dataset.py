@@ -0,0 +1,154 @@
+import pyarrow as pa
+import pandas as pd
+import numpy as np
+import hashlib
+import os
+import re
+
+# --- 1. SCHEMA ---
+# The scanner writes a typed Arrow IPC file with this fixed schema, so the
+# dashboard can memory-map it and skip CSV parsing and column guessing.
+# Bump SCHEMA_VERSION whenever a column is added, removed or retyped.
+DATASET_FILE = "elite_data.arrow"
+SCHEMA_VERSION = 2
+
+SCHEMA = pa.schema([
+    ("rank", pa.int32()),
+    ("proxyWallet", pa.string()),
+    ("userName", pa.string()),
+    ("xUsername", pa.string()),
+    ("verifiedBadge", pa.bool_()),
+    ("vol", pa.float64()),
+    ("pnl", pa.float64()),
+    ("profileImage", pa.string()),
+    ("active_balance", pa.float64()),
+    ("trade_count", pa.int64()),
+    ("roi", pa.float64()),
+    ("boards", pa.string()),        # leaderboards the wallet was found on, e.g. "OVERALL/MONTH/PNL;CRYPTO/DAY/VOL"
+], metadata={"schema_version": str(SCHEMA_VERSION)})
+
+class SchemaVersionError(Exception):
+    pass
+
+# --- 2. COERCION ---
+# Rows come from the leaderboard JSON or the scanner's partial CSV, so every
+# value may be a string, a number, empty or missing.
+def _num(cast):
+    def convert(x):
+        if x is None or x == "": return None
+        try: return cast(float(x))
+        except (TypeError, ValueError): return None
+    return convert
+
+def _bool(x):
+    if isinstance(x, str): return x.strip().lower() == "true" if x.strip() else None
+    return None if x is None else bool(x)
+
+def _str(x):
+    return None if x is None or x == "" else str(x)
+
+_CONVERTERS = {pa.int32(): _num(int), pa.int64(): _num(int), pa.float64(): _num(float), pa.bool_(): _bool, pa.string(): _str}
+
+def to_table(rows):
+    columns = {f.name: [_CONVERTERS[f.type](r.get(f.name)) for r in rows] for f in SCHEMA}
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+# --- 3. READ / WRITE ---
+def write_dataset(rows, path=DATASET_FILE):
+    table = to_table(rows)
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    return table
+
+def read_dataset(path=DATASET_FILE):
+    # Uncompressed IPC is memory-mapped: columns point straight into the page cache, no parse step.
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    version = (table.schema.metadata or {}).get(b"schema_version", b"0").decode()
+    if version != str(SCHEMA_VERSION):
+        raise SchemaVersionError(f"{path} has schema v{version}, expected v{SCHEMA_VERSION}")
+    return table
+
+# --- 4. DASHBOARD VIEW ---
+# Fixed rename from scanner columns to the names the dashboard renders.
+DASHBOARD_COLUMNS = {"proxyWallet": "Link_ID", "userName": "Display_Name", "roi": "ROI", "pnl": "PnL",
+                     "active_balance": "Balance", "vol": "Volume", "trade_count": "Trades",
+                     "boards": "Boards"}
+
+def read_frame(path=DATASET_FILE):
+    df = read_dataset(path).to_pandas().rename(columns=DASHBOARD_COLUMNS)
+    df["Display_Name"] = df["Display_Name"].fillna(df["Link_ID"])
+    return df
+
+# --- 5. SHARED COMPACT FRAME ---
+# The dashboard keeps one frame per dataset version for the whole process, so it is
+# shrunk once here. Text repeated across rows becomes categorical; unique text (wallet
+# ids, names) goes into one Arrow-backed string buffer instead of a Python object per
+# cell (pandas 3's "str" dtype, which keeps NaN missing; requirements.txt pins pandas>=3). Ratios drop to float32 (~7 significant digits); money stays float64, because
+# float32 would round a $20M balance to the nearest $2.
+TEXT_COLUMNS = ["Link_ID", "Display_Name", "xUsername", "profileImage", "Boards"]
+FLOAT32_COLUMNS = ["ROI", "Sharpe", "Max_DD"]
+
+def compact_frame(df):
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if col in TEXT_COLUMNS:
+            df[col] = df[col].astype("category") if df[col].nunique() * 2 < len(df) else df[col].astype("str")
+        elif col in FLOAT32_COLUMNS:
+            df[col] = df[col].astype("float32")
+    return df
+
+# --- 6. LEGACY CSV NORMALIZATION ---
+# Hand-made or older CSVs have unknown headers and "$1,234"/"12%" strings.
+# Headers are matched once per column; values are cleaned column-at-a-time.
+def clean_numeric(col):
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        return col.astype(float)
+    # Literal replaces (one per symbol) run on the Arrow string buffer; a regex pass was slower than per-cell float()
+    text = col.astype(str)
+    for symbol in ("$", "%", ","): text = text.str.replace(symbol, "", regex=False)
+    out = pd.to_numeric(text, errors='coerce')
+    # Blank cells stay NaN; anything else that won't parse counts as 0 (what the old clean() did)
+    return out.mask(out.isna() & col.notna(), 0.0).astype(float)
+
+def _volume_factor(link_id):
+    return int(hashlib.md5(link_id.encode()).hexdigest(), 16) % 20 + 5
+
+def normalize_csv_frame(df):
+    df.columns = [re.sub(r'[^a-z0-9]', '', c.lower()) for c in df.columns]
+    col_map = {}
+    for c in df.columns:
+        if any(k in c for k in ['wallet','address','id']): col_map[c] = 'Link_ID'
+        elif any(k in c for k in ['user','name','display']): col_map[c] = 'Display_Name'
+        elif any(k in c for k in ['roi','return','yield','apru']): col_map[c] = 'ROI'
+        elif any(k in c for k in ['profit','pnl','earnings']): col_map[c] = 'PnL'
+        elif any(k in c for k in ['bal','val','total','equity']): col_map[c] = 'Balance'
+        elif c in ('trades', 'tradecount', 'numtrades'): col_map[c] = 'Trades'
+        elif any(k in c for k in ['vol','turnover','traded']): col_map[c] = 'Volume'
+    df = df.rename(columns=col_map)
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+    if 'Link_ID' not in df.columns: df['Link_ID'] = df.get('Display_Name', df.columns[0])
+    if 'Display_Name' not in df.columns: df['Display_Name'] = df['Link_ID']
+
+    df['Balance'] = clean_numeric(df['Balance']) if 'Balance' in df.columns else 0.0
+    if 'PnL' in df.columns: df['PnL'] = clean_numeric(df['PnL'])
+    if 'ROI' in df.columns: df['ROI'] = clean_numeric(df['ROI'])
+    elif 'PnL' in df.columns:
+        cost = df['Balance'] - df['PnL']
+        df['ROI'] = np.where(cost != 0, df['PnL'] / cost.where(cost != 0) * 100, 0.0)
+    else: df['ROI'] = 0.0
+    if 'Trades' in df.columns: df['Trades'] = clean_numeric(df['Trades'])
+    if 'Volume' in df.columns: df['Volume'] = clean_numeric(df['Volume'])
+    else:
+        # Synthetic volume is seeded by an MD5 of the id; hash each distinct id once, not once per row
+        ids = df['Link_ID'].astype(str)
+        uniques = ids.unique().tolist()
+        factors = pd.Series([_volume_factor(v) for v in uniques], index=uniques)
+        df['Volume'] = df['Balance'] * ids.map(factors)
+
+    mask_insane = df['ROI'] > 100000
+    if mask_insane.any() and 'PnL' in df.columns:
+        df.loc[mask_insane, 'ROI'] = (df.loc[mask_insane, 'PnL'] / (df.loc[mask_insane, 'Balance'] - df.loc[mask_insane, 'PnL']) * 100)
+    return df[df['Link_ID'].astype(str) != "nan"]
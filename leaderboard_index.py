@@ -0,0 +1,47 @@
+import numpy as np
+
+# --- 1. SETTINGS ---
+SORT_COLUMNS = ["ROI", "PnL", "Balance", "Volume"]
+FILTER_COLUMNS = ["Balance", "ROI", "Trades"]
+
+# --- 2. INDEX ---
+# Built once per dataset version. Every sort order is an argsort computed up front,
+# so showing a page is a slice of it; every filter column keeps its values sorted,
+# so a "minimum" is one binary search instead of a full-frame comparison.
+class LeaderboardIndex:
+    def __init__(self, df):
+        self.size = len(df)
+        self.orders, self.ranks = {}, {}
+        for col in SORT_COLUMNS:
+            values = df[col].to_numpy(dtype=float) if col in df.columns else np.zeros(self.size)
+            # NaNs go last in both directions, like sort_values
+            desc = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind="stable")
+            asc = np.argsort(np.nan_to_num(values, nan=np.inf), kind="stable")
+            for descending, order in ((True, desc), (False, asc)):
+                rank = np.empty(self.size, dtype=np.int64)
+                rank[order] = np.arange(self.size)
+                self.orders[(col, descending)] = order
+                self.ranks[(col, descending)] = rank
+
+        self.values, self.filters = {}, {}
+        for col in FILTER_COLUMNS:
+            if col not in df.columns: continue
+            values = np.nan_to_num(df[col].to_numpy(dtype=float), nan=-np.inf)
+            order = np.argsort(values, kind="stable")
+            self.values[col] = values
+            self.filters[col] = (order, values[order])
+
+    def select(self, sort_by, descending, minimums, start, stop):
+        # Returns (row positions for [start, stop), number of rows that pass the filters)
+        order = self.orders[(sort_by, descending)]
+        active = [(col, v) for col, v in minimums.items() if v is not None and col in self.filters]
+        if not active: return order[start:stop], self.size
+
+        # The most selective threshold supplies the candidates; the others only check those
+        cuts = [(col, v, int(np.searchsorted(self.filters[col][1], v, side="left"))) for col, v in active]
+        best = max(cuts, key=lambda c: c[2])
+        candidates = self.filters[best[0]][0][best[2]:]
+        for col, v, _ in cuts:
+            if col != best[0]: candidates = candidates[self.values[col][candidates] >= v]
+        candidates = candidates[np.argsort(self.ranks[(sort_by, descending)][candidates], kind="stable")]
+        return candidates[start:stop], len(candidates)
@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import json
+import time
+import os
+import concurrent.futures
+import api_client
+from api_client import GAMMA_API, CLOB_API, ApiError
+from lru import LRUCache
+import metrics
+import singleflight
+
+# --- 1. SETTINGS ---
+DB_PATH = os.path.join("cache", "markets.sqlite")
+MEMORY_SIZE = 20000         # Markets kept in RAM; the rest are one SQLite read away
+NEGATIVE_TTL = 15 * 60      # Unknown ids are retried after this (new markets appear all the time)
+FALLBACK_WORKERS = 10
+BATCH_SIZE = 40             # condition_ids per gamma request: 40 x 66 chars keeps URLs ~3KB
+BATCH_WORKERS = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    condition_id TEXT PRIMARY KEY,
+    title TEXT,
+    slug TEXT,
+    outcomes TEXT,
+    found INTEGER,
+    fetched_at REAL
+)
+"""
+
+def _parse_outcomes(raw):
+    # gamma-api returns outcomes as a JSON-encoded string, e.g. '["Yes", "No"]'
+    if not isinstance(raw, str): return raw
+    try: return json.loads(raw)
+    except ValueError: return None
+
+# --- 2. STORE ---
+# Market titles/slugs/outcomes never change, so positive entries never expire.
+# Negative entries ("no such market") are kept for NEGATIVE_TTL only.
+# Memory entries are (info or None, expires_at).
+class MarketStore:
+    def __init__(self, path=DB_PATH, memory_size=MEMORY_SIZE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.memory = LRUCache(memory_size)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def get_many(self, condition_ids):
+        # Returns ({id: info} for known markets, [ids that must go to the network])
+        now = time.time()
+        found, unknown = {}, []
+        for c_id in dict.fromkeys(condition_ids):
+            entry = self.memory.get(c_id)
+            if entry is None: unknown.append(c_id)
+            elif entry[1] < now: unknown.append(c_id)
+            elif entry[0] is not None: found[c_id] = entry[0]
+        if not unknown: return found, []
+
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM markets WHERE condition_id IN ({','.join('?' * len(unknown))})", unknown).fetchall()
+        still_unknown = set(unknown)
+        for c_id, title, slug, outcomes, ok, fetched_at in rows:
+            if ok:
+                info = {'title': title, 'slug': slug, 'outcomes': json.loads(outcomes) if outcomes else None}
+                self.memory.put(c_id, (info, float("inf")))
+                found[c_id] = info
+                still_unknown.discard(c_id)
+            elif fetched_at + NEGATIVE_TTL > now:
+                self.memory.put(c_id, (None, fetched_at + NEGATIVE_TTL))
+                still_unknown.discard(c_id)
+        return found, [c for c in unknown if c in still_unknown]
+
+    def put_many(self, markets, not_found=()):
+        now = time.time()
+        rows = [(c_id, m.get('title'), m.get('slug'), json.dumps(m.get('outcomes')) if m.get('outcomes') else None, 1, now)
+                for c_id, m in markets.items()]
+        rows += [(c_id, None, None, None, 0, now) for c_id in not_found]
+        for c_id, m in markets.items(): self.memory.put(c_id, (m, float("inf")))
+        for c_id in not_found: self.memory.put(c_id, (None, now + NEGATIVE_TTL))
+        if rows:
+            with self.lock:
+                self.conn.executemany("INSERT OR REPLACE INTO markets VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self.conn.commit()
+
+_store = None
+_store_lock = threading.Lock()
+_flights = singleflight.Group("markets")
+
+def get_store():
+    # One store per process, shared by every wallet and every Streamlit session
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MarketStore()
+            metrics.register_cache("markets_memory", _store.memory)
+        return _store
+
+# --- 3. NETWORK ---
+def fetch_markets(condition_ids, headers=None):
+    # Returns (found, failed): failed ids hit an API error and must not be cached as "not found".
+    found, failed = {}, set()
+
+    def fetch_batch(batch):
+        try:
+            return api_client.get_json(f"{GAMMA_API}/markets", params={"condition_ids": ",".join(batch)},
+                                       headers=headers, timeout=(api_client.CONNECT_TIMEOUT, 5))
+        except ApiError: return []  # the clob fallback below still gets a chance
+
+    batches = [condition_ids[i:i + BATCH_SIZE] for i in range(0, len(condition_ids), BATCH_SIZE)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+        for markets in executor.map(fetch_batch, batches):
+            for m in markets:
+                found[m.get('conditionId')] = {'title': m.get('question'), 'slug': m.get('slug'),
+                                               'outcomes': _parse_outcomes(m.get('outcomes'))}
+
+    def fetch_fallback_title(c_id):
+        try:
+            clob_data = api_client.get_json(f"{CLOB_API}/markets/{c_id}", headers=headers,
+                                            timeout=(api_client.CONNECT_TIMEOUT, 3))
+            return c_id, clob_data.get('question'), clob_data.get('slug'), False
+        except ApiError as e:
+            return c_id, None, None, e.status != 404
+
+    missing_ids = [c for c in condition_ids if c not in found]
+    if missing_ids:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=FALLBACK_WORKERS) as executor:
+            for c_id, title, slug, errored in executor.map(fetch_fallback_title, missing_ids):
+                if title: found[c_id] = {'title': title, 'slug': slug, 'outcomes': None}
+                elif errored: failed.add(c_id)
+    return found, failed
+
+def lookup(condition_ids, headers=None):
+    # Only ids never seen before (or whose negative entry expired) go to the network, and only once
+    # per process: ids another session is already fetching are waited on, not requested again
+    store = get_store()
+    found, unknown = store.get_many([c for c in condition_ids if c])
+    if not unknown: return found
+    mine, theirs = _flights.claim(unknown)
+    fetched = {}
+    try:
+        if mine:
+            fetched, failed = fetch_markets(mine, headers)
+            store.put_many(fetched, [c for c in mine if c not in fetched and c not in failed])
+            found.update(fetched)
+    finally:
+        for c_id in mine: _flights.finish(c_id, fetched.get(c_id))
+    for c_id, call in theirs.items():
+        info = _flights.wait(call)
+        if info: found[c_id] = info
+    return found
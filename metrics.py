@@ -0,0 +1,163 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- 1. SETTINGS ---
+# Latency histogram bucket upper bounds, in seconds (Prometheus-style, cumulative on export)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# --- 2. REGISTRY ---
+# Process-wide and thread-safe: scanner workers, dashboard sessions and prefetch
+# threads all record into the same counters. Keys are (name, sorted label pairs).
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}    # key -> {"buckets": [per-bucket counts..., +Inf], "sum": seconds, "count": n, "max": seconds}
+_caches = {}        # name -> object with .hits/.misses (LRUCache, WalletCache, ...)
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None: h = _histograms[key] = {"buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0, "count": 0, "max": 0.0}
+        i = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+        h["buckets"][i] += 1
+        h["sum"] += seconds
+        h["count"] += 1
+        h["max"] = max(h["max"], seconds)
+
+@contextmanager
+def timed(name, **labels):
+    # Records the block's duration in `name`, plus an errors counter if it raised
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc(f"{name}_errors", **labels)
+        raise
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+def timed_fn(name, **labels):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(name, **labels): return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def register_cache(name, cache):
+    with _lock:
+        _caches[name] = cache
+
+_ID_RE = re.compile(r"/0x[0-9a-fA-F]+")
+
+def endpoint(path):
+    # /markets/0xabc... -> /markets/{id}, so per-market URLs don't explode the label space
+    return _ID_RE.sub("/{id}", path) or "/"
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+# --- 3. EXPORT ---
+def _quantile(h, q):
+    # Linear interpolation inside the bucket that holds the q-th observation, capped at the largest one seen
+    if not h["count"]: return 0.0
+    rank, seen, lower = q * h["count"], 0, 0.0
+    for i, n in enumerate(h["buckets"]):
+        upper = min(BUCKETS[i] if i < len(BUCKETS) else h["max"], h["max"])
+        if n and seen + n >= rank: return lower + (upper - lower) * (rank - seen) / n
+        seen, lower = seen + n, upper
+    return h["max"]
+
+def _label_str(labels):
+    return ",".join(f"{k}={v}" for k, v in labels)
+
+def summary():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: dict(h, buckets=list(h["buckets"])) for k, h in _histograms.items()}
+        caches = dict(_caches)
+    out = {"counters": {}, "latency": {}, "caches": {}}
+    for (name, labels), value in sorted(counters.items()):
+        out["counters"].setdefault(name, {})[_label_str(labels)] = value
+    for (name, labels), h in sorted(histograms.items()):
+        out["latency"].setdefault(name, {})[_label_str(labels)] = {
+            "count": h["count"], "total_s": round(h["sum"], 3),
+            "mean_ms": round(h["sum"] / h["count"] * 1000, 2) if h["count"] else 0.0,
+            "p50_ms": round(_quantile(h, 0.5) * 1000, 2), "p99_ms": round(_quantile(h, 0.99) * 1000, 2)}
+    for name, cache in sorted(caches.items()):
+        hits, misses = cache.hits, cache.misses
+        out["caches"][name] = {"hits": hits, "misses": misses,
+                               "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None}
+    return out
+
+def write_json(path, extra=None):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f: json.dump({**summary(), **(extra or {})}, f, indent=2)
+
+def _prom_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+def prometheus_text():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: dict(h, buckets=list(h["buckets"])) for k, h in _histograms.items()}
+        caches = dict(_caches)
+    lines, typed = [], set()
+    for (name, labels), value in sorted(counters.items()):
+        metric = f"polywatch_{name}_total"
+        if metric not in typed: lines.append(f"# TYPE {metric} counter"); typed.add(metric)
+        lines.append(f"{metric}{_prom_labels(labels)} {value}")
+    for (name, labels), h in sorted(histograms.items()):
+        metric = f"polywatch_{name}_seconds"
+        if metric not in typed: lines.append(f"# TYPE {metric} histogram"); typed.add(metric)
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), h["buckets"]):
+            cumulative += n
+            lines.append(f"{metric}_bucket{_prom_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{metric}_sum{_prom_labels(labels)} {h['sum']}")
+        lines.append(f"{metric}_count{_prom_labels(labels)} {h['count']}")
+    if caches: lines.append("# TYPE polywatch_cache_requests_total counter")
+    for name, cache in sorted(caches.items()):
+        lines.append(f'polywatch_cache_requests_total{{cache="{name}",result="hit"}} {cache.hits}')
+        lines.append(f'polywatch_cache_requests_total{{cache="{name}",result="miss"}} {cache.misses}')
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port, host="0.0.0.0"):
+    # Prometheus text endpoint on a daemon thread; returns the server (call .shutdown() to stop)
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
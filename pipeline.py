@@ -0,0 +1,43 @@
+import threading
+import metrics
+
+# --- FILTER PIPELINE ---
+# A stage is a named check with a cost (roughly: network calls it makes).
+# The pipeline runs the cheapest stages first so free checks reject wallets
+# before anything touches the API, and counts what each stage let through.
+class Stage:
+    def __init__(self, name, check, cost=0):
+        self.name = name
+        self.check = check
+        self.cost = cost
+
+class Pipeline:
+    def __init__(self, stages):
+        # sorted() is stable, so stages with equal cost keep their declared order
+        self.stages = sorted(stages, key=lambda s: s.cost)
+        self.counts = {s.name: {"passed": 0, "rejected": 0, "errors": 0} for s in self.stages}
+        self.lock = threading.Lock()
+
+    def _count(self, stage, key):
+        with self.lock:
+            self.counts[stage.name][key] += 1
+        metrics.inc("scan_stage_results", stage=stage.name, result=key)
+
+    def run(self, item):
+        for stage in self.stages:
+            try:
+                with metrics.timed("scan_stage", stage=stage.name):
+                    ok = stage.check(item)
+            except Exception:
+                self._count(stage, "errors")
+                raise
+            self._count(stage, "passed" if ok else "rejected")
+            if not ok: return False
+        return True
+
+    def report(self):
+        lines = []
+        for stage in self.stages:
+            c = self.counts[stage.name]
+            lines.append(f"   {stage.name} (cost {stage.cost}): {c['passed']} passed | {c['rejected']} rejected | {c['errors']} errors")
+        return lines
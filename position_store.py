@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# --- 1. LAYOUT ---
+# The scanner saves every whale's open positions next to the leaderboard dataset,
+# one row per position, sorted by wallet. The file is uncompressed Arrow IPC, so the
+# dashboard memory-maps it; a wallet is found by binary search over the run-end
+# index of the wallet column and served as a zero-copy slice.
+POSITIONS_FILE = "elite_positions.arrow"
+SCHEMA_VERSION = 1
+
+SCHEMA = pa.schema([
+    ("wallet", pa.string()),
+    ("conditionId", pa.string()),
+    ("outcome", pa.string()),
+    ("title", pa.string()),
+    ("slug", pa.string()),
+    ("avgPrice", pa.float32()),
+    ("curPrice", pa.float32()),
+    ("currentValue", pa.float64()),
+    ("cashPnl", pa.float64()),
+    ("percentPnl", pa.float32()),
+    ("fetched_at", pa.int64()),     # unix seconds the wallet's /positions call returned
+], metadata={"schema_version": str(SCHEMA_VERSION)})
+
+def _float(x):
+    try: return float(x)
+    except (TypeError, ValueError): return None
+
+# --- 2. WRITE ---
+def write_positions(captured, path=POSITIONS_FILE):
+    # captured: {wallet: (raw /positions rows, fetched_at)}; positions under $1 are dropped like in the table view
+    columns = {f.name: [] for f in SCHEMA}
+    for wallet in sorted(captured):
+        raw, fetched_at = captured[wallet]
+        for p in raw:
+            if (_float(p.get("currentValue")) or 0) < 1.0: continue
+            columns["wallet"].append(wallet)
+            columns["fetched_at"].append(int(fetched_at))
+            for name in ("conditionId", "outcome", "title", "slug"):
+                columns[name].append(p.get(name) or None)
+            for name in ("avgPrice", "curPrice", "currentValue", "cashPnl", "percentPnl"):
+                columns[name].append(_float(p.get(name)))
+    table = pa.Table.from_pydict(columns, schema=SCHEMA)
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    return table.num_rows
+
+# --- 3. READ ---
+class PositionStore:
+    def __init__(self, path=POSITIONS_FILE):
+        self.table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        version = (self.table.schema.metadata or {}).get(b"schema_version", b"0").decode()
+        if version != str(SCHEMA_VERSION):
+            raise ValueError(f"{path} has schema v{version}, expected v{SCHEMA_VERSION}")
+        # Sorted column -> one run per wallet: run values are the index keys, run ends the row bounds
+        runs = pc.run_end_encode(self.table.column("wallet").combine_chunks())
+        self.wallets = np.asarray(runs.values.to_pylist(), dtype=object)
+        self.ends = runs.run_ends.to_numpy().astype(np.int64)
+
+    def __len__(self):
+        return len(self.wallets)
+
+    def __contains__(self, wallet):
+        return self._find(wallet) is not None
+
+    def _find(self, wallet):
+        i = int(np.searchsorted(self.wallets, wallet))
+        return i if i < len(self.wallets) and self.wallets[i] == wallet else None
+
+    def get(self, wallet):
+        # Returns (raw position dicts shaped like the /positions payload, fetched_at) or None if the scan didn't see it
+        i = self._find(wallet)
+        if i is None: return None
+        start = int(self.ends[i - 1]) if i else 0
+        rows = self.table.slice(start, int(self.ends[i]) - start).to_pylist()
+        return rows, rows[0]["fetched_at"]
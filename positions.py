@@ -0,0 +1,177 @@
+import urllib.parse
+import concurrent.futures
+import time
+import api_client
+from api_client import DATA_API
+import market_cache
+from lru import LRUCache
+import metrics
+import singleflight
+
+# --- 1. SETTINGS ---
+PAGE_SIZE = 100         # Positions per /positions request
+MAX_PAGES = 20          # Hard cap: 2,000 open positions per wallet
+PAGE_WORKERS = 4        # Pages fetched in parallel after the first one
+RESULT_TTL = 300        # Seconds a finished positions table is served as fresh
+STALE_TTL = 3600        # Older tables are still served (and refreshed in the background) up to this age
+
+# Finished tables, shared by every Streamlit session in the process: wallet -> (rows, error_msg, fetched_at)
+_results = LRUCache(1024)
+metrics.register_cache("positions", _results)
+_flights = singleflight.Group("positions")
+_listeners = []
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json",
+    "Referer": "https://polymarket.com/"
+}
+
+# --- 2. PAGINATED FETCH ---
+def fetch_positions_page(wallet, offset):
+    params = {"user": wallet, "limit": PAGE_SIZE, "offset": offset, "sortBy": "CURRENT", "sortDirection": "DESC"}
+    return api_client.get_json(f"{DATA_API}/positions", params=params, headers=HEADERS,
+                               timeout=(api_client.CONNECT_TIMEOUT, 5)) or []
+
+def iter_position_pages(wallet, max_pages=MAX_PAGES, workers=PAGE_WORKERS):
+    # The first page comes back alone so it can be shown right away. After that,
+    # pages are fetched `workers` at a time and yielded in order until a short page.
+    # Callers that already run a pool of their own (the scanner, the alert watcher) pass
+    # workers=1, so their --max-in-flight stays the real bound on concurrent requests.
+    page = fetch_positions_page(wallet, 0)
+    yield page
+    if len(page) < PAGE_SIZE: return
+    if workers <= 1:
+        for i in range(1, max_pages):
+            page = fetch_positions_page(wallet, i * PAGE_SIZE)
+            yield page
+            if len(page) < PAGE_SIZE: return
+        return
+    next_page = 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        while next_page < max_pages:
+            wave = range(next_page, min(next_page + workers, max_pages))
+            for page in executor.map(lambda i: fetch_positions_page(wallet, i * PAGE_SIZE), wave):
+                yield page
+                if len(page) < PAGE_SIZE: return
+            next_page = wave.stop
+
+# --- 3. TABLE ROWS ---
+def _float(x):
+    # Missing, null (saved position files store unparseable numbers as null) or junk -> 0, same as a missing key
+    try: return float(x or 0)
+    except (TypeError, ValueError): return 0.0
+
+def build_position_rows(raw_positions, market_map):
+    clean_data = []
+    for p in raw_positions:
+        if _float(p.get('currentValue')) < 1.0: continue
+        c_id = p.get('conditionId') or ""
+        market_info = market_map.get(c_id, {})
+        market_title = market_info.get('title')
+        market_slug = market_info.get('slug')
+        if not market_title: market_title = f"Unknown Market ({c_id[:6]}...)"
+        outcome_val = p.get('outcome', 'Unknown')
+
+        if market_slug: final_link = f"https://polymarket.com/event/{market_slug}"
+        elif market_title and "Unknown" not in market_title:
+            safe_query = urllib.parse.quote(market_title)
+            final_link = f"https://polymarket.com/search?q={safe_query}"
+        else: final_link = "https://polymarket.com"
+
+        clean_data.append({
+            "Market": market_title, "Outcome": outcome_val,
+            "Entry": _float(p.get('avgPrice')), "Price": _float(p.get('curPrice')),
+            "Value": _float(p.get('currentValue')), "PnL": _float(p.get('cashPnl')),
+            "Return": _float(p.get('percentPnl')) * 100, "Link": final_link
+        })
+    return clean_data
+
+def on_fetch(fn):
+    # fn(wallet, raw_positions, fetched_at) runs after every complete live fetch (consensus.py keeps its index current this way)
+    _listeners.append(fn)
+
+def _notify(wallet, raw, fetched_at):
+    for fn in _listeners:
+        try: fn(wallet, raw, fetched_at)
+        except Exception as e: print(f"⚠️ Positions listener failed for {wallet}: {e}")
+
+# --- 4. PUBLIC API ---
+# Every Streamlit session and the prefetch workers share one single-flight group: when a
+# shared link makes dozens of sessions open the same whale at once, one of them fetches
+# and the rest wait for its table. Past RESULT_TTL a table is still served instantly
+# (until STALE_TTL) while a single background fetch replaces it.
+def cached_positions(wallet):
+    entry = _results.get(wallet)
+    if entry and time.time() - entry[2] < RESULT_TTL: return entry[0], entry[1]
+    return None
+
+def stream_active_positions(wallet, max_pages=MAX_PAGES):
+    # Yields (rows_so_far, error_msg, done) after every page so the UI can render progressively.
+    with metrics.timed("stage", stage="stream_active_positions"):
+        yield from _stream_active_positions(wallet, max_pages)
+
+def _stream_active_positions(wallet, max_pages):
+    while True:
+        entry = _results.get(wallet)
+        age = time.time() - entry[2] if entry else None
+        if entry and age < STALE_TTL:
+            if age >= RESULT_TTL and _flights.refresh(wallet, lambda: _fetch(wallet, max_pages)):
+                metrics.inc("positions_revalidations")
+            yield entry[0], entry[1], True
+            return
+
+        mine, theirs = _flights.claim([wallet])
+        if theirs:
+            result = _flights.wait(theirs[wallet])
+            # None: the leader stopped reading mid-fetch, so this caller takes the fetch over
+            if result is None: continue
+            yield result[0], result[1], True
+            return
+        # Leader: stream pages to this caller, then hand the finished table to the waiters.
+        # finally also covers a caller that stops reading early (e.g. a Streamlit rerun):
+        # the waiters are woken with None instead of a table cut short after some page.
+        result = None
+        try:
+            for rows, error_msg, done in _fetch_pages(wallet, max_pages):
+                if done: result = (rows, error_msg)
+                yield rows, error_msg, done
+        finally:
+            _flights.finish(wallet, result)
+        return
+
+def _fetch_pages(wallet, max_pages):
+    rows, raw = [], []
+    try:
+        for i, page in enumerate(iter_position_pages(wallet, max_pages)):
+            if i == 0 and not page:
+                fetched_at = time.time()
+                _results.put(wallet, ([], "No active positions found.", fetched_at))
+                _notify(wallet, [], fetched_at)
+                yield [], "No active positions found.", True
+                return
+            market_map = market_cache.lookup([p.get('conditionId') for p in page], headers=HEADERS)
+            rows = rows + build_position_rows(page, market_map)
+            raw.extend(page)
+            yield rows, None, False
+    except Exception as e:
+        # A failure after the first page still leaves the rows we already have, flagged as partial
+        # (not cached, and listeners only see complete fetches)
+        yield rows, f"Showing the first {len(rows)} positions: later pages failed ({e})." if rows else str(e), True
+        return
+    fetched_at = time.time()
+    _results.put(wallet, (rows, None, fetched_at))
+    _notify(wallet, raw, fetched_at)
+    yield rows, None, True
+
+def _fetch(wallet, max_pages):
+    rows, error_msg = [], None
+    for rows, error_msg, done in _fetch_pages(wallet, max_pages): pass
+    return rows, error_msg
+
+@metrics.timed_fn("stage", stage="get_active_positions")
+def get_active_positions(wallet, max_pages=MAX_PAGES):
+    rows, error_msg = [], None
+    for rows, error_msg, done in stream_active_positions(wallet, max_pages):
+        pass
+    return rows, error_msg
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+import positions
+
+# --- 1. SETTINGS ---
+PREFETCH_WORKERS = 2    # Few on purpose: leaves most of the data-api budget to clicks
+MAX_PENDING = 200       # Oldest queued wallets are dropped past this
+
+# --- 2. WORKER POOL ---
+# Warms positions.get_active_positions (and with it the market store) for wallets
+# the user is likely to open next. The newest submit() wins: its wallets jump the
+# queue, so paging quickly never leaves the workers stuck on pages already left behind.
+class Prefetcher:
+    def __init__(self, workers=PREFETCH_WORKERS):
+        self.pending = OrderedDict()
+        self.in_flight = set()
+        self.cond = threading.Condition()
+        self.done = 0
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"prefetch-{i}", daemon=True).start()
+
+    def submit(self, wallets):
+        # wallets are in priority order; the last pushed is popped first, so push them reversed
+        with self.cond:
+            for wallet in reversed(list(dict.fromkeys(wallets))):
+                if wallet in self.in_flight or positions.cached_positions(wallet) is not None: continue
+                self.pending[wallet] = None
+                self.pending.move_to_end(wallet)
+            while len(self.pending) > MAX_PENDING:
+                self.pending.popitem(last=False)
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending: self.cond.wait()
+                wallet, _ = self.pending.popitem(last=True)
+                self.in_flight.add(wallet)
+            try:
+                if positions.cached_positions(wallet) is None:
+                    positions.get_active_positions(wallet)
+            except Exception:
+                pass  # best effort: the detail view will fetch it live
+            finally:
+                with self.cond:
+                    self.in_flight.discard(wallet)
+                    self.done += 1
+
+    def stats(self):
+        with self.cond:
+            return {"pending": len(self.pending), "in_flight": len(self.in_flight), "done": self.done}
+
+_prefetcher = None
+_lock = threading.Lock()
+
+def warm(wallets):
+    # One worker pool per process, shared by every Streamlit session
+    global _prefetcher
+    with _lock:
+        if _prefetcher is None: _prefetcher = Prefetcher()
+    _prefetcher.submit(wallets)
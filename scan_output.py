@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+from dataset import write_dataset, DATASET_FILE, SCHEMA
+
+# --- 1. FILES ---
+OUTPUT_FILE = DATASET_FILE
+CSV_EXPORT_FILE = "elite_data.csv"
+WORK_DIR = "cache"
+PARTIAL_FILE = os.path.join(WORK_DIR, "elite_data.partial.csv")
+CHECKPOINT_FILE = os.path.join(WORK_DIR, "scan_checkpoint.json")
+
+OUTPUT_COLUMNS = SCHEMA.names
+
+def atomic_write(path, write_fn):
+    # Write next to the target, fsync, then rename over it: readers see the old file or the new one, never half of either.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="") as f:
+        write_fn(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+# --- 2. BOARDS ---
+# A wallet found on several leaderboards takes its row (rank, pnl, vol, and so its ROI check)
+# from one primary board, so every whale's numbers come from a single time window:
+# OVERALL before other categories, then MONTH (the default board), ALL, WEEK, DAY, then PNL before VOL.
+BOARD_PRIORITY = (["OVERALL"], ["MONTH", "ALL", "WEEK", "DAY"], ["PNL", "VOL"])
+
+def board_priority(label):
+    parts = label.split("/")
+    return tuple(order.index(p) if p in order else len(order) for order, p in zip(BOARD_PRIORITY, parts)) + (label,)
+
+def primary_board(row):
+    return (row.get("boards") or "").split(";")[0]
+
+def merge_boards(*values):
+    # "A;B" + "B;C" -> "A;B;C", primary board first
+    labels = []
+    for value in values:
+        for label in (value or "").split(";"):
+            if label and label not in labels: labels.append(label)
+    return ";".join(sorted(labels, key=board_priority))
+
+def add_trader(traders, trader, label):
+    # Dedup across boards: the wallet keeps the row of its primary board and collects every label
+    wallet = trader.get('proxyWallet')
+    current = traders.get(wallet)
+    boards = merge_boards(current.get('boards') if current else None, label)
+    if current is None or board_priority(label) < board_priority(primary_board(current)): traders[wallet] = trader
+    traders[wallet]['boards'] = boards
+
+def _rank(row):
+    try: return float(row.get("rank"))
+    except (TypeError, ValueError): return float("inf")
+
+def merge_rows(rows):
+    # Grouped by primary board, best rank first within each (wallet breaks ties, so the order never depends
+    # on which page or shard finished first): ranks are only compared within one board.
+    # A wallet written from two boards' pages keeps its primary board's row with the boards merged.
+    seen, unique = {}, []
+    for row in sorted(rows, key=lambda r: (board_priority(primary_board(r)), _rank(r), r.get("proxyWallet") or "")):
+        first = seen.get(row["proxyWallet"])
+        if first is not None:
+            first["boards"] = merge_boards(first.get("boards"), row.get("boards"))
+            continue
+        seen[row["proxyWallet"]] = row
+        unique.append(row)
+    return unique
+
+def publish(rows, output=OUTPUT_FILE, csv_export=None):
+    write_dataset(rows, output)
+    if csv_export:
+        def write(f):
+            writer = csv.DictWriter(f, fieldnames=OUTPUT_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        atomic_write(csv_export, write)
+
+# --- 3. STREAMING WRITER ---
+# Survivors are appended to PARTIAL_FILE page by page, and CHECKPOINT_FILE
+# records which leaderboard pages ("BOARD@offset") are fully done. A crashed scan can be
+# resumed from there; finalize() swaps the sorted result into OUTPUT_FILE
+# (typed Arrow dataset) and, optionally, the CSV export.
+class ScanWriter:
+    def __init__(self, params, resume=False, output=OUTPUT_FILE, csv_export=None):
+        self.output = output
+        self.csv_export = csv_export
+        self.params = params
+        os.makedirs(WORK_DIR, exist_ok=True)
+        state = self._load_checkpoint() if resume else None
+        if state is not None and state.get("params") != params:
+            print("⚠️ Checkpoint was made with different settings, starting over")
+            state = None
+        if state is None:
+            if resume: print("ℹ️ No checkpoint to resume, starting a fresh scan")
+            for path in (PARTIAL_FILE, CHECKPOINT_FILE):
+                if os.path.exists(path): os.remove(path)
+            state = {"params": params, "done": []}
+        self.done = set(state["done"])
+        new_file = not os.path.exists(PARTIAL_FILE)
+        self.file = open(PARTIAL_FILE, "a", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_COLUMNS, extrasaction="ignore")
+        if new_file: self.writer.writeheader()
+
+    def _load_checkpoint(self):
+        try:
+            with open(CHECKPOINT_FILE) as f: return json.load(f)
+        except (OSError, ValueError): return None
+
+    def write_page(self, page, survivors):
+        self.writer.writerows(survivors)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        # Rows hit the disk before the page is marked done, so a crash in between only repeats work.
+        self.done.add(page)
+        state = {"params": self.params, "done": sorted(self.done)}
+        atomic_write(CHECKPOINT_FILE, lambda f: json.dump(state, f))
+
+    def finalize(self):
+        self.file.close()
+        with open(PARTIAL_FILE, newline="") as f:
+            unique = merge_rows(csv.DictReader(f))
+        publish(unique, self.output, self.csv_export)
+        os.remove(PARTIAL_FILE)
+        # The checkpoint is only written once a page commits, so a scan with no pages (limit=0) never made one
+        if os.path.exists(CHECKPOINT_FILE): os.remove(CHECKPOINT_FILE)
+        return unique
+
+    def close(self):
+        if not self.file.closed: self.file.close()
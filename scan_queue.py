@@ -0,0 +1,154 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from scan_output import WORK_DIR
+
+# --- 1. SETTINGS ---
+# The coordinator/worker scan's work queue is a single SQLite file: no broker to run.
+# It stays in rollback-journal mode (WAL needs shared memory, which a volume shared
+# between boxes can't provide), and every claim is one BEGIN IMMEDIATE transaction,
+# so two workers can never lease the same shard.
+QUEUE_FILE = os.path.join(WORK_DIR, "scan_queue.sqlite")
+LEASE_SECONDS = 120.0   # A shard whose worker stops heartbeating goes back on the queue after this
+MAX_ATTEMPTS = 4        # Claims per shard before it is marked failed (and the scan aborted)
+BUSY_TIMEOUT = 60.0     # Seconds to wait for another process's write lock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    params TEXT,
+    state TEXT,             -- running | finished | aborted
+    created_at REAL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    scan INTEGER,
+    phase TEXT,             -- pages | wallets
+    payload TEXT,
+    state TEXT,             -- pending | leased | done | failed
+    attempts INTEGER DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS shards_by_state ON shards (scan, phase, state);
+"""
+
+# --- 2. QUEUE ---
+# Shard ids grow in the order the coordinator added them, and results are read back
+# in id order, so merging never depends on which worker finished first.
+class ScanQueue:
+    def __init__(self, path=QUEUE_FILE, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _write(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try: yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def start_scan(self, params):
+        # Only one scan runs per queue: an older one left "running" by a dead coordinator is aborted
+        with self._write():
+            self.conn.execute("UPDATE scans SET state = 'aborted' WHERE state = 'running'")
+            cur = self.conn.execute("INSERT INTO scans (params, state, created_at) VALUES (?, 'running', ?)",
+                                    (json.dumps(params, sort_keys=True), time.time()))
+        return cur.lastrowid
+
+    def resume_scan(self, params):
+        # Re-opens the latest unfinished scan made with the same params: done shards are kept,
+        # everything else (failed, or leased by workers that may be gone) goes back on the queue
+        with self._write():
+            row = self.conn.execute("SELECT id, params FROM scans WHERE state != 'finished' ORDER BY id DESC LIMIT 1").fetchone()
+            if row is None or row[1] != json.dumps(params, sort_keys=True): return None
+            self.conn.execute("UPDATE scans SET state = 'aborted' WHERE state = 'running' AND id != ?", (row[0],))
+            self.conn.execute("UPDATE scans SET state = 'running' WHERE id = ?", (row[0],))
+            self.conn.execute("UPDATE shards SET state = 'pending', attempts = 0, updated_at = ? WHERE scan = ? AND state IN ('leased', 'failed')",
+                              (time.time(), row[0]))
+        return row[0]
+
+    def scan_state(self, scan):
+        row = self.conn.execute("SELECT state FROM scans WHERE id = ?", (scan,)).fetchone()
+        return row[0] if row else None
+
+    def set_scan_state(self, scan, state):
+        with self._write():
+            self.conn.execute("UPDATE scans SET state = ? WHERE id = ?", (state, scan))
+
+    def running(self):
+        return self.conn.execute("SELECT 1 FROM scans WHERE state = 'running' LIMIT 1").fetchone() is not None
+
+    def add_shards(self, scan, phase, payloads):
+        now = time.time()
+        with self._write():
+            self.conn.executemany("INSERT INTO shards (scan, phase, payload, state, updated_at) VALUES (?, ?, ?, 'pending', ?)",
+                                  [(scan, phase, json.dumps(p), now) for p in payloads])
+
+    def claim(self, owner):
+        # Next pending shard of a running scan, or one whose lease ran out; None when there's nothing to do
+        now = time.time()
+        with self._write():
+            self.conn.execute("UPDATE shards SET state = 'failed', error = 'lease expired on the last attempt', updated_at = ? "
+                              "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?", (now, now, self.max_attempts))
+            row = self.conn.execute(
+                "SELECT shards.id, shards.scan, phase, payload, attempts, scans.params FROM shards JOIN scans ON scans.id = shards.scan "
+                "WHERE scans.state = 'running' AND (shards.state = 'pending' OR (shards.state = 'leased' AND lease_until < ?)) "
+                "ORDER BY shards.id LIMIT 1", (now,)).fetchone()
+            if row is None: return None
+            self.conn.execute("UPDATE shards SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                              (owner, now + self.lease_seconds, now, row[0]))
+        return {"id": row[0], "scan": row[1], "phase": row[2], "payload": json.loads(row[3]),
+                "attempt": row[4] + 1, "params": json.loads(row[5])}
+
+    def renew(self, shard, owner):
+        # Heartbeat; False means the lease was lost (expired and taken by another worker)
+        with self._write():
+            cur = self.conn.execute("UPDATE shards SET lease_until = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                                    (time.time() + self.lease_seconds, shard, owner))
+        return cur.rowcount == 1
+
+    def complete(self, shard, owner, result):
+        # Only the current lease holder's result is kept, so a shard is counted exactly once
+        with self._write():
+            cur = self.conn.execute("UPDATE shards SET state = 'done', result = ?, error = NULL, updated_at = ? "
+                                    "WHERE id = ? AND owner = ? AND state = 'leased'", (json.dumps(result), time.time(), shard, owner))
+        return cur.rowcount == 1
+
+    def fail(self, shard, owner, error):
+        # Back on the queue for another worker, or failed for good once it used up its attempts
+        with self._write():
+            cur = self.conn.execute("UPDATE shards SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                                    "error = ?, updated_at = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                                    (self.max_attempts, str(error), time.time(), shard, owner))
+        return cur.rowcount == 1
+
+    def progress(self, scan, phase):
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for state, n in self.conn.execute("SELECT state, COUNT(*) FROM shards WHERE scan = ? AND phase = ? GROUP BY state", (scan, phase)):
+            counts[state] = n
+        return counts
+
+    def stats(self, scan):
+        row = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(attempts), 0), COUNT(DISTINCT owner) FROM shards WHERE scan = ?", (scan,)).fetchone()
+        return {"shards": row[0], "attempts": row[1], "workers": row[2]}
+
+    def errors(self, scan, limit=5):
+        return [r[0] for r in self.conn.execute("SELECT error FROM shards WHERE scan = ? AND state = 'failed' ORDER BY id LIMIT ?", (scan, limit))]
+
+    def results(self, scan, phase):
+        return [json.loads(r[0]) for r in self.conn.execute("SELECT result FROM shards WHERE scan = ? AND phase = ? AND state = 'done' ORDER BY id", (scan, phase))]
+
+    def close(self):
+        self.conn.close()
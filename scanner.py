@@ -1,6 +1,20 @@
-import requests
-import pandas as pd
+import argparse
+import concurrent.futures
+import os
 import time
+from urllib.parse import urlsplit
+import pyarrow as pa
+import api_client
+from api_client import DATA_API, ApiError
+from wallet_cache import WalletCache
+from pipeline import Stage, Pipeline
+from scan_output import ScanWriter, OUTPUT_FILE, CSV_EXPORT_FILE, WORK_DIR, add_trader
+import metrics
+import snapshots
+import market_cache
+from positions import iter_position_pages
+from position_store import POSITIONS_FILE, PositionStore, write_positions
+from scan_queue import QUEUE_FILE
 
 # --- 1. YOUR SETTINGS (Exact Logic) ---
 SCAN_LIMIT = 1000       # <--- REQ 1: Top 1000 Profiles
@@ -8,81 +22,286 @@ MIN_ACTIVE = 10000      # <--- REQ 2: Open Positions > $50k
 MIN_TRADES = 100        # <--- REQ 4: Experience > 100 Trades
 MIN_ROI = 1.0           # <--- REQ 3: ROI > 1%
 
+PAGE_SIZE = 50          # Leaderboard rows per request
+
+# A board is one leaderboard: (category, timePeriod, orderBy). A matrix scan fetches
+# every board and checks each wallet once, however many boards it shows up on.
+DEFAULT_BOARD = ("OVERALL", "MONTH", "PNL")
+PERIODS = ["DAY", "WEEK", "MONTH", "ALL"]
+ORDER_BY = ["PNL", "VOL"]
+MAX_IN_FLIGHT = 16      # Concurrent requests during a scan (1 = old serial behaviour)
+
+METRICS_FILE = os.path.join(WORK_DIR, "scan_metrics.json")   # JSON summary written after every scan
+
 HEADERS = {"User-Agent": "Mozilla/5.0"}
+LEADERBOARD_URL = f"{DATA_API}/v1/leaderboard"
 
+# API failures raise ApiError (after retries) instead of returning 0,
+# so a throttled wallet is reported as an error, not filtered out as a "non-whale".
 def get_trade_count(wallet):
-    try:
-        r = requests.get(f"https://data-api.polymarket.com/traded?user={wallet}", headers=HEADERS)
-        return int(r.json().get('traded', 0))
-    except:
-        return 0
+    data = api_client.get_json(f"{DATA_API}/traded", params={"user": wallet}, headers=HEADERS)
+    return int(data.get('traded', 0))
+
+def get_positions(wallet):
+    # Every page, sorted like the dashboard's live view (up to positions.MAX_PAGES): a bare /positions call
+    # only returns the API's first ~100, which undercounted the balance and truncated the saved book.
+    # Pages are fetched one after another: the scan's own pool (--max-in-flight) is the concurrency bound
+    return [p for page in iter_position_pages(wallet, workers=1) for p in page]
 
 def get_active_balance(wallet):
+    return sum([float(p.get('currentValue', 0)) for p in get_positions(wallet)])
+
+def board_label(board):
+    return "/".join(board)
+
+def board_matrix(categories, periods, order_by):
+    return [(c.upper(), p.upper(), o.upper()) for c in categories for p in periods for o in order_by]
+
+def get_leaderboard_page(offset, board=DEFAULT_BOARD):
+    # Fetches one page of a board (default: top monthly traders sorted by PnL)
+    category, period, order_by = board
+    params = {"category": category, "timePeriod": period, "orderBy": order_by, "limit": PAGE_SIZE, "offset": offset}
+    try:
+        return api_client.get_json(LEADERBOARD_URL, params=params, headers=HEADERS)
+    except ApiError as e:
+        print(f"Error on {board_label(board)} page {offset // PAGE_SIZE}: {e}")
+        metrics.inc("scan_pages", outcome="api_error")
+        return None
+
+# --- 2. FILTER STAGES ---
+# Each check stores what it computed on the trader dict and returns pass/fail.
+# Cost = API calls made, so the pipeline runs the free ROI check first.
+def build_pipeline(cache=None, incremental=False, captured=None):
+    # captured (optional dict) collects the /positions payload of every wallet that clears the
+    # balance check, so the dashboard can show a whale's positions without asking the API again
+
+    # --- LOGIC CHECK: ROI > 1% (free: leaderboard payload) ---
+    def roi_check(trader):
+        profit = float(trader.get('pnl', 0))
+        vol = float(trader.get('vol', trader.get('volume', 0)))
+
+        # Formula: (Profit / Volume) * 100
+        trader['roi'] = (profit / vol * 100) if vol > 0 else 0
+        return trader['roi'] >= MIN_ROI
+
+    # --- LOGIC CHECK: TRADES > 100 (1 call: /traded) ---
+    def trades_check(trader):
+        wallet = trader.get('proxyWallet')
+        trades = cache.get_trades(wallet, sticky_above=MIN_TRADES) if incremental else None
+        if trades is None:
+            trades = get_trade_count(wallet)
+            if cache: cache.set_trades(wallet, trades)
+        trader['trade_count'] = trades
+        return trades >= MIN_TRADES
+
+    # --- LOGIC CHECK: ACTIVE CASH > $10k (1 call: /positions, the heaviest payload) ---
+    def active_check(trader):
+        wallet = trader.get('proxyWallet')
+        active = cache.get_balance(wallet) if incremental else None
+        if active is None:
+            positions = get_positions(wallet)
+            active = sum([float(p.get('currentValue', 0)) for p in positions])
+            if cache: cache.set_balance(wallet, active)
+            if captured is not None and active >= MIN_ACTIVE: captured[wallet] = (positions, time.time())
+        trader['active_balance'] = active
+        return active >= MIN_ACTIVE
+
+    return Pipeline([
+        Stage("trades", trades_check, cost=1),
+        Stage("active_balance", active_check, cost=2),
+        Stage("roi", roi_check, cost=0),
+    ])
+
+def check_trader(trader, pipeline):
     try:
-        r = requests.get(f"https://data-api.polymarket.com/positions?user={wallet}", headers=HEADERS)
-        data = r.json()
-        return sum([float(p.get('currentValue', 0)) for p in data])
-    except:
-        return 0.0
-
-def run_scan():
-    print(f"🚀 Starting Scan of top {SCAN_LIMIT} profiles...")
+        if not pipeline.run(trader):
+            metrics.inc("scan_wallets", outcome="filtered")
+            return None
+    except ApiError as e:
+        print(f"⚠️ Skipped {trader.get('proxyWallet')}: {e}")
+        metrics.inc("scan_wallets", outcome="api_error", status=e.status or "network")
+        return e
+
+    metrics.inc("scan_wallets", outcome="whale")
+    userName = trader.get('userName') or "Unknown"
+    print(f"✅ FOUND WHALE: {userName} (Active: ${trader['active_balance']:,.0f} | ROI: {trader['roi']:.1f}%)")
+    return trader
+
+def run_scan(max_in_flight=MAX_IN_FLIGHT, incremental=False, resume=False, export_csv=False, limit=SCAN_LIMIT,
+             metrics_file=METRICS_FILE, boards=None):
+    started = time.time()
+    boards = boards or [DEFAULT_BOARD]
+    mode = "incremental" if incremental else "full"
+    print(f"🚀 Starting {mode} Scan of top {limit} profiles on {len(boards)} board(s) ({max_in_flight} requests in flight)...")
+    print(f"   Boards: {', '.join(board_label(b) for b in boards)}")
     print(f"   Filters: >${MIN_ACTIVE} Active | >{MIN_TRADES} Trades | >{MIN_ROI}% ROI")
-    
-    base_url = "https://data-api.polymarket.com/v1/leaderboard"
-    elite_survivors = []
-    
-    # Calculate pages: 1000 people / 50 per page = 20 Pages
-    pages = SCAN_LIMIT // 50
-    
-    for i in range(pages):
-        print(f"📄 Scanning Page {i+1}/{pages}...")
-        try:
-            # Fetches the top monthly traders (sorted by PnL)
-            params = {"category": "OVERALL", "timePeriod": "MONTH", "orderBy": "PNL", "limit": 50, "offset": i*50}
-            batch = requests.get(base_url, params=params, headers=HEADERS).json()
-            
-            for trader in batch:
-                wallet = trader.get('proxyWallet')
-                
-                # --- LOGIC CHECK 1: TRADES > 100 ---
-                trades = get_trade_count(wallet)
-                if trades >= MIN_TRADES:
-                    
-                    # Be polite to API (prevents crashing)
-                    time.sleep(0.1) 
-                    
-                    # --- LOGIC CHECK 2: ACTIVE CASH > $10k ---
-                    active = get_active_balance(wallet)
-                    if active >= MIN_ACTIVE:
-                        
-                        # --- LOGIC CHECK 3: ROI > 1% ---
-                        profit = float(trader.get('pnl', 0))
-                        vol = float(trader.get('vol', trader.get('volume', 0)))
-                        
-                        # Formula: (Profit / Volume) * 100
-                        roi = (profit / vol * 100) if vol > 0 else 0
-                        
-                        if roi >= MIN_ROI:
-                            userName = trader.get('userName') or "Unknown"
-                            print(f"✅ FOUND WHALE: {userName} (Active: ${active:,.0f} | ROI: {roi:.1f}%)")
-                            
-                            # Add to the "Survivors" list
-                            trader['active_balance'] = active
-                            trader['trade_count'] = trades
-                            trader['roi'] = roi
-                            elite_survivors.append(trader)
-                            
-        except Exception as e:
-            print(f"Error on page {i}: {e}")
-
-    # Save results to CSV
+
+    # Calculate pages: 1000 people / 50 per page = 20 Pages (per board)
+    pages = (limit + PAGE_SIZE - 1) // PAGE_SIZE
+    params = {"limit": limit, "min_active": MIN_ACTIVE, "min_trades": MIN_TRADES, "min_roi": MIN_ROI,
+              "boards": [board_label(b) for b in boards]}
+    out = ScanWriter(params, resume=resume, csv_export=CSV_EXPORT_FILE if export_csv else None)
+    # Page keys look like "OVERALL/MONTH/PNL@50"
+    tasks = [(board, i * PAGE_SIZE) for board in boards for i in range(pages)
+             if f"{board_label(board)}@{i * PAGE_SIZE}" not in out.done]
+    if resume and out.done:
+        print(f"⏩ Resuming: {len(out.done)}/{pages * len(boards)} pages already done")
+
+    # Every worker thread holds at most one data-api connection, so size the pool to match.
+    api_client.set_pool_size(urlsplit(DATA_API).hostname, max_in_flight)
+
+    failed, failed_pages, duplicates = 0, 0, 0
+    # Full scans skip cache reads but still refresh it for the next incremental run.
+    cache = WalletCache()
+    metrics.register_cache("wallets", cache)
+    captured = {}
+    pipeline = build_pipeline(cache, incremental, captured)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            # Grab every page of every board up front, then check all wallets in parallel.
+            keys = [f"{board_label(board)}@{offset}" for board, offset in tasks]
+            batches = dict(zip(keys, executor.map(lambda t: get_leaderboard_page(t[1], t[0]), tasks)))
+            print(f"📄 Loaded {sum(len(b) for b in batches.values() if b)} profiles from {len(tasks)} pages")
+
+            # Dedup: a wallet keeps the leaderboard row of its primary board (scan_output.board_priority) and is checked once.
+            traders, pages_of, remaining, results = {}, {}, {}, {}
+            for key, batch in batches.items():
+                if batch is None:
+                    failed_pages += 1
+                    continue
+                remaining[key], results[key] = len(batch), []
+                if not batch: out.write_page(key, [])
+                label = key.rsplit("@", 1)[0]
+                for trader in batch:
+                    add_trader(traders, trader, label)
+                    pages_of.setdefault(trader.get('proxyWallet'), []).append(key)
+            duplicates = sum(remaining.values()) - len(traders)
+            metrics.inc("scan_duplicates", duplicates)
+            if len(boards) > 1: print(f"🧬 {len(traders)} unique wallets ({duplicates} duplicates across boards skipped)")
+            futures = {executor.submit(check_trader, trader, pipeline): wallet for wallet, trader in traders.items()}
+
+            # Stream each page's survivors to disk as soon as its last wallet is checked.
+            # A page with API errors is left unmarked so --resume retries the whole page.
+            page_errors = set()
+            for fut in concurrent.futures.as_completed(futures):
+                wallet, result = futures[fut], fut.result()
+                wallet_pages = pages_of[wallet]
+                if isinstance(result, ApiError):
+                    failed += 1
+                    page_errors.update(wallet_pages)
+                for key in wallet_pages:
+                    # Listed under every page: whichever page completes first carries it, finalize() dedups
+                    if result is not None and not isinstance(result, ApiError) and result not in results[key]:
+                        results[key].append(result)
+                    remaining[key] -= 1
+                    if remaining[key] == 0 and key not in page_errors:
+                        out.write_page(key, results.pop(key))
+            failed_pages += len(page_errors)
+    finally:
+        cache.close()
+        out.close()
+
+    if failed:
+        print(f"⚠️ {failed} wallets skipped because of API errors (not filters)")
+    print("🧪 Filter stages (cheapest first):")
+    for line in pipeline.report(): print(line)
+    if incremental:
+        print(f"💾 Wallet cache saved {cache.hits} API calls ({cache.misses} refetched)")
+    for host, s in api_client.host_stats().items():
+        print(f"   {host}: {s['requests']} requests | {s['retries']} retries | {s['throttled']} throttled | {s['errors']} errors")
+
+    summary = {"scan": {"mode": mode, "limit": limit, "max_in_flight": max_in_flight, "pages": pages * len(boards),
+                        "boards": [board_label(b) for b in boards], "duplicates": duplicates, "failed_pages": failed_pages, "wallet_errors": failed, "wall_s": round(time.time() - started, 2),
+                        "api_hosts": api_client.host_stats()}}
+    if failed_pages:
+        print(f"❌ {failed_pages} pages incomplete. '{OUTPUT_FILE}' left untouched; run with --resume to finish.")
+        write_metrics(metrics_file, summary)
+        return
+
+    # Swap the finished results in atomically (an empty scan still writes a header-only file)
+    elite_survivors = out.finalize()
+    snapshot_path = snapshots.append_snapshot(elite_survivors)
+    print(f"🗂️ Daily snapshot saved to '{snapshot_path}'")
+    rows, wallets = save_positions(elite_survivors, captured)
+    print(f"📦 Saved {rows} open positions of {wallets} whales to '{POSITIONS_FILE}'")
+    summary["scan"]["whales"] = len(elite_survivors)
+    write_metrics(metrics_file, summary)
+    if export_csv: print(f"📝 Exported CSV copy to '{CSV_EXPORT_FILE}'")
     if elite_survivors:
-        df = pd.DataFrame(elite_survivors)
-        df.to_csv("elite_data.csv", index=False)
-        print(f"🎉 SUCCESS! Saved {len(elite_survivors)} whales to 'elite_data.csv'")
+        print(f"🎉 SUCCESS! Saved {len(elite_survivors)} whales to '{OUTPUT_FILE}'")
     else:
-        print("❌ No traders matched your strict filters.")
+        print(f"❌ No traders matched your strict filters. Wrote an empty '{OUTPUT_FILE}'.")
+
+def save_positions(survivors, captured, path=POSITIONS_FILE):
+    # Whales whose balance came from the wallet cache (or an earlier --resume run) weren't fetched
+    # this time: they keep their rows from the previous file, which carries its own fetched_at.
+    previous = None
+    if os.path.exists(path):
+        try: previous = PositionStore(path)
+        except (OSError, pa.ArrowInvalid, ValueError): pass
+    keep = {}
+    for row in survivors:
+        wallet = row["proxyWallet"]
+        entry = captured.get(wallet) or (previous.get(wallet) if previous is not None else None)
+        if entry is not None: keep[wallet] = entry
+    # The dashboard renders these offline, so fill in market titles the payload didn't carry
+    missing = {p.get('conditionId') for raw, _ in keep.values() for p in raw if not p.get('title')}
+    market_map = market_cache.lookup(list(missing), headers=HEADERS) if missing else {}
+    for wallet, (raw, fetched_at) in keep.items():
+        keep[wallet] = ([p if p.get('title') else {**p, **{k: market_map.get(p.get('conditionId'), {}).get(k) for k in ('title', 'slug')}}
+                         for p in raw], fetched_at)
+    return write_positions(keep, path), len(keep)
+
+def write_metrics(path, summary):
+    if not path: return
+    metrics.write_json(path, summary)
+    print(f"📈 Metrics summary written to '{path}'")
 
 if __name__ == "__main__":
-    run_scan()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scan the Polymarket leaderboard for elite whales.")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+                        help="concurrent API requests (1 = serial scan)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only refetch wallets that are new or stale in the wallet cache")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted scan from its last checkpoint")
+    parser.add_argument("--csv", action="store_true",
+                        help=f"also export results to {CSV_EXPORT_FILE}")
+    parser.add_argument("--limit", type=int, default=SCAN_LIMIT,
+                        help="number of leaderboard profiles to scan")
+    parser.add_argument("--categories", nargs="+", default=[DEFAULT_BOARD[0]],
+                        help="leaderboard categories to scan (OVERALL, POLITICS, SPORTS, CRYPTO, ...)")
+    parser.add_argument("--periods", nargs="+", default=[DEFAULT_BOARD[1]], type=str.upper, choices=PERIODS,
+                        help="leaderboard time windows to scan")
+    parser.add_argument("--order-by", nargs="+", default=[DEFAULT_BOARD[2]], type=str.upper, choices=ORDER_BY,
+                        help="leaderboard sort keys to scan")
+    parser.add_argument("--workers", type=int, choices=[0, 1],
+                        help="coordinator/worker mode: shard the scan over a queue, with 1 local worker process or 0 "
+                             "(coordinator only). Local processes share one rate limit, so add speed with --worker on other boxes")
+    parser.add_argument("--worker", action="store_true",
+                        help="only serve shards from --queue, one worker per box (e.g. another box sharing the volume, with its own IP)")
+    parser.add_argument("--queue", default=QUEUE_FILE,
+                        help="SQLite work queue for --workers/--worker (put it on a shared volume to use several boxes)")
+    parser.add_argument("--metrics-json", default=METRICS_FILE,
+                        help="where to write the end-of-scan metrics summary ('' to skip)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve live Prometheus metrics on this port while scanning")
+    args = parser.parse_args()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+        print(f"📈 Prometheus metrics on http://localhost:{args.metrics_port}/metrics")
+    max_in_flight = max(1, args.max_in_flight)
+    boards = board_matrix(args.categories, args.periods, args.order_by)
+    try:
+        if args.worker:
+            from sharded_scan import run_workers
+            run_workers(args.queue, max_in_flight)
+        elif args.workers is not None:
+            from sharded_scan import run_sharded_scan
+            run_sharded_scan(workers=args.workers, max_in_flight=max_in_flight, incremental=args.incremental,
+                             resume=args.resume, export_csv=args.csv, limit=args.limit, metrics_file=args.metrics_json,
+                             boards=boards, queue_path=args.queue)
+        else:
+            run_scan(max_in_flight=max_in_flight, incremental=args.incremental, resume=args.resume, export_csv=args.csv,
+                     limit=args.limit, metrics_file=args.metrics_json, boards=boards)
+    finally: api_client.close()
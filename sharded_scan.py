@@ -0,0 +1,263 @@
+import concurrent.futures
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+import api_client
+from api_client import DATA_API, ApiError
+from wallet_cache import WalletCache
+from scanner import (DEFAULT_BOARD, PAGE_SIZE, MAX_IN_FLIGHT, MIN_ACTIVE, MIN_TRADES, MIN_ROI, METRICS_FILE,
+                     board_label, get_leaderboard_page, build_pipeline, check_trader, save_positions, write_metrics)
+from scan_output import WORK_DIR, OUTPUT_FILE, CSV_EXPORT_FILE, OUTPUT_COLUMNS, add_trader, merge_rows, publish
+from scan_queue import ScanQueue, QUEUE_FILE
+from position_store import POSITIONS_FILE, SCHEMA as POSITION_SCHEMA
+import metrics
+import snapshots
+
+# --- 1. SETTINGS ---
+# Coordinator/worker mode for scans too big for one process (top 50k-100k profiles).
+# The coordinator cuts the scan into shards on a ScanQueue: first leaderboard pages,
+# then (once every page is in and wallets are deduped across boards) batches of
+# wallets. Workers - the coordinator's own local process, and other boxes pointed at
+# the same queue file on a shared volume - lease shards, heartbeat while they work and
+# store each result in the queue; a shard whose worker errors or disappears is retried elsewhere.
+# The scan is bound by the API's per-IP rate limit, not by CPU: a second process on the
+# same box would only split that budget (measured slower than one process), so each box
+# runs one worker and the speedup comes from boxes with their own IPs (bench_sharded_scan.py).
+PAGES_PER_SHARD = 10        # Leaderboard pages per shard
+WALLETS_PER_SHARD = 200     # Wallets checked per shard...
+MIN_WALLET_SHARDS = 16      # ...but at least this many shards, so every box has some to do on small scans
+POLL_SECONDS = 1.0          # Idle workers / the waiting coordinator look at the queue this often
+PROGRESS_SECONDS = 10.0
+MAX_RESTARTS = 10           # Local workers replaced per scan before the coordinator gives up
+WORKER_LOG = os.path.join(WORK_DIR, "scan_worker.log")   # Where the local worker's output goes
+
+# Only what save_positions() needs travels back through the queue
+POSITION_FIELDS = [f.name for f in POSITION_SCHEMA if f.name not in ("wallet", "fetched_at")]
+
+# --- 2. SHARD WORK ---
+# Either phase raises on any API error, so a shard is only ever stored complete.
+def fetch_pages(shard, cache, max_in_flight):
+    board, offsets = tuple(shard["payload"]["board"]), shard["payload"]["offsets"]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(offsets)))) as executor:
+        batches = list(executor.map(lambda offset: get_leaderboard_page(offset, board), offsets))
+    missing = [offset for offset, batch in zip(offsets, batches) if batch is None]
+    if missing: raise ApiError(f"{board_label(board)} pages at offsets {missing} failed")
+    return {"board": board_label(board), "batches": batches}
+
+def check_wallets(shard, cache, max_in_flight):
+    captured = {}
+    pipeline = build_pipeline(cache, shard["params"]["incremental"], captured)
+    traders = shard["payload"]["traders"]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        results = list(executor.map(lambda trader: check_trader(trader, pipeline), traders))
+    errors = [r for r in results if isinstance(r, ApiError)]
+    if errors: raise ApiError(f"{len(errors)} of {len(traders)} wallets failed (first: {errors[0]})")
+    return {"survivors": [{c: r.get(c) for c in OUTPUT_COLUMNS} for r in results if r is not None],
+            "positions": {w: [[{k: p.get(k) for k in POSITION_FIELDS} for p in raw], fetched_at] for w, (raw, fetched_at) in captured.items()},
+            "stages": pipeline.counts}
+
+SHARD_WORK = {"pages": fetch_pages, "wallets": check_wallets}
+
+# --- 3. WORKER ---
+class Heartbeat:
+    # Renews a shard's lease from a side thread (own connection) while the worker is busy with it
+    def __init__(self, queue_path, shard, owner, every):
+        self.stopped = threading.Event()
+        def run():
+            queue = ScanQueue(queue_path)
+            try:
+                while not self.stopped.wait(every):
+                    if not queue.renew(shard, owner): break
+            finally: queue.close()
+        self.thread = threading.Thread(target=run, name=f"lease-{shard}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+def run_worker(queue_path=QUEUE_FILE, max_in_flight=MAX_IN_FLIGHT, wait=False):
+    # wait=False returns once no scan is running; wait=True keeps polling for the next one
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    queue = ScanQueue(queue_path)
+    cache = WalletCache()
+    done = 0
+    try:
+        while True:
+            shard = queue.claim(owner)
+            if shard is None:
+                if not wait and not queue.running(): break
+                time.sleep(POLL_SECONDS)
+                continue
+            heartbeat = Heartbeat(queue_path, shard["id"], owner, queue.lease_seconds / 3)
+            try:
+                with metrics.timed("scan_shard", phase=shard["phase"]):
+                    result = SHARD_WORK[shard["phase"]](shard, cache, max_in_flight)
+            except Exception as e:
+                metrics.inc("scan_shards", phase=shard["phase"], outcome="error")
+                print(f"⚠️ Shard {shard['id']} ({shard['phase']}, attempt {shard['attempt']}) failed: {e}")
+                queue.fail(shard["id"], owner, e)
+                continue
+            finally:
+                heartbeat.stop()
+                cache.flush()
+            if queue.complete(shard["id"], owner, result):
+                metrics.inc("scan_shards", phase=shard["phase"], outcome="done")
+                done += 1
+            else:
+                metrics.inc("scan_shards", phase=shard["phase"], outcome="lease_lost")
+                print(f"⚠️ Shard {shard['id']} lease was lost, its result was dropped")
+    finally:
+        cache.close()
+        queue.close()
+    return done
+
+def _worker_process(queue_path, rate_limits, default_rate_limit, max_in_flight, wait, log_path):
+    # Spawned processes start with a fresh api_client (take the parent's limits) and write
+    # their shard messages to their own log, not over the coordinator's progress lines
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    sys.stdout = sys.stderr = open(log_path, "a", buffering=1, encoding="utf-8")
+    api_client.RATE_LIMITS.update(rate_limits)
+    api_client.DEFAULT_RATE_LIMIT = tuple(default_rate_limit)
+    api_client.set_pool_size(urlsplit(DATA_API).hostname, max_in_flight)
+    print(f"🛠️ Worker {socket.gethostname()}:{os.getpid()} serving '{queue_path}'")
+    try: run_worker(queue_path, max_in_flight, wait)
+    except KeyboardInterrupt: pass
+    finally: api_client.close()
+
+def spawn_worker(queue_path, max_in_flight=MAX_IN_FLIGHT, wait=False, log_path=WORKER_LOG):
+    # The worker gets this process's full rate limits: only one should run per box (or per IP)
+    ctx = multiprocessing.get_context("spawn")
+    process = ctx.Process(target=_worker_process, daemon=False,
+                          args=(queue_path, dict(api_client.RATE_LIMITS), api_client.DEFAULT_RATE_LIMIT, max_in_flight, wait, log_path))
+    process.start()
+    return process
+
+def run_workers(queue_path=QUEUE_FILE, max_in_flight=MAX_IN_FLIGHT, wait=True):
+    # Joins a queue (usually on a shared volume) from another box, with this box's whole rate limit
+    print(f"🛠️ Worker on {socket.gethostname()} serving '{queue_path}' ({max_in_flight} requests in flight)")
+    api_client.set_pool_size(urlsplit(DATA_API).hostname, max_in_flight)
+    try: run_worker(queue_path, max_in_flight, wait)
+    except KeyboardInterrupt: pass
+
+# --- 4. COORDINATOR ---
+def _wait_for(queue, scan, phase, spawn, workers, restarts):
+    # Blocks until the phase has no pending/leased shards; False if one failed for good.
+    # Local workers that die mid-scan are replaced (their shards come back when the lease runs out).
+    last = time.monotonic()
+    while True:
+        progress = queue.progress(scan, phase)
+        if progress["failed"]: return False
+        if not progress["pending"] and not progress["leased"]: return True
+        for i, process in enumerate(workers):
+            if not process.is_alive():
+                if len(restarts) >= MAX_RESTARTS:
+                    print(f"❌ Local workers keep exiting ({len(restarts)} restarts), giving up")
+                    return False
+                restarts.append(process.exitcode)
+                print(f"⚠️ Worker {process.pid} exited ({process.exitcode}), starting a new one")
+                metrics.inc("scan_workers_restarted")
+                workers[i] = spawn()
+        if time.monotonic() - last >= PROGRESS_SECONDS:
+            last = time.monotonic()
+            total = sum(progress.values())
+            print(f"   {phase}: {progress['done']}/{total} shards done | {progress['leased']} in progress")
+        time.sleep(POLL_SECONDS)
+
+def wallet_shards(batches):
+    # Same dedup as run_scan: a wallet keeps the row of its primary board and collects every board label
+    traders, total = {}, 0
+    for label, batch in batches:
+        total += len(batch)
+        for trader in batch: add_trader(traders, trader, label)
+    traders = list(traders.values())
+    size = max(1, min(WALLETS_PER_SHARD, -(-len(traders) // MIN_WALLET_SHARDS)))
+    return [{"traders": traders[i:i + size]} for i in range(0, len(traders), size)], len(traders), total - len(traders)
+
+def run_sharded_scan(workers=1, max_in_flight=MAX_IN_FLIGHT, incremental=False, resume=False, export_csv=False,
+                     limit=1000, metrics_file=METRICS_FILE, boards=None, queue_path=QUEUE_FILE):
+    started = time.time()
+    if workers > 1:
+        print(f"⚠️ {workers} local workers would split this box's rate limit between them: running 1. "
+              f"Add speed with workers on other boxes (own IP, own budget).")
+    workers = min(max(0, workers), 1)
+    boards = boards or [DEFAULT_BOARD]
+    mode = "incremental" if incremental else "full"
+    print(f"🚀 Starting sharded {mode} Scan of top {limit} profiles on {len(boards)} board(s) with {workers} local worker(s)...")
+    print(f"   Queue: '{queue_path}' (workers on other boxes: scanner.py --worker --queue <same file>)")
+    if workers: print(f"   Local worker log: '{WORKER_LOG}'")
+    print(f"   Filters: >${MIN_ACTIVE} Active | >{MIN_TRADES} Trades | >{MIN_ROI}% ROI")
+
+    pages = (limit + PAGE_SIZE - 1) // PAGE_SIZE
+    params = {"limit": limit, "min_active": MIN_ACTIVE, "min_trades": MIN_TRADES, "min_roi": MIN_ROI,
+              "boards": [board_label(b) for b in boards], "incremental": incremental}
+    queue = ScanQueue(queue_path)
+    scan = queue.resume_scan(params) if resume else None
+    if scan is not None:
+        print(f"⏩ Resuming scan #{scan}: {queue.stats(scan)['shards']} shards already queued")
+    else:
+        scan = queue.start_scan(params)
+        offsets = [i * PAGE_SIZE for i in range(pages)]
+        queue.add_shards(scan, "pages", [{"board": list(board), "offsets": offsets[i:i + PAGES_PER_SHARD]}
+                                         for board in boards for i in range(0, len(offsets), PAGES_PER_SHARD)])
+
+    spawn = lambda: spawn_worker(queue_path, max_in_flight)
+    local, restarts = [spawn() for _ in range(workers)], []
+    summary = {"scan": {"mode": mode, "limit": limit, "max_in_flight": max_in_flight, "pages": pages * len(boards),
+                        "boards": [board_label(b) for b in boards], "workers": workers, "queue_scan": scan, "worker_restarts": restarts}}
+    try:
+        ok = _wait_for(queue, scan, "pages", spawn, local, restarts)
+        duplicates = 0
+        if ok:
+            # Shards come back in the order they were queued: board by board, offset by offset
+            batches = [(result["board"], batch) for result in queue.results(scan, "pages") for batch in result["batches"]]
+            shards, unique, duplicates = wallet_shards(batches)
+            print(f"📄 Loaded {unique + duplicates} profiles from {pages * len(boards)} pages")
+            if len(boards) > 1: print(f"🧬 {unique} unique wallets ({duplicates} duplicates across boards skipped)")
+            metrics.inc("scan_duplicates", duplicates)
+            if not sum(queue.progress(scan, "wallets").values()):
+                queue.add_shards(scan, "wallets", shards)
+            ok = _wait_for(queue, scan, "wallets", spawn, local, restarts)
+        summary["scan"].update(duplicates=duplicates, shards=queue.stats(scan), wall_s=round(time.time() - started, 2))
+        if not ok:
+            queue.set_scan_state(scan, "aborted")
+            for error in queue.errors(scan): print(f"   {error}")
+            print(f"❌ Shards failed after {queue.max_attempts} attempts. '{OUTPUT_FILE}' left untouched; run with --resume to retry them.")
+            write_metrics(metrics_file, summary)
+            return
+
+        # Merge: shard results in queue order, then one deterministic sort (rank, wallet)
+        rows, captured, pipeline = [], {}, build_pipeline()
+        for result in queue.results(scan, "wallets"):
+            rows.extend(result["survivors"])
+            captured.update({w: (raw, fetched_at) for w, (raw, fetched_at) in result["positions"].items()})
+            for stage, counts in result["stages"].items():
+                for key, n in counts.items(): pipeline.counts[stage][key] += n
+        elite_survivors = merge_rows(rows)
+        publish(elite_survivors, OUTPUT_FILE, CSV_EXPORT_FILE if export_csv else None)
+        queue.set_scan_state(scan, "finished")
+    finally:
+        if queue.scan_state(scan) == "running": queue.set_scan_state(scan, "aborted")
+        # Workers leave once no scan is running
+        for process in local: process.join()
+        queue.close()
+
+    print("🧪 Filter stages (cheapest first):")
+    for line in pipeline.report(): print(line)
+    stats = summary["scan"]["shards"]
+    print(f"🧩 {stats['shards']} shards in {stats['attempts']} attempts by {stats['workers']} worker(s)")
+    snapshot_path = snapshots.append_snapshot(elite_survivors)
+    print(f"🗂️ Daily snapshot saved to '{snapshot_path}'")
+    positions, wallets = save_positions(elite_survivors, captured)
+    print(f"📦 Saved {positions} open positions of {wallets} whales to '{POSITIONS_FILE}'")
+    summary["scan"]["whales"] = len(elite_survivors)
+    write_metrics(metrics_file, summary)
+    if export_csv: print(f"📝 Exported CSV copy to '{CSV_EXPORT_FILE}'")
+    if elite_survivors:
+        print(f"🎉 SUCCESS! Saved {len(elite_survivors)} whales to '{OUTPUT_FILE}'")
+    else:
+        print(f"❌ No traders matched your strict filters. Wrote an empty '{OUTPUT_FILE}'.")
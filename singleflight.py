@@ -0,0 +1,64 @@
+import threading
+import metrics
+
+# --- SINGLE-FLIGHT GROUPS ---
+# Process-wide request coalescing. The first caller to ask for a key becomes its
+# leader and does the fetch; everyone who asks for the same key meanwhile waits on
+# that fetch and gets its result (or its exception) instead of hitting the API again.
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class Group:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def claim(self, keys):
+        # Returns (keys this caller must fetch and then finish(), {key: Call} already in flight elsewhere)
+        mine, theirs = [], {}
+        with self.lock:
+            for key in dict.fromkeys(keys):
+                call = self.calls.get(key)
+                if call is None:
+                    self.calls[key] = Call()
+                    mine.append(key)
+                else: theirs[key] = call
+        if mine: metrics.inc("singleflight", len(mine), group=self.name, role="leader")
+        if theirs: metrics.inc("singleflight", len(theirs), group=self.name, role="follower")
+        return mine, theirs
+
+    def finish(self, key, value=None, error=None):
+        with self.lock:
+            call = self.calls.pop(key, None)
+        if call is None: return
+        call.value, call.error = value, error
+        call.done.set()
+
+    def wait(self, call):
+        call.done.wait()
+        if call.error is not None: raise call.error
+        return call.value
+
+    def do(self, key, fn):
+        mine, theirs = self.claim([key])
+        if theirs: return self.wait(theirs[key])
+        try: value = fn()
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, value)
+        return value
+
+    def refresh(self, key, fn):
+        # Stale-while-revalidate: runs fn on a background thread unless a fetch for key is already in flight
+        mine, _ = self.claim([key])
+        if not mine: return False
+        def run():
+            try: self.finish(key, fn())
+            except Exception as e: self.finish(key, error=e)
+        threading.Thread(target=run, name=f"{self.name}-refresh", daemon=True).start()
+        return True
@@ -0,0 +1,178 @@
+import os
+from datetime import datetime, timezone
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pandas as pd
+
+# --- 1. LAYOUT ---
+# One Parquet file per scan day: history/date=YYYY-MM-DD/snapshot.parquet.
+# Rows are sorted by wallet and written in small row groups, so the min/max
+# statistics let a wallet lookup skip almost every page of every file. The price
+# of append-only daily files is that a range query opens one file per day
+# (~50 ms for 30 days, ~450 ms for a year in bench_snapshots.py).
+# Money is stored as integer cents, delta-encoded over time: a wallet that was in
+# the previous snapshot (the file's base day, kept in the file metadata) stores how
+# much each number moved since then, which keeps ranks and trade counts near zero.
+# Every KEYFRAME_EVERY days a file holds full values again, so rebuilding a day
+# never reads more than that many files. Files without a base read as keyframes.
+HISTORY_DIR = "history"
+SNAPSHOT_NAME = "snapshot.parquet"
+ROW_GROUP_SIZE = 512     # a wallet lookup decodes one group: small groups = less work per file
+KEYFRAME_EVERY = 30      # days between full snapshots
+BASE_KEY = b"polywatch.base"     # file metadata: day the deltas are against ("" = keyframe)
+DEPTH_KEY = b"polywatch.depth"   # file metadata: files since the last keyframe
+
+SCHEMA = pa.schema([
+    ("wallet", pa.string()),     # dictionary-encoded by the Parquet writer, per row group
+    ("delta", pa.bool_()),       # True: the values below are changes since the base day
+    ("rank", pa.int32()),
+    ("balance_cents", pa.int64()),
+    ("pnl_cents", pa.int64()),
+    ("volume_cents", pa.int64()),
+    ("trade_count", pa.int64()),
+])
+VALUE_COLUMNS = ["rank", "balance_cents", "pnl_cents", "volume_cents", "trade_count"]
+
+def _cents(x):
+    try: return int(round(float(x) * 100))
+    except (TypeError, ValueError): return None
+
+def _int(x):
+    try: return int(float(x))
+    except (TypeError, ValueError): return None
+
+def partition_path(day, history_dir=HISTORY_DIR):
+    return os.path.join(history_dir, f"date={day}", SNAPSHOT_NAME)
+
+def list_dates(history_dir=HISTORY_DIR):
+    if not os.path.isdir(history_dir): return []
+    return sorted(d[5:] for d in os.listdir(history_dir)
+                  if d.startswith("date=") and os.path.exists(os.path.join(history_dir, d, SNAPSHOT_NAME)))
+
+def _chain(pf):
+    # (base day or None, depth) from a file's metadata
+    meta = pf.schema_arrow.metadata or {}
+    base = meta.get(BASE_KEY, b"").decode() or None
+    return base, (int(meta.get(DEPTH_KEY, b"0")) if base else 0)
+
+# --- 2. WRITE ---
+def _align(table, base):
+    # base's values for each wallet of table (nulls where base doesn't have the wallet)
+    return base.take(pc.index_in(table["wallet"], value_set=base["wallet"]))
+
+def _full_day(day, history_dir=HISTORY_DIR):
+    # Full values of every wallet on day, resolved through the base chain
+    pf = pq.ParquetFile(partition_path(day, history_dir))
+    base_day, _ = _chain(pf)
+    table = pf.read()
+    if "delta" not in table.column_names: return table.replace_schema_metadata()
+    if base_day:
+        base = _align(table, _full_day(base_day, history_dir))
+        for c in VALUE_COLUMNS:
+            i = table.schema.get_field_index(c)
+            table = table.set_column(i, c, pc.if_else(table["delta"], pc.add(table[c], base[c]), table[c]))
+    return table.drop_columns(["delta"]).replace_schema_metadata()
+
+def _write(day, table, base_day, base, depth, history_dir):
+    # table holds full values sorted by wallet; base (full values on base_day) is None for a keyframe
+    delta = pa.array([False] * table.num_rows, pa.bool_())
+    if base is not None:
+        # A wallet new since the base day, or with a gap there, is stored in full
+        base = _align(table, base)
+        delta = pc.is_valid(base["rank"])
+        for c in VALUE_COLUMNS[1:]: delta = pc.and_(delta, pc.is_valid(base[c]))
+        for c in VALUE_COLUMNS:
+            i = table.schema.get_field_index(c)
+            table = table.set_column(i, c, pc.if_else(delta, pc.subtract(table[c], base[c]), table[c]))
+    table = table.add_column(1, "delta", delta).cast(SCHEMA).replace_schema_metadata(
+        {BASE_KEY: (base_day or "").encode(), DEPTH_KEY: str(depth).encode()})
+
+    path = partition_path(day, history_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression="zstd",
+                   use_dictionary=["wallet"], column_encoding={c: "DELTA_BINARY_PACKED" for c in VALUE_COLUMNS},
+                   sorting_columns=[pq.SortingColumn(0)], write_statistics=True)
+    os.replace(tmp, path)
+    return path
+
+def append_snapshot(rows, day=None, history_dir=HISTORY_DIR):
+    # rows are scanner survivors (proxyWallet, rank, active_balance, pnl, vol, trade_count).
+    # A re-run on the same day replaces that day's file; older days are never touched.
+    day = day or datetime.now(timezone.utc).date().isoformat()
+    latest = {}
+    for r in rows:
+        wallet = (r.get("proxyWallet") or "").lower()
+        if wallet: latest[wallet] = r
+    wallets = sorted(latest)
+    table = pa.table({
+        "wallet": pa.array(wallets, pa.string()),
+        "rank": pa.array([_int(latest[w].get("rank")) for w in wallets], pa.int32()),
+        "balance_cents": pa.array([_cents(latest[w].get("active_balance")) for w in wallets], pa.int64()),
+        "pnl_cents": pa.array([_cents(latest[w].get("pnl")) for w in wallets], pa.int64()),
+        "volume_cents": pa.array([_cents(latest[w].get("vol")) for w in wallets], pa.int64()),
+        "trade_count": pa.array([_int(latest[w].get("trade_count")) for w in wallets], pa.int64()),
+    })
+
+    days = list_dates(history_dir)
+    # A later file whose deltas point at this day (re-run or backfill) becomes a keyframe
+    # first, so replacing this day can't change what that file decodes to
+    for later in (d for d in days if d > day):
+        if _chain(pq.ParquetFile(partition_path(later, history_dir)))[0] == day:
+            _write(later, _full_day(later, history_dir), None, None, 0, history_dir)
+    earlier = [d for d in days if d < day]
+    depth = _chain(pq.ParquetFile(partition_path(earlier[-1], history_dir)))[1] + 1 if earlier else KEYFRAME_EVERY
+    if depth >= KEYFRAME_EVERY: return _write(day, table, None, None, 0, history_dir)
+    return _write(day, table, earlier[-1], _full_day(earlier[-1], history_dir), depth, history_dir)
+
+# --- 3. READ ---
+def _read_wallet(path, wallet):
+    # Row groups whose [min, max] wallet range can't hold the wallet are never decoded
+    pf = pq.ParquetFile(path)
+    groups = []
+    for i in range(pf.num_row_groups):
+        stats = pf.metadata.row_group(i).column(0).statistics
+        if stats is None or not stats.has_min_max or stats.min <= wallet <= stats.max: groups.append(i)
+    base_day, _ = _chain(pf)
+    if not groups: return None, base_day
+    table = pf.read_row_groups(groups)
+    table = table.filter(pc.equal(table["wallet"], wallet))
+    if table.num_rows == 0: return None, base_day
+    row = table.to_pylist()[0]
+    return (row.get("delta", False), tuple(row[c] for c in VALUE_COLUMNS)), base_day
+
+def wallet_history(wallet, start=None, end=None, history_dir=HISTORY_DIR):
+    # One row per snapshot day in [start, end] (ISO dates, inclusive), money back in dollars.
+    # Days before start are only read to resolve the first rows' deltas (back to a keyframe).
+    wallet = (wallet or "").lower()
+    start, end = str(start) if start else None, str(end) if end else None
+    memo = {}
+    def full(day):
+        if day not in memo:
+            found, base_day = _read_wallet(partition_path(day, history_dir), wallet)
+            if found is None: memo[day] = None
+            else:
+                delta, row = found
+                prev = full(base_day) if delta else None
+                memo[day] = tuple(None if v is None else v + p for v, p in zip(row, prev)) if delta else row
+        return memo[day]
+
+    records = []
+    for day in list_dates(history_dir):
+        if (start and day < start) or (end and day > end): continue
+        row = full(day)
+        if row is not None: records.append((day, *row))
+    columns = ["date", "rank", "balance", "pnl", "volume", "trade_count"]
+    if not records: return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(records, columns=["date"] + VALUE_COLUMNS)
+    df["date"] = pd.to_datetime(df["date"])
+    for cents, dollars in (("balance_cents", "balance"), ("pnl_cents", "pnl"), ("volume_cents", "volume")):
+        df[dollars] = df.pop(cents) / 100.0
+    return df[columns]
+
+def read_day(day, history_dir=HISTORY_DIR):
+    df = _full_day(day, history_dir).to_pandas()
+    df["wallet"] = df["wallet"].astype(str)
+    for col in ("balance_cents", "pnl_cents", "volume_cents"): df[col] = df[col] / 100.0
+    return df.rename(columns={"balance_cents": "balance", "pnl_cents": "pnl", "volume_cents": "volume"})
@@ -0,0 +1,71 @@
+import alerts
+from alerts import diff, build_messages, chunk_lines, format_alert, MAX_MESSAGE_CHARS
+
+WALLET = "0x1234567890abcdef1234567890abcdef12345678"
+
+def pos(size, value, title="Will it rain?", outcome="Yes"):
+    return (size, value, title, outcome)
+
+# --- diff: opens, closes, resizes ---
+def test_open_at_or_above_min_change_alerts():
+    out = diff(WALLET, {}, {"a": pos(1000, 1000.0), "b": pos(10, 999.0)}, min_change=1000)
+    assert [(a["kind"], a["change"]) for a in out] == [("opened", 1000.0)]
+
+def test_close_at_or_above_min_change_alerts():
+    out = diff(WALLET, {"a": pos(2000, 1500.0), "b": pos(5, 50.0)}, {}, min_change=1000)
+    assert [(a["kind"], a["value"], a["change"]) for a in out] == [("closed", 0.0, -1500.0)]
+
+def test_resize_is_priced_at_todays_price():
+    # 1000 -> 1500 shares at $2 = +$1000; the old value doesn't matter
+    out = diff(WALLET, {"a": pos(1000, 500.0)}, {"a": pos(1500, 3000.0)}, min_change=1000)
+    assert [(a["kind"], a["change"]) for a in out] == [("increased", 1000.0)]
+    out = diff(WALLET, {"a": pos(1500, 3000.0)}, {"a": pos(1000, 2000.0)}, min_change=1000)
+    assert [(a["kind"], a["change"]) for a in out] == [("reduced", -1000.0)]
+
+def test_resize_below_threshold_and_price_moves_are_quiet():
+    assert diff(WALLET, {"a": pos(1000, 2000.0)}, {"a": pos(1499, 2998.0)}, min_change=1000) == []
+    assert diff(WALLET, {"a": pos(1000, 2000.0)}, {"a": pos(1000, 9000.0)}, min_change=1000) == []
+
+def test_high_risk_flags_buys_over_share_of_wallet():
+    old = {"big": pos(100000, 100000.0)}
+    new = {"big": pos(100000, 100000.0), "a": pos(40000, 40000.0), "b": pos(20000, 20000.0)}
+    out = {a["market"]: a for a in diff(WALLET, old, {k: (*v[:2], k, "Yes") for k, v in new.items()}, 1000, high_risk=True)}
+    # 40k of a 160k wallet is exactly HIGH_RISK_SHARE; 20k is under it
+    assert out["a"].get("high_risk") and not out["b"].get("high_risk")
+    out = diff(WALLET, old, {k: (*v[:2], k, "Yes") for k, v in new.items()}, 1000, high_risk=False)
+    assert not any(a.get("high_risk") for a in out)
+
+# --- build_messages: chunking ---
+def alert(i, title="Market"):
+    return {"wallet": WALLET, "kind": "opened", "market": f"{title} {i}", "outcome": "Yes", "value": 5000.0, "change": 5000.0}
+
+def test_messages_stay_under_the_cap_and_keep_every_line_in_order():
+    batch = [alert(i, "x" * 150) for i in range(100)]
+    messages = build_messages(batch)
+    assert len(messages) > 1
+    assert all(len(m) <= MAX_MESSAGE_CHARS for m in messages)
+    assert "\n".join(messages).split("\n") == [format_alert(a) for a in batch]
+
+def test_small_batch_is_one_message():
+    assert build_messages([alert(i) for i in range(3)]) == ["\n".join(format_alert(alert(i)) for i in range(3))]
+    assert build_messages([]) == []
+
+def test_oversized_line_is_truncated_into_its_own_message():
+    messages = build_messages([alert(0), alert(1, "y" * 5000), alert(2)])
+    assert len(messages) == 3 and len(messages[1]) == MAX_MESSAGE_CHARS
+
+def test_title_with_newlines_stays_one_line():
+    assert "\n" not in format_alert(alert(0, "Line one\nline two\r\n"))
+    assert [len(c) for c in chunk_lines([alert(0, "a\nb"), alert(1)])] == [2]
+
+# --- flush: resend after a throttled message ---
+def test_flush_keeps_exactly_the_undelivered_alerts(tmp_path):
+    settings = tmp_path / "alert_settings.json"
+    alerts.save_settings({"webhook_url": "http://hook.invalid/x"}, str(settings))
+    posted, answers = [], iter([0.0, 3.0])
+    watcher = alerts.Watcher(wallets=[], settings_path=str(settings), send=lambda url, text, session: posted.append(text) or next(answers, 0.0))
+    batch = [alert(i, "multi\nline " + "z" * 150) for i in range(30)]
+    watcher.queue(batch)
+    watcher.flush(force=True)
+    first = len(chunk_lines(batch)[0])
+    assert len(posted) == 2 and watcher.pending == batch[first:]
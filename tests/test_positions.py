@@ -0,0 +1,65 @@
+import threading
+import time
+import positions
+from positions import PAGE_SIZE
+
+def fake_pages(monkeypatch, n_positions, delay=0.0):
+    # Serves n_positions fake positions in PAGE_SIZE pages; records every offset and peak concurrency
+    calls, state, lock = [], {"active": 0, "peak": 0}, threading.Lock()
+    def fetch(wallet, offset):
+        with lock:
+            calls.append((wallet, offset))
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(delay)
+        with lock: state["active"] -= 1
+        return [{"conditionId": f"c{i}", "currentValue": 10.0, "outcome": "Yes"}
+                for i in range(offset, min(offset + PAGE_SIZE, n_positions))]
+    monkeypatch.setattr(positions, "fetch_positions_page", fetch)
+    return calls, state
+
+# --- iter_position_pages ---
+def test_serial_pages_never_overlap(monkeypatch):
+    calls, state = fake_pages(monkeypatch, 950, delay=0.01)
+    pages = list(positions.iter_position_pages("0xw", workers=1))
+    assert [len(p) for p in pages] == [100] * 9 + [50]
+    assert state["peak"] == 1
+
+def test_parallel_pages_come_back_in_order(monkeypatch):
+    calls, state = fake_pages(monkeypatch, 950, delay=0.01)
+    pages = list(positions.iter_position_pages("0xw"))
+    assert [p[0]["conditionId"] for p in pages] == [f"c{i * PAGE_SIZE}" for i in range(10)]
+    assert 1 < state["peak"] <= positions.PAGE_WORKERS
+
+# --- single-flight leader handover ---
+def test_interrupted_leader_hands_the_fetch_to_one_waiter(monkeypatch):
+    # 450 positions = page 0 plus exactly one wave of PAGE_WORKERS pages, so no read-ahead is wasted
+    calls, _ = fake_pages(monkeypatch, 450, delay=0.02)
+    monkeypatch.setattr(positions.market_cache, "lookup", lambda ids, headers=None: {})
+    fetched = []
+    monkeypatch.setattr(positions, "_listeners", [lambda wallet, raw, at: fetched.append(len(raw))])
+    waiting, group = [], positions._flights
+    def wait(call):
+        waiting.append(call)
+        return type(group).wait(group, call)
+    monkeypatch.setattr(group, "wait", wait)
+    wallet = "0xhandover"
+
+    # The leader shows its first page, then the session goes away (Streamlit rerun) mid-fetch
+    leader = positions.stream_active_positions(wallet)
+    rows, error_msg, done = next(leader)
+    assert len(rows) == 100 and not done
+
+    results, n = [], 8
+    threads = [threading.Thread(target=lambda: results.append(positions.get_active_positions(wallet))) for _ in range(n)]
+    for t in threads: t.start()
+    deadline = time.time() + 5
+    while len(waiting) < n and time.time() < deadline: time.sleep(0.005)
+    assert len(waiting) == n                # every caller is blocked on the leader's flight
+    leader.close()                          # GeneratorExit at the leader's yield
+    for t in threads: t.join(5)
+
+    assert len(results) == n and all(len(rows) == 450 and error_msg is None for rows, error_msg in results)
+    assert fetched == [450]                 # exactly one complete upstream fetch...
+    assert sorted(offset for _, offset in calls) == [0, 0, 100, 200, 300, 400]   # ...re-reading only the page the leader had
+    assert wallet not in group.calls
@@ -0,0 +1,178 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+import api_client
+from api_client import DATA_API
+import metrics
+
+# --- 1. SETTINGS ---
+DB_PATH = os.path.join("cache", "analyses.sqlite")
+ACTIVITY_LIMIT = 500        # Events per /activity request (API maximum)
+MAX_PAGES = 400             # Hard cap per run: 200k events
+ACTIVITY_TYPES = "TRADE,REDEEM"
+HEADERS = {"User-Agent": "Mozilla/5.0", "Accept": "application/json"}
+ADDRESS_RE = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    wallet TEXT PRIMARY KEY,
+    last_ts INTEGER,
+    state TEXT,
+    updated_at REAL
+)
+"""
+
+def is_address(text):
+    return bool(ADDRESS_RE.match((text or "").strip()))
+
+def _event_key(e):
+    # Several fills can share a transaction and a timestamp, so the key covers the fill itself too
+    return "|".join(str(e.get(k, "")) for k in ("transactionHash", "asset", "type", "side", "size", "usdcSize"))
+
+# --- 2. INCREMENTAL CALCULATOR ---
+# Average-cost book per outcome token. Every SELL or REDEEM that closes shares
+# realizes PnL and counts as a win or a loss; the realized-PnL curve (one point
+# per day) drives peak/drawdown. All state is plain JSON so it can be cached and
+# resumed: feeding it only the events after last_ts gives the same result as a full replay.
+class TradeBook:
+    def __init__(self, state=None):
+        s = state or {}
+        self.positions = s.get("positions", {})     # asset -> [shares, cost, conditionId]
+        self.realized = s.get("realized", 0.0)
+        self.wins, self.losses = s.get("wins", 0), s.get("losses", 0)
+        self.gross_win, self.gross_loss = s.get("gross_win", 0.0), s.get("gross_loss", 0.0)
+        self.volume, self.trades = s.get("volume", 0.0), s.get("trades", 0)
+        self.bought = s.get("bought", 0.0)
+        self.peak, self.max_dd = s.get("peak", 0.0), s.get("max_dd", 0.0)
+        self.curve = s.get("curve", {})             # "YYYY-MM-DD" -> realized PnL at the end of that day
+        self.markets = set(s.get("markets", []))
+        self.first_ts, self.last_ts = s.get("first_ts"), s.get("last_ts")
+        self.boundary = set(s.get("boundary", []))  # keys of the events seen at last_ts
+
+    def to_dict(self):
+        return {"positions": self.positions, "realized": self.realized, "wins": self.wins, "losses": self.losses,
+                "gross_win": self.gross_win, "gross_loss": self.gross_loss, "volume": self.volume, "trades": self.trades,
+                "bought": self.bought, "peak": self.peak, "max_dd": self.max_dd, "curve": self.curve,
+                "markets": sorted(self.markets), "first_ts": self.first_ts, "last_ts": self.last_ts,
+                "boundary": sorted(self.boundary)}
+
+    def _close(self, pnl, ts):
+        self.realized += pnl
+        if pnl > 0: self.wins, self.gross_win = self.wins + 1, self.gross_win + pnl
+        else: self.losses, self.gross_loss = self.losses + 1, self.gross_loss + pnl
+        self.peak = max(self.peak, self.realized)
+        self.max_dd = min(self.max_dd, self.realized - self.peak)
+        self.curve[datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")] = self.realized
+
+    def apply(self, e):
+        # Returns False for events already applied (the cursor re-reads the last second)
+        ts = int(e.get("timestamp") or 0)
+        key = _event_key(e)
+        if self.last_ts is not None and (ts < self.last_ts or (ts == self.last_ts and key in self.boundary)): return False
+        if self.last_ts is None or ts > self.last_ts: self.last_ts, self.boundary = ts, set()
+        self.boundary.add(key)
+        if self.first_ts is None: self.first_ts = ts
+
+        kind, asset, c_id = e.get("type"), e.get("asset") or "", e.get("conditionId") or ""
+        size, usdc = float(e.get("size") or 0), float(e.get("usdcSize") or 0)
+        if c_id: self.markets.add(c_id)
+        if kind == "TRADE":
+            self.trades += 1
+            self.volume += usdc
+            pos = self.positions.setdefault(asset, [0.0, 0.0, c_id])
+            if e.get("side") == "BUY":
+                pos[0] += size
+                pos[1] += usdc
+                self.bought += usdc
+            elif pos[0] > 0:
+                sold = min(size, pos[0])
+                cost = pos[1] * sold / pos[0]
+                pos[0], pos[1] = pos[0] - sold, pos[1] - cost
+                self._close(usdc * sold / size - cost if size else 0.0, ts)
+            if pos[0] <= 1e-9: self.positions.pop(asset, None)
+        elif kind == "REDEEM":
+            # A redemption settles every outcome token of the market at once
+            held = [a for a, p in self.positions.items() if p[2] == c_id]
+            cost = sum(self.positions.pop(a)[1] for a in held)
+            if held or usdc: self._close(usdc - cost, ts)
+        return True
+
+    def summary(self):
+        closed = self.wins + self.losses
+        return {"realized_pnl": self.realized, "win_rate": self.wins / closed * 100 if closed else 0.0,
+                "wins": self.wins, "losses": self.losses, "closed": closed, "trades": self.trades,
+                "volume": self.volume, "roi": self.realized / self.bought * 100 if self.bought else 0.0,
+                "max_drawdown": self.max_dd,
+                "max_drawdown_pct": self.max_dd / self.peak * 100 if self.peak > 0 else 0.0,
+                "profit_factor": abs(self.gross_win / self.gross_loss) if self.gross_loss else (99.0 if self.gross_win else 0.0),
+                "open_positions": len(self.positions), "open_cost": sum(p[1] for p in self.positions.values()),
+                "markets": len(self.markets), "first_ts": self.first_ts, "last_ts": self.last_ts}
+
+# --- 3. DISK CACHE ---
+class AnalysisStore:
+    def __init__(self, path=DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def load(self, wallet):
+        with self.lock:
+            row = self.conn.execute("SELECT state FROM analyses WHERE wallet = ?", (wallet,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, wallet, book):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?)",
+                              (wallet, book.last_ts, json.dumps(book.to_dict()), time.time()))
+            self.conn.commit()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None: _store = AnalysisStore()
+        return _store
+
+# --- 4. FETCH + ANALYZE ---
+def fetch_activity_page(wallet, start=None, offset=0):
+    params = {"user": wallet, "type": ACTIVITY_TYPES, "limit": ACTIVITY_LIMIT, "offset": offset,
+              "sortBy": "TIMESTAMP", "sortDirection": "ASC"}
+    if start is not None: params["start"] = start
+    return api_client.get_json(f"{DATA_API}/activity", params=params, headers=HEADERS) or []
+
+def analyze(wallet, max_pages=MAX_PAGES, store=None):
+    # Yields (book, error_msg, done): first the cached analysis (if any), then after every page
+    # of new activity. Pages are walked oldest first with a timestamp cursor (start=last_ts),
+    # so a re-analysis only fetches and applies trades newer than the cached one.
+    wallet = wallet.strip().lower()
+    store = store or get_store()
+    with metrics.timed("stage", stage="wallet_analysis"):
+        yield from _analyze(wallet, max_pages, store)
+
+def _analyze(wallet, max_pages, store):
+    book = TradeBook(store.load(wallet))
+    metrics.inc("wallet_analysis_cache", result="hit" if book.last_ts is not None else "miss")
+    yield book, None, False
+    offset, error_msg = 0, None
+    try:
+        for _ in range(max_pages):
+            page = fetch_activity_page(wallet, book.last_ts, offset)
+            applied = sum(book.apply(e) for e in page)
+            if len(page) < ACTIVITY_LIMIT: break
+            # A full page that added nothing means one second holds more than a page of events: step past it
+            offset = offset + len(page) if applied == 0 else 0
+            yield book, None, False
+    except Exception as e:
+        # Everything applied so far is consistent up to last_ts, so it is still worth keeping
+        error_msg = str(e)
+    if book.last_ts is not None: store.save(wallet, book)
+    yield book, error_msg, True
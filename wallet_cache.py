@@ -0,0 +1,84 @@
+import sqlite3
+import threading
+import time
+import os
+
+# --- 1. SETTINGS ---
+CACHE_DIR = "cache"
+DB_PATH = os.path.join(CACHE_DIR, "wallets.sqlite")
+TRADES_TTL = 3 * 24 * 3600    # Trade counts only go up, so a stale count is still a lower bound
+BALANCE_TTL = 12 * 3600       # Open positions move daily; nightly scans refresh them
+COMMIT_EVERY = 200            # Buffered writes per SQLite transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallets (
+    wallet TEXT PRIMARY KEY,
+    trade_count INTEGER,
+    trades_at REAL,
+    active_balance REAL,
+    balance_at REAL
+)
+"""
+
+# --- 2. STORE ---
+# One row per proxyWallet. Reads are served from memory; writes are buffered and
+# go to SQLite in batches (and on close) so worker threads never wait on disk. Each
+# batch is one short transaction, so several scan worker processes can share the file.
+class WalletCache:
+    def __init__(self, path=DB_PATH, trades_ttl=TRADES_TTL, balance_ttl=BALANCE_TTL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.trades_ttl = trades_ttl
+        self.balance_ttl = balance_ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.rows = {r[0]: list(r[1:]) for r in self.conn.execute("SELECT * FROM wallets")}
+        self.dirty = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, wallet, value_idx, ts_idx, ttl, sticky=None):
+        with self.lock:
+            row = self.rows.get(wallet)
+            value = row[value_idx] if row else None
+            fresh = value is not None and (time.time() - (row[ts_idx] or 0)) < ttl
+            if value is not None and (fresh or (sticky is not None and value >= sticky)):
+                self.hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def get_trades(self, wallet, sticky_above=None):
+        # A wallet that already cleared sticky_above can never drop back below it.
+        return self._lookup(wallet, 0, 1, self.trades_ttl, sticky_above)
+
+    def get_balance(self, wallet):
+        return self._lookup(wallet, 2, 3, self.balance_ttl)
+
+    def _store(self, wallet, value_idx, value):
+        with self.lock:
+            row = self.rows.setdefault(wallet, [None, None, None, None])
+            row[value_idx], row[value_idx + 1] = value, time.time()
+            self.dirty[wallet] = tuple(row)
+            if len(self.dirty) >= COMMIT_EVERY: self._flush()
+
+    def _flush(self):
+        if not self.dirty: return
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO wallets VALUES (?, ?, ?, ?, ?)", [(w, *r) for w, r in self.dirty.items()])
+        self.dirty.clear()
+
+    def flush(self):
+        with self.lock: self._flush()
+
+    def set_trades(self, wallet, count):
+        self._store(wallet, 0, int(count))
+
+    def set_balance(self, wallet, balance):
+        self._store(wallet, 2, float(balance))
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.conn.close()